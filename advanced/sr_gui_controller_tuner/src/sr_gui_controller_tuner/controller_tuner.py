@@ -107,6 +107,12 @@ class PlotThread(QThread):
         self.subprocess_.append(subprocess.Popen(rxplot_str.split()))
 
     def js_callback_(self, msg):
+        # the data visualizer subscribes joint_states as AnyMsg, and rospy
+        # gives all the subscribers of a topic the type of the first one
+        if hasattr(msg, '_buff'):
+            joint_state = JointState()
+            joint_state.deserialize(msg._buff)
+            msg = joint_state
         # get the joint index once, then unregister
         self.joint_index_in_joint_state_ = msg.name.index(
             self.joint_name_.upper())
@@ -24,6 +24,7 @@ from controller_manager_msgs.srv import ListControllers
 
 from sr_robot_msgs.srv import ForceController, SetEffortControllerGains, SetMixedPositionVelocityPidGains, SetPidGains
 from sr_gui_controller_tuner.pid_loader_and_saver import PidLoader, PidSaver
+from sr_data_visualization.span_tracer import traced
 
 
 class CtrlSettings(object):
@@ -171,6 +172,7 @@ class SrControllerTunerApp(object):
         rospy.loginfo("using joint_prefix " + self.joint_prefix)
         return True
 
+    @traced(category="service")
     def get_ctrls(self):
         """
         Retrieve currently running controllers
@@ -298,6 +300,7 @@ class SrControllerTunerApp(object):
 
         return self.pid_loader.get_settings(param_name)
 
+    @traced(category="service")
     def set_controller(self, joint_name, controller_type, controller_settings):
         """
         Sets the controller settings calling the proper service with the correct syntax for controller type.
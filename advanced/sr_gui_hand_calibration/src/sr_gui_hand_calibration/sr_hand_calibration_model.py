@@ -21,6 +21,7 @@ import rospkg
 import subprocess
 from sr_utilities.hand_finder import HandFinder
 from sr_robot_lib.etherCAT_hand_lib import EtherCAT_Hand_Lib
+from sr_data_visualization.span_tracer import traced
 from PyQt5.QtGui import QColor, QIcon
 from PyQt5.QtWidgets import QTreeWidget, QTreeWidgetItem, QTreeWidgetItemIterator, QMessageBox, QPushButton
 from PyQt5.QtCore import QTimer, pyqtSignal
@@ -70,6 +71,7 @@ class IndividualCalibration(QTreeWidgetItem):
     def remove(self):
         self.tree_widget.remove
 
+    @traced(category="service")
     def calibrate(self):
         """
         Performs the joint calibration and sets background to green
@@ -130,6 +132,7 @@ class IndividualCalibrationCoupled(IndividualCalibration):
 
         self.is_calibrated = False
 
+    @traced(category="service")
     def calibrate(self):
         """
         Performs the joint calibration and sets background to green
@@ -283,6 +286,7 @@ class JointCalibration(QTreeWidgetItem):
                 config = [[[0, 0], [0.0, 0.0]], [[1, 1], [0.0, 0.0]]]
         return [self.joint_name, config]
 
+    @traced(category="timer")
     def update_joint_pos(self):
         """
         Update the joint position if there are enough nonequal values
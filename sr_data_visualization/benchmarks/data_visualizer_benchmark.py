@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# End to end benchmark of the data visualizer, run next to a local roscore:
+#
+#   roscore &
+#   python3 data_visualizer_benchmark.py [--seconds S] [--joint-states-rate HZ] [--controller-rate HZ]
+#                                        [--diagnostics-rate HZ] [--palm-extras-rate HZ]
+#                                        [--backends qwt pyqtgraph]
+#                                        [--thresholds FILE] [--write-thresholds]
+#
+# A child process publishes synthetic hand topics while SrDataVisualizer runs on the
+# offscreen Qt platform. Each tab is shown in turn and measured for callback time,
+# frame time, dropped samples and CPU use of the visualizer process. With several
+# plot backends, a visualizer is created for each of them in turn, reading the same
+# streams, and their results are compared. The run fails when a result is worse than
+# its threshold in thresholds.json.
+
+from __future__ import absolute_import
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np  # noqa: E402
+import rospy  # noqa: E402
+
+from control_msgs.msg import JointControllerState  # noqa: E402
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue  # noqa: E402
+from python_qt_binding.QtCore import QEventLoop, QTimer  # noqa: E402
+from python_qt_binding.QtWidgets import QApplication  # noqa: E402
+from sensor_msgs.msg import JointState  # noqa: E402
+from std_msgs.msg import Float64MultiArray  # noqa: E402
+
+from sr_data_visualization.data_sources import (  # noqa: E402
+    ControllerStateSource,
+    DiagnosticsSource,
+    JointStatesSource,
+    PalmExtrasSource,
+    controller_state_topic,
+    hand_sources,
+    motor_joints
+)
+from sr_data_visualization.plot_backends import DEFAULT_PLOT_BACKEND, PLOT_BACKENDS  # noqa: E402
+from sr_data_visualization.sr_data_visualizer_gui import SrDataVisualizer  # noqa: E402
+
+THRESHOLDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thresholds.json")
+JOINT_PREFIX = "rh_"
+HAND_JOINTS = {"rh": [JOINT_PREFIX + finger + "J" + str(number)
+                      for finger, count in (("FF", 4), ("MF", 4), ("RF", 4), ("LF", 5), ("TH", 5), ("WR", 2))
+                      for number in range(1, count + 1)]}
+# Values of a motor status of the real hand, the plotted ones included
+MOTOR_STATUS_VALUES = 40
+GROUPS = ("joint_states", "controllers", "diagnostics", "palm_extras")
+# Thresholds written by --write-thresholds leave this much headroom over the measured results
+THRESHOLD_MARGIN = 1.5
+
+
+def joint_states_messages():
+    names = HAND_JOINTS["rh"]
+    message = JointState(name=names)
+    while True:
+        values = list(np.sin(time.time() + np.arange(len(names))))
+        message.header.stamp = rospy.Time.now()
+        message.position, message.velocity, message.effort = values, values, values
+        yield "/joint_states", message
+
+
+def controller_messages():
+    topics = [controller_state_topic(joint) for joints in motor_joints(HAND_JOINTS, JOINT_PREFIX).values()
+              for joint in joints]
+    message = JointControllerState()
+    while True:
+        message.header.stamp = rospy.Time.now()
+        message.set_point = message.process_value = np.sin(time.time())
+        for topic in topics:
+            yield topic, message
+
+
+def diagnostics_messages():
+    motors = [joint for joints in motor_joints(HAND_JOINTS, JOINT_PREFIX).values() for joint in joints]
+    message = DiagnosticArray()
+    for motor in motors:
+        unused = range(MOTOR_STATUS_VALUES - len(DiagnosticsSource.KEYS))
+        keys = list(DiagnosticsSource.KEYS) + ["Unused value {}".format(index) for index in unused]
+        message.status.append(DiagnosticStatus(name="/Hand/Motors/rh SRDMotor " + motor[len(JOINT_PREFIX):],
+                                               values=[KeyValue(key=key, value="0") for key in keys]))
+    while True:
+        message.header.stamp = rospy.Time.now()
+        value = "{:.3f}".format(np.sin(time.time()))
+        for status in message.status:
+            for item in status.values:
+                item.value = value
+        yield "/diagnostics_agg", message
+
+
+def palm_extras_messages():
+    message = Float64MultiArray()
+    while True:
+        message.data = list(np.sin(time.time() + np.arange(len(PalmExtrasSource.COLUMNS))))
+        yield "/" + JOINT_PREFIX[:-1] + "/palm_extras", message
+
+
+def publish(messages, rate, published, stop):
+    publishers = dict()
+    period = 1.0 / rate
+    next_time = time.monotonic()
+    # Every message of a group is published once per period
+    first_topic = None
+    for topic, message in messages:
+        if topic == first_topic or first_topic is None:
+            first_topic = topic
+            next_time += period
+            time.sleep(max(0.0, next_time - time.monotonic()))
+            if stop.is_set():
+                return
+        if topic not in publishers:
+            publishers[topic] = rospy.Publisher(topic, type(message), queue_size=100)
+        publishers[topic].publish(message)
+        with published.get_lock():
+            published.value += 1
+
+
+def run_publishers(rates, published, stop):
+    rospy.init_node("sr_data_visualizer_benchmark_publishers", anonymous=True, disable_signals=True)
+    generators = {"joint_states": joint_states_messages, "controllers": controller_messages,
+                  "diagnostics": diagnostics_messages, "palm_extras": palm_extras_messages}
+    threads = [threading.Thread(target=publish, args=(generators[group](), rates[group], published[group], stop))
+               for group in GROUPS if rates[group] > 0]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class CallbackTimer():
+    """
+        Wraps the callback of a source to count the messages it receives and time them.
+    """
+    def __init__(self, source, group):
+        self.group = group
+        self.received = 0
+        self.durations = []
+        self._callback = source.callback
+        source.callback = self.callback
+
+    def callback(self, data):
+        start = time.perf_counter()
+        self._callback(data)
+        self.durations.append(time.perf_counter() - start)
+        self.received += 1
+
+
+class BenchmarkContext():
+    # Stands for the rqt plugin context, only the widget is needed
+    def add_widget(self, widget):
+        self.widget = widget
+        widget.resize(1600, 1000)
+        widget.show()
+
+
+def source_group(source):
+    for group, source_class in zip(GROUPS, (JointStatesSource, ControllerStateSource, DiagnosticsSource,
+                                            PalmExtrasSource)):
+        if isinstance(source, source_class):
+            return group
+    return None
+
+
+def wait(seconds):
+    loop = QEventLoop()
+    QTimer.singleShot(int(seconds * 1000), loop.quit)
+    loop.exec_()
+
+
+def measure_tab(gui, timers, sources, published, seconds):
+    received = {group: sum(timer.received for timer in timers if timer.group == group) for group in GROUPS}
+    sent = {group: published[group].value for group in GROUPS}
+    subscribed = {source_group(source) for source in sources if source._subscriber is not None}
+    for timer in timers:
+        timer.durations = []
+    gui.render_clock.frame_times.clear()
+
+    cpu_start, wall_start = time.process_time(), time.monotonic()
+    wait(seconds)
+    cpu = time.process_time() - cpu_start
+    wall = time.monotonic() - wall_start
+
+    expected = sum(published[group].value - sent[group] for group in subscribed)
+    delivered = sum(timer.received for timer in timers if timer.group in subscribed) - \
+        sum(received[group] for group in subscribed)
+    durations = [duration for timer in timers for duration in timer.durations]
+    frame_times = list(gui.render_clock.frame_times)
+    results = {'cpu_percent': 100.0 * cpu / wall,
+               'dropped_ratio': max(0, expected - delivered) / expected if expected else 0.0}
+    for name, values in (('callback_ms', durations), ('frame_ms', frame_times)):
+        for percentile in (50, 95, 99):
+            results['{}_p{}'.format(name, percentile)] = \
+                1000.0 * float(np.percentile(values, percentile)) if values else 0.0
+    return results
+
+
+def measure_backend(backend, timers, sources, published, args):
+    rospy.set_param("~plot_backend", backend)
+    context = BenchmarkContext()
+    gui = SrDataVisualizer(context)
+    results = dict()
+    try:
+        for index in range(gui.tab_container.count()):
+            tab = gui.tab_container.tabText(index)
+            gui.tab_container.setCurrentIndex(index)
+            wait(args.warmup)
+            results[tab] = measure_tab(gui, timers, sources, published, args.seconds)
+            metrics = ", ".join("{} {:.3f}".format(metric, value) for metric, value in sorted(results[tab].items()))
+            print("{:<10} {:<16} {}".format(backend, tab, metrics))
+    finally:
+        gui.shutdown_plugin()
+        # The plots of the next backend must not be slowed down by those of this one
+        context.widget.close()
+        context.widget.deleteLater()
+    return results
+
+
+def print_comparison(results, backends):
+    metrics = ('frame_ms_p50', 'frame_ms_p95', 'cpu_percent')
+    print("{:<16} {:<14} ".format("Tab", "Metric") + " ".join("{:>10}".format(backend) for backend in backends))
+    for tab in results[backends[0]]:
+        for metric in metrics:
+            print("{:<16} {:<14} ".format(tab, metric) +
+                  " ".join("{:>10.3f}".format(results[backend][tab][metric]) for backend in backends))
+
+
+def check(results, thresholds):
+    failures = []
+    for tab, tab_results in results.items():
+        for metric, limit in thresholds.items():
+            if metric in tab_results and tab_results[metric] > limit:
+                failures.append("{}: {} is {:.3f}, above {:.3f}".format(tab, metric, tab_results[metric], limit))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Callback, frame and CPU cost of the data visualizer tabs")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measured seconds per tab")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds per tab before measuring")
+    parser.add_argument("--joint-states-rate", type=float, default=1000.0)
+    parser.add_argument("--controller-rate", type=float, default=1000.0)
+    parser.add_argument("--diagnostics-rate", type=float, default=10.0)
+    parser.add_argument("--palm-extras-rate", type=float, default=100.0)
+    parser.add_argument("--backends", nargs="+", default=[DEFAULT_PLOT_BACKEND], choices=sorted(PLOT_BACKENDS),
+                        help="plot backends to measure, one after the other")
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE)
+    parser.add_argument("--write-thresholds", action="store_true",
+                        help="store the results, with some headroom, as the new thresholds")
+    args = parser.parse_args()
+
+    rates = {"joint_states": args.joint_states_rate, "controllers": args.controller_rate,
+             "diagnostics": args.diagnostics_rate, "palm_extras": args.palm_extras_rate}
+    published = {group: multiprocessing.Value('l', 0) for group in GROUPS}
+    stop = multiprocessing.Event()
+    # Publishers run in their own process, so they are not counted in the visualizer CPU use
+    publishers = multiprocessing.Process(target=run_publishers, args=(rates, published, stop), daemon=True)
+    publishers.start()
+
+    rospy.init_node("sr_data_visualizer_benchmark")
+    app = QApplication(sys.argv)
+    # Sources are created ahead of the visualizer, so their callbacks can be timed before they subscribe
+    sources = hand_sources(HAND_JOINTS, JOINT_PREFIX)
+    timers = [CallbackTimer(source, source_group(source)) for source in sources]
+
+    results = dict()
+    try:
+        for backend in args.backends:
+            for tab, tab_results in measure_backend(backend, timers, sources, published, args).items():
+                results.setdefault(backend, dict())[tab] = tab_results
+    finally:
+        stop.set()
+        publishers.join(5)
+    app.quit()
+
+    if len(args.backends) > 1:
+        print_comparison(results, args.backends)
+    # Thresholds apply to every backend
+    results = {"{} {}".format(backend, tab): tab_results for backend, backend_results in results.items()
+               for tab, tab_results in backend_results.items()}
+
+    if args.write_thresholds:
+        thresholds = {metric: THRESHOLD_MARGIN * max(max(tab_results[metric] for tab_results in results.values()),
+                                                     0.001)
+                      for metric in ('callback_ms_p95', 'frame_ms_p95', 'dropped_ratio', 'cpu_percent')}
+        with open(args.thresholds, 'w') as thresholds_file:
+            json.dump(thresholds, thresholds_file, indent=2, sort_keys=True)
+        print("Thresholds written to " + args.thresholds)
+        return 0
+
+    with open(args.thresholds) as thresholds_file:
+        failures = check(results, json.load(thresholds_file))
+    for failure in failures:
+        print("REGRESSION " + failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
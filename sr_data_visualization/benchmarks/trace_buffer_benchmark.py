@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+# Micro-benchmark of the per-frame trace update of the joint states plots, without Qt.
+# Each frame writes the joint states received since the previous one into the shared
+# JointRingBuffer, then every plot updates its EnvelopeDecimator and reads its curves
+# and y range, as PlotFrames.compute_frame does before handing them to the plot widget.
+# For reference, the shift of one value per trace and frame with np.concatenate that
+# the plots did before, which dropped all the samples received in between, is also timed.
+#
+#   python3 trace_buffer_benchmark.py [--frames N] [--joints N] [--rate HZ] [--fps FPS] [--pixels N]
+
+from __future__ import absolute_import
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from sr_data_visualization.decimation import EnvelopeDecimator
+from sr_data_visualization.ring_buffer import JointRingBuffer
+
+# Samples of each trace in the np.concatenate shift of the previous plots
+CONCATENATE_SIZE = np.arange(0.0, 100.1, 0.5).size
+HISTORY_SECONDS = 60
+# TIME_WINDOW and the position, effort and velocity of JointStatesSource
+TIME_WINDOW = 10.0
+FIELDS = 3
+DEFAULT_JOINTS = 24
+DEFAULT_RATE = 1000
+DEFAULT_PIXELS = 800
+
+
+class ConcatenateFrames():
+    def __init__(self, joints):
+        self.traces = [np.zeros(CONCATENATE_SIZE) for _ in range(joints * FIELDS)]
+
+    def frame(self, stamp):
+        for index, data in enumerate(self.traces):
+            data = np.concatenate((data[:1], data[:-1]))
+            data[0] = stamp
+            self.traces[index] = data
+
+
+class DecimatorFrames():
+    def __init__(self, joints, rate, fps, pixels):
+        names = ["rh_J{}".format(joint) for joint in range(joints)]
+        self.history = JointRingBuffer(HISTORY_SECONDS * rate, fields=FIELDS)
+        self.history.joint_columns(names)
+        self.decimators = [EnvelopeDecimator(self.history, [(name, field) for field in range(FIELDS)],
+                                             TIME_WINDOW, pixels) for name in names]
+        self.period = 1.0 / rate
+        self.messages_per_frame = max(1, int(round(float(rate) / fps)))
+        self.rows = np.random.default_rng(0).normal(size=(self.messages_per_frame, joints, FIELDS))
+        self.stamp = 0.0
+        # Starts with a full window, as the plots of a running hand do
+        for _ in range(int(TIME_WINDOW * rate / self.messages_per_frame)):
+            self.receive()
+        self.render()
+
+    def receive(self):
+        for rows in self.rows:
+            self.stamp += self.period
+            self.history.append(self.stamp, rows)
+
+    def render(self):
+        for decimator in self.decimators:
+            decimator.update()
+            decimator.curves()
+            decimator.extrema(range(FIELDS))
+
+    def frame(self, stamp):
+        self.receive()
+        self.render()
+
+
+def measure(name, frames, count):
+    for _ in range(10):
+        frames.frame(1.0)
+
+    start = time.perf_counter()
+    for i in range(count):
+        frames.frame(float(i))
+    time_per_frame = (time.perf_counter() - start) / count
+
+    tracemalloc.start()
+    peak_bytes = 0
+    for i in range(count):
+        tracemalloc.clear_traces()
+        frames.frame(float(i))
+        peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    print("{:<16} {:>10.1f} us/frame {:>10d} bytes allocated/frame".format(name, time_per_frame * 1e6, peak_bytes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame cost of the data visualizer joint states traces")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--joints", type=int, default=DEFAULT_JOINTS)
+    parser.add_argument("--rate", type=int, default=DEFAULT_RATE)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--pixels", type=int, default=DEFAULT_PIXELS)
+    args = parser.parse_args()
+
+    decimator_frames = DecimatorFrames(args.joints, args.rate, args.fps, args.pixels)
+    print("{} joints at {} Hz, {} messages and {} pixel columns per frame, {} frames".format(
+        args.joints, args.rate, decimator_frames.messages_per_frame, args.pixels, args.frames))
+    measure("np.concatenate", ConcatenateFrames(args.joints), args.frames)
+    measure("EnvelopeDecimator", decimator_frames, args.frames)
+
+
+if __name__ == "__main__":
+    main()
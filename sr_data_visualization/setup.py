@@ -5,7 +5,7 @@ from catkin_pkg.python_setup import generate_distutils_setup
 setup_args = generate_distutils_setup(
     packages=['sr_data_visualization'],
     package_dir={'': 'src'},
-    scripts=['scripts/sr_data_visualizer_plugin']
+    scripts=['scripts/sr_data_visualizer_plugin', 'scripts/sr_data_logger']
 )
 
 setup(**setup_args)
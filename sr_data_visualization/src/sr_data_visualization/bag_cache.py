@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+
+INDEX_FILE = "index.json"
+
+
+def bag_key(bag_path, hash_bytes):
+    # The index of a bag is written at its end, so hashing both ends catches
+    # rewritten bags without reading gigabytes in between
+    size = os.path.getsize(bag_path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(bag_path, 'rb') as bag_file:
+        digest.update(bag_file.read(hash_bytes))
+        if size > hash_bytes:
+            bag_file.seek(max(hash_bytes, size - hash_bytes))
+            digest.update(bag_file.read(hash_bytes))
+    return "{}-{}".format(digest.hexdigest(), size)
+
+
+def _file_name(*parts):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', '.'.join(part for part in parts if part)) + ".npy"
+
+
+class BagCache():
+    """
+        Signals decoded from a bag, saved as one .npy file per signal (joint field,
+        motor value, palm extra...) and memory mapped back when the same bag is
+        opened again, instead of deserializing it once more. Entries are keyed by the bag
+        size and a hash of both its ends, so copied or renamed bags are still found.
+        Each topic is saved as named tables of columns, see TopicSource.tables().
+    """
+    HASH_BYTES = 4 * 1024 * 1024
+
+    def __init__(self, directory, bag_path):
+        self.directory = os.path.join(os.path.expanduser(directory), bag_key(bag_path, self.HASH_BYTES))
+        self._index = {'bag': os.path.abspath(bag_path), 'origin': None, 'topics': dict()}
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path) as index_file:
+                self._index = json.load(index_file)
+
+    @property
+    def origin(self):
+        # Time the cached stamps are relative to
+        return self._index['origin']
+
+    @origin.setter
+    def origin(self, origin):
+        self._index['origin'] = origin
+
+    def has(self, topic):
+        return topic in self._index['topics']
+
+    def load(self, topic):
+        tables = dict()
+        for table, entry in self._index['topics'][topic]['tables'].items():
+            tables[table] = {column: self._map(os.path.join(self.directory, entry['directory'], file_name))
+                             for column, file_name in zip(entry['columns'], entry['files'])}
+        return tables
+
+    @staticmethod
+    def _map(path):
+        try:
+            return np.load(path, mmap_mode='r')
+        except ValueError:
+            # Empty arrays can not be mapped
+            return np.load(path)
+
+    def save(self, topic, tables):
+        topic_directory = re.sub(r'[^A-Za-z0-9_.-]+', '_', topic.strip('/')) or "_"
+        os.makedirs(self.directory, exist_ok=True)
+        # Written aside then moved in place, so an interrupted save leaves no partial topic
+        staging = tempfile.mkdtemp(dir=self.directory)
+        entry = {'tables': dict()}
+        for table, columns in tables.items():
+            files = [_file_name(table, column) for column in columns]
+            for file_name, values in zip(files, columns.values()):
+                np.save(os.path.join(staging, file_name), np.asarray(values))
+            entry['tables'][table] = {'directory': topic_directory, 'columns': list(columns), 'files': files}
+
+        destination = os.path.join(self.directory, topic_directory)
+        if os.path.exists(destination):
+            shutil.rmtree(destination)
+        os.rename(staging, destination)
+        self._index['topics'][topic] = entry
+        self._write_index()
+
+    def _write_index(self):
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        with open(index_path + ".tmp", 'w') as index_file:
+            json.dump(self._index, index_file, indent=2)
+        os.replace(index_path + ".tmp", index_path)
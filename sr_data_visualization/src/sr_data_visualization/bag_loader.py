@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import rosbag
+
+from sr_data_visualization.data_sources import message_time, set_time_origin
+from sr_data_visualization.ingestion_worker import ingestion
+
+# Messages read between two progress reports
+PROGRESS_MESSAGES = 1000
+
+
+def _bag_topic(topic_name):
+    return '/' + topic_name.lstrip('/')
+
+
+def first_message(bag_path, topic_name):
+    with rosbag.Bag(bag_path) as bag:
+        for _, message, _ in bag.read_messages(topics=[_bag_topic(topic_name)]):
+            return message
+    return None
+
+
+def load_bag(bag_path, sources, cache=None, progress=None):
+    """
+        Fills the histories of the given sources from a bag, without replaying it.
+        Histories are resized to hold every message of their topic, then only the
+        messages of those topics are deserialized, in a single pass in bag order.
+        With a BagCache, topics decoded before are memory mapped from it instead and
+        the others are saved to it, nothing is read from the bag when they are all cached.
+        Histories are written holding the ingestion lock, as the GUI may be reading them.
+        progress is called with the number of messages read and to read, as it goes.
+        Returns the number of messages read from the bag.
+    """
+    sources = {_bag_topic(source.topic_name): source for source in sources}
+    with ingestion.lock:
+        # Offline sources ignore the messages the ingestion worker still has queued for them
+        for source in sources.values():
+            source.set_offline(True)
+
+    missing = {topic: source for topic, source in sources.items() if cache is None or not cache.has(topic)}
+    read = 0
+    if missing:
+        with rosbag.Bag(bag_path) as bag:
+            topics_info = bag.get_type_and_topic_info().topics
+            with ingestion.lock:
+                for topic, source in missing.items():
+                    source.reset_history(max(1, topics_info[topic].message_count if topic in topics_info else 0))
+
+            # Stamps are relative to the bag start, the same for cached and freshly read topics
+            set_time_origin(bag.get_start_time() if cache is None or cache.origin is None else cache.origin)
+            total = sum(topics_info[topic].message_count for topic in missing if topic in topics_info)
+            for topic, message, receive_time in bag.read_messages(topics=[topic for topic in missing
+                                                                          if topic in topics_info]):
+                with ingestion.lock:
+                    missing[topic].ingest(message, message_time(message, receive_time.to_sec()))
+                read += 1
+                if progress is not None and read % PROGRESS_MESSAGES == 0:
+                    progress(read, total)
+
+        if cache is not None:
+            if cache.origin is None:
+                cache.origin = bag.get_start_time()
+            for topic, source in missing.items():
+                cache.save(topic, source.tables())
+
+    for topic, source in sources.items():
+        if topic not in missing:
+            tables = cache.load(topic)
+            with ingestion.lock:
+                source.load_tables(tables)
+    if not missing:
+        set_time_origin(cache.origin)
+    return read
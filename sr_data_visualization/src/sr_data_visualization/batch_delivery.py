@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from python_qt_binding.QtCore import QObject, pyqtSignal
+
+from sr_data_visualization.span_tracer import tracer
+
+
+class BatchDelivery(QObject):
+    """
+        Hands the batches of consumers of the ingestion worker to the GUI thread, through
+        a single queued signal, and runs their data_received there. Kept apart from the
+        worker so the sources can be used without Qt.
+    """
+    batch_ready = pyqtSignal(object)
+
+    def __init__(self):
+        super().__init__()
+        self.batch_ready.connect(self._deliver)
+
+    def __call__(self, batch):
+        # Called from the ingestion worker thread
+        self.batch_ready.emit(batch)
+
+    def _deliver(self, batch):
+        with tracer.span("IngestionWorker.deliver", "timer"):
+            for consumer in batch:
+                consumer.data_received()
+
+
+# Created on import by the GUI thread, which its signal delivers to
+batch_delivery = BatchDelivery()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import threading
+import time
+
+from sr_data_visualization.session_recorder import SessionRecorder
+
+
+class RotatingRecorder():
+    """
+        Session recorder started afresh every rotate_seconds, so unattended logging
+        produces sessions of bounded size. Only the latest keep sessions are left on
+        disk when keep is set. Used by sources like a SessionRecorder.
+    """
+    def __init__(self, directory, file_format='binary', rotate_seconds=3600.0, keep=0):
+        self.directory = os.path.expanduser(directory)
+        self.file_format = file_format
+        # Sessions are named after the second they start
+        self.rotate_seconds = max(1.0, float(rotate_seconds))
+        self.keep = int(keep)
+        self.sessions = []
+        self.rows = 0
+        self.dropped = 0
+        self._recorder = None
+        self._lock = threading.Lock()
+        self._next_rotation = None
+
+    def start(self):
+        self.rotate()
+
+    def stop(self):
+        with self._lock:
+            recorder, self._recorder = self._recorder, None
+        if recorder is not None:
+            self._retire(recorder)
+
+    def record(self, stream, columns, stamp, values):
+        # Under the lock of the rotation, so no sample is queued to a recorder once it is being stopped
+        with self._lock:
+            if self._recorder is not None:
+                self._recorder.record(stream, columns, stamp, values)
+
+    def rotate_if_due(self):
+        if self._next_rotation is not None and time.monotonic() >= self._next_rotation:
+            self.rotate()
+
+    def rotate(self):
+        recorder = SessionRecorder(self.directory, file_format=self.file_format)
+        recorder.start()
+        with self._lock:
+            previous, self._recorder = self._recorder, recorder
+            self.sessions.append(recorder.directory)
+        self._next_rotation = time.monotonic() + self.rotate_seconds
+        if previous is not None:
+            self._retire(previous)
+        while self.keep and len(self.sessions) > self.keep:
+            shutil.rmtree(self.sessions.pop(0), ignore_errors=True)
+
+    def _retire(self, recorder):
+        # Stopping flushes what the recorder still holds
+        recorder.stop()
+        self.rows += recorder.rows_written()
+        self.dropped += recorder.dropped
+
+    def current_directory(self):
+        recorder = self._recorder
+        return recorder.directory if recorder is not None else None
@@ -16,234 +16,436 @@
 
 from __future__ import absolute_import
 
-import numpy as np
-import rospy
+import time
 
-from python_qt_binding.QtGui import QPen
-from python_qt_binding.QtCore import Qt, QTimer
+from python_qt_binding.QtCore import Qt, QEvent
+from python_qt_binding.QtWidgets import QVBoxLayout, QWidget
 
-from qwt import (
-    QwtPlot,
-    QwtPlotCurve,
-    QwtScaleDraw
-)
+from sr_data_visualization.data_sources import shared_history, history_seconds
+from sr_data_visualization.decimation import EnvelopeDecimator, MinMaxPyramid
+from sr_data_visualization.plot_backends import plot_view_class
+from sr_data_visualization.span_tracer import tracer
+
+from sensor_msgs.msg import JointState
+from diagnostic_msgs.msg import DiagnosticArray
+from std_msgs.msg import Float64MultiArray
+from control_msgs.msg import JointControllerState
 
 
 class Trace():
-    def __init__(self, trace_name, qt_colour, x_data):
+    def __init__(self, trace_name, qt_colour):
         self.name = trace_name
-        self.plot = QwtPlotCurve(trace_name)
-        self.plot.setPen(QPen(qt_colour))
-        self.data = np.zeros(x_data.shape)
-        self.latest_value = 0.0
+        self.colour = qt_colour
+        # Curve of the plot view drawing the trace, if any
+        self.curve = None
+
+
+class PlotFrames():
+    """
+        Data side of a plot, without any widget: history, subscription, decimation,
+        pause and view, and y range of the shown traces. Shared by the plot widgets and the
+        cells of a JointGridCanvas, which only differ in how the frame is drawn.
+        TRACES lists the (name, colour) of the traces, in history channel order.
+        Subclasses subscribe and unsubscribe through the shared TopicSource they read.
+    """
+    # Default seconds of history shown on the time axis
+    TIME_WINDOW = 10.0
+    # While paused: time range scaling of one mouse wheel step and narrowest range in seconds
+    ZOOM_STEP = 1.25
+    MIN_VIEW_SPAN = 0.01
+    # Highest expected message rate (Hz), used to size the history buffer
+    SAMPLE_RATE = 1000
+    TRACES = ()
+    # Shared TopicSource the plot reads and subscribes through, set by the subclasses
+    _source = None
+
+    def init_frames(self, joint_name, topic_name, topic_type, width):
+        self.joint_name = joint_name
+        self._topic_name = topic_name
+        self._topic_type = topic_type
 
+        self.create_traces()
+        self.create_history()
+        # The y axis follows the extrema of the shown traces, tracked incrementally,
+        # instead of rescanning every curve on every frame
+        self._shown_rows = list(range(len(self.traces)))
+        self._y_range = None
+        # Curves are drawn from a min/max envelope with one bin per pixel column,
+        # so long windows cost about the same to draw as short ones
+        self.time_window = self.TIME_WINDOW
+        self.decimator = EnvelopeDecimator(self.history, self.trace_channels, self.time_window, width)
+        # Built on the first pause, to zoom and pan through the whole history
+        self.pyramid = None
+        self._paused = False
+        self._view = None
+
+        # Frames are driven by the visualizer's RenderClock, which only
+        # redraws plots that are plotting and received data since their last frame
+        self._plotting = False
+        self._new_data = False
+        # Counters read by the performance table
+        self.frames = 0
+        self.render_seconds = 0.0
 
-class GenericDataPlot(QwtPlot):
+    def create_traces(self):
+        self.traces = [Trace(name, colour) for name, colour in self.TRACES]
+
+    def create_history(self):
+        # One timestamped buffer per plot, each trace reads its own channel
+        self.history = shared_history((type(self).__name__, self._topic_name, self.joint_name),
+                                      history_seconds() * self.SAMPLE_RATE, len(self.traces))
+        self.trace_channels = list(range(len(self.traces)))
+
+    def data_received(self):
+        # Paused plots keep recording but only redraw when their view changes
+        if not self._paused:
+            self._new_data = True
+
+    def needs_render(self):
+        return self._plotting and self._new_data
+
+    def set_time_window(self, seconds):
+        self.time_window = float(seconds)
+        self._new_data = True
+
+    def set_paused(self, paused):
+        self._paused = paused
+        self._view = None
+        if paused:
+            latest_stamp = self.history.latest_stamp()
+            if latest_stamp is not None:
+                self._view = (latest_stamp - self.time_window, latest_stamp)
+            if self.pyramid is None:
+                self.pyramid = MinMaxPyramid(self.history, self.trace_channels)
+        self._new_data = True
+
+    def set_view(self, start, end):
+        # Keeps the paused view inside the recorded history
+        oldest_stamp, latest_stamp = self.history.oldest_stamp(), self.history.latest_stamp()
+        if latest_stamp is None:
+            return
+        span = min(max(end - start, self.MIN_VIEW_SPAN), max(latest_stamp - oldest_stamp, self.MIN_VIEW_SPAN))
+        start = max(oldest_stamp, min(start, latest_stamp - span))
+        self._view = (start, start + span)
+        self._new_data = True
+
+    def show_all(self):
+        if self.history.latest_stamp() is not None:
+            self.set_view(self.history.oldest_stamp(), self.history.latest_stamp())
+
+    def zoom(self, centre, zoom_in):
+        # Zooms the paused view around centre by one wheel step
+        start, end = self._view
+        factor = 1.0 / self.ZOOM_STEP if zoom_in else self.ZOOM_STEP
+        self.set_view(centre - (centre - start) * factor, centre + (end - centre) * factor)
+
+    def show_latest(self):
+        latest_stamp = self.history.latest_stamp()
+        self.set_view(latest_stamp - self.time_window, latest_stamp)
+
+    def source(self):
+        return self._source
+
+    def topic_name(self):
+        return self._source.topic_name if self._source is not None else self._topic_name
+
+    def render_frame(self):
+        start = time.perf_counter()
+        with tracer.span(self.joint_name, "render"):
+            self.draw_frame()
+        self.frames += 1
+        self.render_seconds += time.perf_counter() - start
+
+    def draw_frame(self):
+        raise NotImplementedError("The function draw_frame must be implemented")
+
+    def compute_frame(self, width):
+        """
+            Curves of the next frame, decimated to width pixel columns: the time range,
+            the x data and one y data array per trace, or None when there is nothing to show.
+            The y range of the shown traces is updated on the way.
+        """
+        # The x axis is time in seconds, newest sample on the right
+        self._new_data = False
+        if self._paused:
+            if self._view is None:
+                return None
+            start, end = self._view
+            x_data, y_data = self.pyramid.query(start, end, width)
+            y_range = self._range_of(y_data)
+        else:
+            latest_stamp = self.history.latest_stamp()
+            if latest_stamp is None:
+                return None
+            start, end = latest_stamp - self.time_window, latest_stamp
+            self.decimator.set_geometry(self.time_window, width)
+            self.decimator.update()
+            x_data, y_data = self.decimator.curves()
+            y_range = self.decimator.extrema(self._shown_rows)
+        return start, end, x_data, y_data, y_range
+
+    def _range_of(self, y_data):
+        shown = [y_data[row] for row in self._shown_rows if y_data[row].size]
+        if not shown:
+            return None
+        return min(values.min() for values in shown), max(values.max() for values in shown)
+
+    def update_y_range(self, y_range):
+        # Only rescales when the extrema change, so a steady signal keeps a steady axis
+        if y_range is None or y_range == self._y_range:
+            return None
+        self._y_range = y_range
+        low, high = y_range
+        margin = 0.05 * (high - low) or 0.05 * abs(high) or 1.0
+        return low - margin, high + margin
+
+    def plot_data(self, plot):
+        # Switching tabs calls this repeatedly, only (un)subscribe on an actual change
+        if plot and not self._plotting:
+            self.subscribe()
+            self._plotting = True
+        elif not plot and self._plotting:
+            self.unsubscribe()
+            self._plotting = False
+
+    def select_trace(self, trace_name):
+        # Rows of the traces shown for a radio button, a trace name or "All"
+        self._shown_rows = [row for row, trace in enumerate(self.traces)
+                            if trace_name in (trace.name, "All")]
+        self._y_range = None
+        self._new_data = True
+
+
+class GenericDataPlot(QWidget, PlotFrames):
+    """
+        Plot of one joint, drawn by the plot view of the selected backend (~plot_backend).
+    """
     GRAPH_MINW = 150
     GRAPH_MINH = 50
 
     def __init__(self, joint_name, topic_name, topic_type, start_plotting=False):
         super().__init__()
 
-        self.joint_name = joint_name
-        self._topic_name = topic_name
-        self._topic_type = topic_type
-
-        self.setCanvasBackground(Qt.white)
         self.setMinimumSize(self.GRAPH_MINW, self.GRAPH_MINH)
+        self.view = plot_view_class()(self)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.view)
+
+        self.init_frames(joint_name, topic_name, topic_type, self.GRAPH_MINW)
+        self._drag_origin = None
+        self.view.plot_area().installEventFilter(self)
+        for trace in self.traces:
+            trace.curve = self.view.add_curve(trace.name, trace.colour)
 
-        self.axisScaleDraw(QwtPlot.xBottom).enableComponent(QwtScaleDraw.Labels, False)
-        self.axisScaleDraw(QwtPlot.yLeft).enableComponent(QwtScaleDraw.Labels, False)
+        if start_plotting:
+            self.subscribe()
+            self._plotting = True
+
+    def is_on_screen(self):
+        # False when hidden by "Show Selected", in a collapsed dock, minimized or scrolled
+        # out of view. Such plots keep buffering and catch up in one frame once shown again
+        return self.isVisible() and not self.window().isMinimized() and not self.visibleRegion().isEmpty()
+
+    def set_paused(self, paused):
+        self._drag_origin = None
+        super().set_paused(paused)
+
+    def eventFilter(self, watched, event):
+        # While paused, the mouse wheel zooms around the cursor, dragging pans
+        # and a double click goes back to the latest time window
+        if not self._paused or self._view is None or watched is not self.view.plot_area():
+            return super().eventFilter(watched, event)
+
+        start, end = self._view
+        if event.type() == QEvent.Wheel:
+            self.zoom(self.view.x_at(event.pos().x()), event.angleDelta().y() > 0)
+            return True
+        if event.type() == QEvent.MouseButtonDblClick:
+            self.show_latest()
+            return True
+        if event.type() == QEvent.MouseButtonPress and event.button() == Qt.LeftButton:
+            self._drag_origin = (event.pos().x(), start, end)
+            return True
+        if event.type() == QEvent.MouseMove and self._drag_origin is not None:
+            origin, start, end = self._drag_origin
+            shift = (origin - event.pos().x()) * (end - start) / max(1, self.view.plot_width())
+            self.set_view(start + shift, end + shift)
+            return True
+        if event.type() == QEvent.MouseButtonRelease:
+            self._drag_origin = None
+            return True
+        return super().eventFilter(watched, event)
+
+    def draw_frame(self):
+        frame = self.compute_frame(self.view.plot_width())
+        if frame is None:
+            return
+        start, end, x_data, y_data, y_range = frame
+
+        with tracer.span("replot", "paint"):
+            for trace, trace_y_data in zip(self.traces, y_data):
+                self.view.set_curve_data(trace.curve, x_data, trace_y_data)
+            self.view.set_x_range(start, end)
+            self.update_y_scale(y_range)
+            self.view.refresh()
+
+    def update_y_scale(self, y_range):
+        y_scale = self.update_y_range(y_range)
+        if y_scale is not None:
+            self.view.set_y_range(*y_scale)
 
-        # Initialize data
-        self.x_data = np.arange(0.0, 100.1, 0.5)
+    def show_trace(self, trace_name):
+        self.select_trace(trace_name)
+        for row, trace in enumerate(self.traces):
+            self.view.set_curve_shown(trace.curve, row in self._shown_rows)
+        # The time axis has no labels, the y axis only has some for a single trace
+        self.view.set_labels_shown(False, trace_name != "All")
 
-        self.create_traces()
-        for trace in self.traces:
-            trace.plot.attach(self)
 
-        self._subscriber = None
-        self.timer = None
-        if start_plotting:
-            self._subscriber = rospy.Subscriber(self._topic_name, self._topic_type,
-                                                self.callback, queue_size=1)
+class JointStatesFrames(PlotFrames):
+    TRACES = (("Position", Qt.red),
+              ("Effort", Qt.blue),
+              ("Velocity", Qt.green))
 
-            self.initialize_and_start_timer()
+    def create_history(self):
+        # The joint plots read their (position, effort, velocity) slices of the
+        # source's whole hand buffer
+        self.history = self._source.history
+        self.trace_channels = [(self.joint_name, field) for field in range(len(self.traces))]
 
-    def create_traces(self):
-        raise NotImplementedError("The function create_traces must be implemented")
+    def subscribe(self):
+        self._source.add_consumer(self)
 
-    def callback(self, data):
-        raise NotImplementedError("The function callback must be implemented")
+    def unsubscribe(self):
+        self._source.remove_consumer(self)
 
-    def initialize_and_start_timer(self):
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.timerEvent)
-        self.timer.start()
 
-    def timerEvent(self):
-        # Data moves from left to right:
-        # Shift data array right and assign new value data[0]
-        for trace in self.traces:
-            trace.data = np.concatenate((trace.data[:1], trace.data[:-1]))
-            trace.data[0] = trace.latest_value
-            trace.plot.setData(self.x_data, trace.data)
+class ControlLoopsFrames(PlotFrames):
+    TRACES = (("Set Point", Qt.red),
+              ("Input", Qt.blue),
+              ("dInput/dt", Qt.green),
+              ("Error", Qt.cyan),
+              ("Output", Qt.magenta))
 
-        self.replot()
+    def create_history(self):
+        # The controller state source keeps the history, so it is also
+        # recorded while the control loops tab is not built
+        self.history = self._source.history
+        self.trace_channels = list(range(len(self.traces)))
 
-    def plot_data(self, plot):
-        if plot:
-            self._subscriber = rospy.Subscriber(self._topic_name, self._topic_type,
-                                                self.callback, queue_size=1)
-            if self.timer is None:
-                self.initialize_and_start_timer()
-            else:
-                self.timer.start()
-        elif self._subscriber is not None:
-            self._subscriber.unregister()
-            self.timer.stop()
+    def subscribe(self):
+        self._source.add_consumer(self)
 
-    def show_trace(self, trace_name):
-        for trace in self.traces:
-            if trace_name == trace.name:
-                self.axisScaleDraw(QwtPlot.yLeft).enableComponent(QwtScaleDraw.Labels, True)
-                self.axisAutoScale(QwtPlot.yLeft)
-                trace.plot.attach(self)
-            elif trace_name == "All":
-                self.axisScaleDraw(QwtPlot.yLeft).enableComponent(QwtScaleDraw.Labels, False)
-                trace.plot.attach(self)
-            else:
-                trace.plot.detach()
+    def unsubscribe(self):
+        self._source.remove_consumer(self)
 
 
-class JointStatesDataPlot(GenericDataPlot):
-    def __init__(self, joint_name, topic_name, topic_type):
-        super().__init__(joint_name, topic_name, topic_type, start_plotting=True)
+class MotorStatsFrames(PlotFrames):
+    def create_history(self):
+        # The motor stats tabs share the source's subscription, which parses every
+        # message once into a history per joint, each plot reads the columns of its traces
+        self.history = self._source.history(self.joint_name)
+        self.trace_channels = [self._source.KEYS.index(trace.name) for trace in self.traces]
 
-    def create_traces(self):
-        self.traces = [Trace("Position", Qt.red, self.x_data),
-                       Trace("Effort", Qt.blue, self.x_data),
-                       Trace("Velocity", Qt.green, self.x_data)]
+    def subscribe(self):
+        self._source.add_consumer(self.joint_name, self)
 
-    def callback(self, data):
-        for name, position, velocity, effort in zip(data.name, data.position,
-                                                    data.velocity, data.effort):
-            if name == self.joint_name:
-                self.traces[0].latest_value = position
-                self.traces[1].latest_value = effort
-                self.traces[2].latest_value = velocity
+    def unsubscribe(self):
+        self._source.remove_consumer(self)
 
 
-class ControlLoopsDataPlot(GenericDataPlot):
-    def __init__(self, joint_name, topic_name, topic_type):
-        super().__init__(joint_name, topic_name, topic_type)
+class MotorStats1Frames(MotorStatsFrames):
+    TRACES = (("Strain Gauge Right", Qt.red),
+              ("Strain Gauge Left", Qt.blue),
+              ("Measured PWM", Qt.green),
+              ("Measured Current", Qt.cyan),
+              ("Measured Voltage", Qt.magenta))
 
-    def create_traces(self):
-        self.traces = [Trace("Set Point", Qt.red, self.x_data),
-                       Trace("Input", Qt.blue, self.x_data),
-                       Trace("dInput/dt", Qt.green, self.x_data),
-                       Trace("Error", Qt.cyan, self.x_data),
-                       Trace("Output", Qt.magenta, self.x_data)]
-
-    def callback(self, data):
-        self.traces[0].latest_value = data.set_point
-        self.traces[1].latest_value = data.process_value
-        self.traces[2].latest_value = data.process_value_dot
-        self.traces[3].latest_value = data.error
-        self.traces[4].latest_value = data.command
-
-
-class MotorStatsGenericDataPlot(GenericDataPlot):
-    def __init__(self, joint_name, topic_name, topic_type):
-        super().__init__(joint_name, topic_name, topic_type)
-
-    def callback(self, data):
-        for message in data.status:
-            # Splits the name into parts e.g.
-            # name: "/Right Shadow Hand/Wrist/rh SRDMotor WRJ2"
-            # parts = ['', 'Right Shadow Hand', 'Wrist', 'rh SRDMotor WRJ2']
-            parts = message.name.split('/')
-            if len(parts) == 4:
-                # Splits the 4th part into words & decides if it is a Motor
-                parts = parts[3].split(' ')
-                # Find SRDMotor part andthen use this to locate
-                # the values for the specific joint
-                if len(parts) == 3 and parts[1] == 'SRDMotor':
-                    joint = parts[0] + '_' + parts[2]
-                    if joint in self.joint_name:
-                        for item in message.values:
-                            for trace in range(len(self.traces)):
-                                if item.key == self.traces[trace].name:
-                                    self.traces[trace].latest_value = item.value
-
-
-class MotorStats1DataPlot(MotorStatsGenericDataPlot):
-    def __init__(self, joint_name, topic_name, topic_type):
-        super().__init__(joint_name, topic_name, topic_type)
 
-    def create_traces(self):
-        self.traces = [Trace("Strain Gauge Right", Qt.red, self.x_data),
-                       Trace("Strain Gauge Left", Qt.blue, self.x_data),
-                       Trace("Measured PWM", Qt.green, self.x_data),
-                       Trace("Measured Current", Qt.cyan, self.x_data),
-                       Trace("Measured Voltage", Qt.magenta, self.x_data)]
+class MotorStats2Frames(MotorStatsFrames):
+    TRACES = (("Measured Effort", Qt.red),
+              ("Temperature", Qt.blue),
+              ("Unfiltered position", Qt.green),
+              ("Unfiltered force", Qt.cyan),
+              ("Last Commanded Effort", Qt.magenta),
+              ("Encoder Position", Qt.gray))
 
 
-class MotorStats2DataPlot(MotorStatsGenericDataPlot):
-    def __init__(self, joint_name, topic_name, topic_type):
-        super().__init__(joint_name, topic_name, topic_type)
+class JointStatesDataPlot(JointStatesFrames, GenericDataPlot):
+    def __init__(self, joint_name, source):
+        self._source = source
+        super().__init__(joint_name, source.topic_name, JointState, start_plotting=True)
 
-    def create_traces(self):
-        self.traces = [Trace("Measured Effort", Qt.red, self.x_data),
-                       Trace("Temperature", Qt.blue, self.x_data),
-                       Trace("Unfiltered position", Qt.green, self.x_data),
-                       Trace("Unfiltered force", Qt.cyan, self.x_data),
-                       Trace("Last Commanded Effort", Qt.magenta, self.x_data),
-                       Trace("Encoder Position", Qt.gray, self.x_data)]
 
+class ControlLoopsDataPlot(ControlLoopsFrames, GenericDataPlot):
+    def __init__(self, joint_name, source):
+        self._source = source
+        super().__init__(joint_name, source.topic_name, JointControllerState)
 
-class PalmExtrasAcellDataPlot(GenericDataPlot):
-    def __init__(self, joint_name, topic_name, topic_type):
-        super().__init__(joint_name, topic_name, topic_type)
 
-    def create_traces(self):
-        self.traces = [Trace("Accel X", Qt.red, self.x_data),
-                       Trace("Accel Y", Qt.blue, self.x_data),
-                       Trace("Accel Z", Qt.green, self.x_data)]
+class MotorStatsGenericDataPlot(MotorStatsFrames, GenericDataPlot):
+    def __init__(self, joint_name, source):
+        self._source = source
+        super().__init__(joint_name, source.topic_name, DiagnosticArray)
 
-    def callback(self, data):
-        self.traces[0].latest_value = data.data[0]
-        self.traces[1].latest_value = data.data[1]
-        self.traces[2].latest_value = data.data[2]
 
+class MotorStats1DataPlot(MotorStats1Frames, MotorStatsGenericDataPlot):
+    def __init__(self, joint_name, source):
+        super().__init__(joint_name, source)
 
-class PalmExtrasGyroDataPlot(GenericDataPlot):
-    def __init__(self, joint_name, topic_name, topic_type):
-        super().__init__(joint_name, topic_name, topic_type)
 
-    def create_traces(self):
-        self.traces = [Trace("Gyro X", Qt.cyan, self.x_data),
-                       Trace("Gyro Y", Qt.magenta, self.x_data),
-                       Trace("Gyro Z", Qt.gray, self.x_data)]
+class MotorStats2DataPlot(MotorStats2Frames, MotorStatsGenericDataPlot):
+    def __init__(self, joint_name, source):
+        super().__init__(joint_name, source)
 
-    def callback(self, data):
-        self.traces[0].latest_value = data.data[3]
-        self.traces[1].latest_value = data.data[4]
-        self.traces[2].latest_value = data.data[5]
 
+class PalmExtrasGenericDataPlot(GenericDataPlot):
+    # Columns of the palm extras message plotted by this graph
+    CHANNELS = None
 
-class PalmExtrasADCDataPlot(GenericDataPlot):
-    def __init__(self, joint_name, topic_name, topic_type):
-        super().__init__(joint_name, topic_name, topic_type)
+    def __init__(self, joint_name, source):
+        self._source = source
+        super().__init__(joint_name, source.topic_name, Float64MultiArray)
 
-    def create_traces(self):
-        self.traces = [Trace("ADC0", Qt.red, self.x_data),
-                       Trace("ADC1", Qt.blue, self.x_data),
-                       Trace("ADC2", Qt.green, self.x_data),
-                       Trace("ADC3", Qt.cyan, self.x_data)]
-
-    def callback(self, data):
-        self.traces[0].latest_value = data.data[6]
-        self.traces[1].latest_value = data.data[7]
-        self.traces[2].latest_value = data.data[8]
-        self.traces[3].latest_value = data.data[9]
+    def create_history(self):
+        # The palm extras plots read column slices of the source's shared buffer
+        self.history = self._source.history
+        self.trace_channels = list(self.CHANNELS)
+
+    def subscribe(self):
+        self._source.add_consumer(self)
+
+    def unsubscribe(self):
+        self._source.remove_consumer(self)
+
+
+class PalmExtrasAcellDataPlot(PalmExtrasGenericDataPlot):
+    CHANNELS = range(0, 3)
+    TRACES = (("Accel X", Qt.red),
+              ("Accel Y", Qt.blue),
+              ("Accel Z", Qt.green))
+
+    def __init__(self, joint_name, source):
+        super().__init__(joint_name, source)
+
+
+class PalmExtrasGyroDataPlot(PalmExtrasGenericDataPlot):
+    CHANNELS = range(3, 6)
+    TRACES = (("Gyro X", Qt.cyan),
+              ("Gyro Y", Qt.magenta),
+              ("Gyro Z", Qt.gray))
+
+    def __init__(self, joint_name, source):
+        super().__init__(joint_name, source)
+
+
+class PalmExtrasADCDataPlot(PalmExtrasGenericDataPlot):
+    CHANNELS = range(6, 10)
+    TRACES = (("ADC0", Qt.red),
+              ("ADC1", Qt.blue),
+              ("ADC2", Qt.green),
+              ("ADC3", Qt.cyan))
+
+    def __init__(self, joint_name, source):
+        super().__init__(joint_name, source)
@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import time
+import numpy as np
+import rospy
+
+from rospy.numpy_msg import numpy_msg
+from diagnostic_msgs.msg import DiagnosticArray
+from std_msgs.msg import Float64MultiArray
+from control_msgs.msg import JointControllerState
+
+from sr_data_visualization.ingestion_worker import ingestion
+from sr_data_visualization.raw_messages import JointStateDecoder
+from sr_data_visualization.ring_buffer import RingBuffer, JointRingBuffer, MappedRingBuffer
+from sr_data_visualization.resource_registry import registry
+from sr_data_visualization.span_tracer import tracer
+
+# Seconds of history kept by the buffers, overridden by the ~history_seconds parameter
+DEFAULT_HISTORY_SECONDS = 60.0
+# Megabytes taken by each second of history of a whole hand at full rate: 0.6 of joint states,
+# 1 of the 20 controller states, the rest palm extras and diagnostics
+HISTORY_MEGABYTES_PER_SECOND = 1.7
+# Histories above this size are warned about
+HISTORY_WARNING_MEGABYTES = 1024
+
+# Stamps are stored relative to the first message received by any source,
+# so all the time axes line up and stay in a readable range
+_time_origin = None
+_shared_sources = dict()
+_shared_histories = dict()
+
+
+def message_time(data, receive_time=None):
+    """
+        Header stamp when the message has one, receive time otherwise,
+        in seconds since the first message seen.
+    """
+    global _time_origin
+    header = getattr(data, 'header', None)
+    if header is not None and not header.stamp.is_zero():
+        stamp = header.stamp.to_sec()
+    elif receive_time is not None:
+        stamp = receive_time
+    else:
+        stamp = rospy.get_time()
+    if _time_origin is None:
+        _time_origin = stamp
+    return stamp - _time_origin
+
+
+def set_time_origin(origin=None):
+    # None starts again from the next message seen
+    global _time_origin
+    _time_origin = origin
+
+
+def history_table(history, columns):
+    """
+        Columns of a history, the time included, as used by the bag cache.
+    """
+    table = {'time': history.times()}
+    for channel, column in enumerate(columns):
+        table[column] = history.view(channel)
+    return table
+
+
+def table_history(table, columns):
+    """
+        Read-only history on the columns of a table, mapped from the bag cache, without copying them.
+    """
+    return MappedRingBuffer(table.get('time', np.empty(0)),
+                            {channel: table[column] for channel, column in enumerate(columns)})
+
+
+def history_seconds():
+    return float(rospy.get_param("~history_seconds", DEFAULT_HISTORY_SECONDS))
+
+
+def warn_history_size():
+    megabytes = history_seconds() * HISTORY_MEGABYTES_PER_SECOND
+    if megabytes > HISTORY_WARNING_MEGABYTES:
+        rospy.logwarn("%g seconds of history take about %.1f GB for a whole hand, lower ~history_seconds "
+                      "if memory runs short", history_seconds(), megabytes / 1024)
+
+
+def controller_state_topic(joint_name):
+    return '/sh_' + joint_name.lower() + '_position_controller/state'
+
+
+def shared_source(source_class, topic_name):
+    """
+        Returns the single source of the given type for a topic, creating it on first use,
+        so tabs plotting the same topic share one subscription.
+    """
+    key = (source_class, topic_name)
+    if key not in _shared_sources:
+        _shared_sources[key] = source_class(topic_name)
+    return _shared_sources[key]
+
+
+def shared_history(key, capacity, channels):
+    """
+        Returns the history buffer stored under key, creating it on first use.
+        Buffers outlive the plots reading them, so a tab can release its widgets
+        and be rebuilt later without losing what it had recorded.
+    """
+    if key not in _shared_histories:
+        _shared_histories[key] = RingBuffer(capacity, channels)
+    return _shared_histories[key]
+
+
+def motor_joints(hand_joints, joint_prefix):
+    """
+        Joints with a motor, grouped by graph column. The J1 and J2 joints of the
+        fingers are coupled and driven by a single motor, named J0.
+    """
+    joints = {
+        0: [],
+        1: [],
+        2: [],
+        3: [],
+        4: [],
+        5: []
+    }
+
+    for joint in hand_joints[joint_prefix[:-1]]:
+        if "_THJ" in joint:
+            joints[0].append(joint)
+        elif "_FFJ" in joint:
+            if "J1" in joint:
+                joints[1].append(joint[:-1] + "0")
+            elif "J2" not in joint:
+                joints[1].append(joint)
+        elif "_MFJ" in joint:
+            if "J1" in joint:
+                joints[2].append(joint[:-1] + "0")
+            elif "J2" not in joint:
+                joints[2].append(joint)
+        elif "_RFJ" in joint:
+            if "J1" in joint:
+                joints[3].append(joint[:-1] + "0")
+            elif "J2" not in joint:
+                joints[3].append(joint)
+        elif "_LFJ" in joint:
+            if "J1" in joint:
+                joints[4].append(joint[:-1] + "0")
+            elif "J2" not in joint:
+                joints[4].append(joint)
+        elif "_WRJ" in joint:
+            joints[5].append(joint)
+
+    return joints
+
+
+def hand_joints_of(joint_names):
+    """
+        Joint prefix and joints of the first hand found in a joint list,
+        (None, None) when there is none.
+    """
+    hands = [name.split("_")[0] + "_" for name in joint_names if 'h_' in name]
+    if not hands:
+        return None, None
+    joint_prefix = hands[0]
+    return joint_prefix, {joint_prefix[:-1]: [name for name in joint_names if joint_prefix in name]}
+
+
+def hand_sources(hand_joints, joint_prefix):
+    """
+        Every source of a hand: joint states, diagnostics, palm extras and the
+        controller state of each motor.
+    """
+    sources = [shared_source(JointStatesSource, 'joint_states'),
+               shared_source(DiagnosticsSource, '/diagnostics_agg'),
+               shared_source(PalmExtrasSource, '/' + joint_prefix[:-1] + '/palm_extras')]
+    for joint_names in motor_joints(hand_joints, joint_prefix).values():
+        for joint in joint_names:
+            sources.append(shared_source(ControllerStateSource, controller_state_topic(joint)))
+    return sources
+
+
+class TopicSource():
+    """
+        Subscription to a topic shared by its plots and the session recorder.
+        The topic is subscribed while there is at least one consumer or a recorder.
+    """
+    TOPIC_TYPE = None
+    QUEUE_SIZE = 100
+
+    def __init__(self, topic_name):
+        self.topic_name = topic_name
+        self.recorder = None
+        # Offline sources are filled from a bag and never subscribe
+        self.offline = False
+        self._consumers = []
+        self._subscriber = None
+        # Counters read by the performance table
+        self.messages = 0
+        self.callback_seconds = 0.0
+        self.sequence_dropped = 0
+        self.queue_dropped = 0
+        # Latest header sequence number of each publisher of the topic
+        self._last_seq = dict()
+
+    def add_consumer(self, consumer):
+        if consumer not in self._consumers:
+            self._consumers = self._consumers + [consumer]
+        self._update_subscription()
+
+    def remove_consumer(self, consumer):
+        self._consumers = [known for known in self._consumers if known is not consumer]
+        self._update_subscription()
+
+    def set_recorder(self, recorder):
+        self.recorder = recorder
+        self._update_subscription()
+
+    def set_offline(self, offline):
+        self.offline = offline
+        self._update_subscription()
+
+    def _update_subscription(self):
+        needed = (bool(self._consumers) or self.recorder is not None) and not self.offline
+        if needed and self._subscriber is None:
+            # Messages are decoded and written by the ingestion worker once it is started
+            self._subscriber = registry.subscribe(self.topic_name, self.TOPIC_TYPE,
+                                                  ingestion.handler(self._received, self._queue_full),
+                                                  queue_size=self.QUEUE_SIZE)
+        elif not needed and self._subscriber is not None:
+            registry.unsubscribe(self._subscriber)
+            self._subscriber = None
+
+    def stream_name(self):
+        # Directory of the topic in recorded sessions
+        return self.topic_name.strip('/')
+
+    def reset_history(self, capacity):
+        raise NotImplementedError("The function reset_history must be implemented")
+
+    def tables(self):
+        """
+            History as named tables of columns, to be saved by the bag cache.
+        """
+        raise NotImplementedError("The function tables must be implemented")
+
+    def load_tables(self, tables):
+        raise NotImplementedError("The function load_tables must be implemented")
+
+    def ingest(self, data, stamp):
+        raise NotImplementedError("The function ingest must be implemented")
+
+    def _received(self, data):
+        # Messages still queued when the source was switched to a bag must not be mixed with it
+        if not self.offline:
+            self.callback(data)
+
+    def callback(self, data):
+        start = time.perf_counter()
+        with tracer.span(self.topic_name, "callback"):
+            self.ingest(data, message_time(data))
+        self.count_message(data, time.perf_counter() - start)
+
+    def _queue_full(self):
+        self.queue_dropped += 1
+
+    @property
+    def dropped(self):
+        # Messages dropped by the ingestion queue also leave sequence gaps, they are all that is known of topics
+        # without a header
+        return self.sequence_dropped if self._last_seq else self.queue_dropped
+
+    def count_message(self, data, seconds, message=None):
+        """
+            Counts a message received as data, and decoded as message when that is another object.
+            Gaps in the header sequence of each publisher are messages dropped by the subscriber or
+            the ingestion queue, publishers sharing the topic number their messages independently.
+        """
+        header = getattr(data if message is None else message, 'header', None)
+        if header is not None:
+            publisher = (getattr(data, '_connection_header', None) or {}).get('callerid')
+            last_seq = self._last_seq.get(publisher)
+            if last_seq is not None and header.seq > last_seq + 1:
+                self.sequence_dropped += header.seq - last_seq - 1
+            self._last_seq[publisher] = header.seq
+        self.messages += 1
+        self.callback_seconds += seconds
+
+    def notify_consumers(self):
+        ingestion.notify(self._consumers)
+
+
+class JointStatesSource(TopicSource):
+    """
+        Single subscription to a JointState topic shared by all the joint plots.
+        Each message is decoded once and written, with one vectorized copy, into a
+        [time, joint, field] buffer of the whole hand that the plots read by joint name.
+        The joint layout of the buffer only grows, each message is scattered to the
+        columns of its joints, so publishers with different joint lists can share it.
+        Messages are received serialized and decoded straight into numpy views,
+        genpy deserialization being most of the cost of a 1 kHz hand.
+    """
+    # Field order of the buffer, matching the joint states plot traces
+    FIELDS = ('position', 'effort', 'velocity')
+    TOPIC_TYPE = rospy.AnyMsg
+    SAMPLE_RATE = 1000
+
+    def __init__(self, topic_name='joint_states'):
+        super().__init__(topic_name)
+        self._decoder = JointStateDecoder()
+        self.reset_history(history_seconds() * self.SAMPLE_RATE)
+
+    def reset_history(self, capacity):
+        self.history = JointRingBuffer(capacity, fields=len(self.FIELDS))
+        # Newest values of every joint of the buffer, joints missing from a message keep their last value
+        self._row = np.zeros((0, len(self.FIELDS)))
+        # Row recorded for each message, NaN for the joints it doesn't have
+        self._recorded_row = np.zeros((0, len(self.FIELDS)))
+        self._columns = []
+        self._layouts = dict()
+        self._names = None
+        self._index = None
+
+    def decode(self, data):
+        rows = np.zeros((len(data.name), len(self.FIELDS)))
+        for column, field in enumerate(self.FIELDS):
+            values = getattr(data, field)
+            # JointState allows empty effort or velocity arrays
+            if len(values) == len(data.name):
+                rows[:, column] = values
+        return rows
+
+    def _joints_changed(self, names):
+        # The decoder returns the same list while the names don't change, which makes the check in ingest cheap
+        self._names = names if isinstance(names, list) else list(names)
+        # Publishers with different joint lists alternate between a few layouts, each set up once
+        key = tuple(self._names)
+        if key not in self._layouts:
+            self._layouts[key] = self.history.joint_columns(self._names)
+            if self.history.channels > self._row.shape[0]:
+                row = np.zeros((self.history.channels, len(self.FIELDS)))
+                row[:self._row.shape[0]] = self._row
+                self._row = row
+                self._recorded_row = np.full(row.shape, np.nan)
+                # All the joints seen are recorded in one stream, the recorder adds the new columns
+                self._columns = [name + '/' + field for name in self.history.joint_names for field in self.FIELDS]
+        self._index = self._layouts[key]
+
+    def tables(self):
+        table = {'time': self.history.times()}
+        for name in self.history.joint_names:
+            for field_index, field in enumerate(self.FIELDS):
+                table[name + '.' + field] = self.history.view((name, field_index))
+        return {'': table}
+
+    def load_tables(self, tables):
+        # The plots read the (joint name, field index) channels of the mapped columns
+        table = tables.get('', {})
+        columns = dict()
+        for column, values in table.items():
+            if column != 'time':
+                name, field = column.rsplit('.', 1)
+                columns[(name, self.FIELDS.index(field))] = values
+        self.reset_history(1)
+        self.history = MappedRingBuffer(table.get('time', np.empty(0)), columns)
+
+    def callback(self, data):
+        start = time.perf_counter()
+        with tracer.span(self.topic_name, "callback"):
+            message = self._decoder.message_of(data)
+            self.ingest(message, message_time(message))
+        self.count_message(data, time.perf_counter() - start, message)
+
+    def ingest(self, data, stamp):
+        # Messages read from a bag, or received while another typed subscription exists, are JointState,
+        # the others are RawJointState
+        if data.name is not self._names and data.name != self._names:
+            self._joints_changed(data.name)
+
+        rows = self.decode(data)
+        self._row[self._index] = rows
+        self.history.append(stamp, self._row)
+        if self.recorder is not None:
+            self._recorded_row.fill(np.nan)
+            self._recorded_row[self._index] = rows
+            self.recorder.record(self.stream_name(), self._columns, stamp, self._recorded_row)
+        self.notify_consumers()
+
+
+class ControllerStateSource(TopicSource):
+    """
+        Subscription to the state of one joint position controller, shared by its
+        control loops plot and the session recorder.
+    """
+    FIELDS = ('set_point', 'process_value', 'process_value_dot', 'error', 'command')
+    TOPIC_TYPE = JointControllerState
+    SAMPLE_RATE = 1000
+
+    def __init__(self, topic_name):
+        super().__init__(topic_name)
+        self._values = np.zeros(len(self.FIELDS))
+        self.reset_history(history_seconds() * self.SAMPLE_RATE)
+
+    def reset_history(self, capacity):
+        self.history = RingBuffer(capacity, len(self.FIELDS))
+
+    def tables(self):
+        return {'': history_table(self.history, self.FIELDS)}
+
+    def load_tables(self, tables):
+        self.history = table_history(tables.get('', {}), self.FIELDS)
+
+    def ingest(self, data, stamp):
+        values = self._values
+        values[:] = (data.set_point, data.process_value, data.process_value_dot, data.error, data.command)
+        self.history.append(stamp, values)
+        if self.recorder is not None:
+            self.recorder.record(self.stream_name(), self.FIELDS, stamp, values)
+        self.notify_consumers()
+
+
+class DiagnosticsSource(TopicSource):
+    """
+        Single subscription to the aggregated diagnostics shared by the motor stats plots.
+        Each message is parsed once into a (joint, key) -> value index, from which the
+        motor stats of every joint are appended to a history per joint.
+    """
+    # Motor values plotted by the motor stats tabs, in history column order
+    KEYS = ("Strain Gauge Right", "Strain Gauge Left", "Measured PWM", "Measured Current", "Measured Voltage",
+            "Measured Effort", "Temperature", "Unfiltered position", "Unfiltered force", "Last Commanded Effort",
+            "Encoder Position")
+    TOPIC_TYPE = DiagnosticArray
+    QUEUE_SIZE = 10
+    _key_column = {key: column for column, key in enumerate(KEYS)}
+    # Diagnostics are aggregated at a few Hz
+    SAMPLE_RATE = 10
+
+    def __init__(self, topic_name='/diagnostics_agg'):
+        super().__init__(topic_name)
+        self._consumers = dict()
+        self._joint_of_status = dict()
+        # Values recorded for each joint, fixed the first time the joint is seen
+        self._recorded_keys = dict()
+        self.reset_history(history_seconds() * self.SAMPLE_RATE)
+
+    def reset_history(self, capacity):
+        self._capacity = capacity
+        self._histories = dict()
+        self._latest = dict()
+
+    def tables(self):
+        return {joint: history_table(history, self.KEYS) for joint, history in self._histories.items()}
+
+    def load_tables(self, tables):
+        self.reset_history(1)
+        for joint, table in tables.items():
+            self._histories[joint] = table_history(table, self.KEYS)
+            self._latest[joint] = np.zeros(len(self.KEYS))
+
+    def history(self, joint_name):
+        if joint_name not in self._histories:
+            self._histories[joint_name] = RingBuffer(self._capacity, len(self.KEYS))
+            # Values missing from a message keep their previous value
+            self._latest[joint_name] = np.zeros(len(self.KEYS))
+        return self._histories[joint_name]
+
+    def add_consumer(self, joint_name, consumer):
+        self._consumers[consumer] = joint_name
+        self._update_subscription()
+
+    def remove_consumer(self, consumer):
+        self._consumers.pop(consumer, None)
+        self._update_subscription()
+
+    def _status_joint(self, status_name):
+        # Status names are the same in every message, so they are only split once, e.g.
+        # name: "/Right Shadow Hand/Wrist/rh SRDMotor WRJ2" -> joint: "rh_WRJ2"
+        if status_name not in self._joint_of_status:
+            joint = None
+            parts = status_name.split('/')
+            if len(parts) == 4:
+                parts = parts[3].split(' ')
+                if len(parts) == 3 and parts[1] == 'SRDMotor':
+                    joint = parts[0] + '_' + parts[2]
+            self._joint_of_status[status_name] = joint
+        return self._joint_of_status[status_name]
+
+    def decode(self, data):
+        index = dict()
+        for status in data.status:
+            joint = self._status_joint(status.name)
+            if joint is None:
+                continue
+            for item in status.values:
+                try:
+                    index[(joint, item.key)] = float(item.value)
+                except ValueError:
+                    pass
+        return index
+
+    def record(self, stamp, index):
+        values = dict()
+        for (joint, key), value in index.items():
+            values.setdefault(joint, dict())[key] = value
+        for joint, joint_values in values.items():
+            if joint not in self._recorded_keys:
+                self._recorded_keys[joint] = sorted(joint_values)
+            keys = self._recorded_keys[joint]
+            self.recorder.record(self.stream_name() + '/' + joint, keys, stamp,
+                                 [joint_values.get(key, np.nan) for key in keys])
+
+    def ingest(self, data, stamp):
+        index = self.decode(data)
+        if self.recorder is not None:
+            self.record(stamp, index)
+
+        updated = set()
+        for (joint, key), value in index.items():
+            if key in self._key_column:
+                if joint not in updated:
+                    self.history(joint)
+                    updated.add(joint)
+                self._latest[joint][self._key_column[key]] = value
+        for joint in updated:
+            self._histories[joint].append(stamp, self._latest[joint])
+        ingestion.notify([consumer for consumer, joint_name in list(self._consumers.items()) if joint_name in updated])
+
+
+class PalmExtrasSource(TopicSource):
+    """
+        Single subscription to the palm extras shared by the accelerometer, gyro and ADC plots.
+        Messages are received as numpy arrays and written once into a 10 channel buffer,
+        each plot reads its own column slice of it.
+    """
+    CHANNELS = 10
+    COLUMNS = ('accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z', 'adc0', 'adc1', 'adc2', 'adc3')
+    # numpy_msg deserializes data.data as a view on the message buffer
+    TOPIC_TYPE = numpy_msg(Float64MultiArray)
+    SAMPLE_RATE = 1000
+
+    def __init__(self, topic_name):
+        super().__init__(topic_name)
+        self.reset_history(history_seconds() * self.SAMPLE_RATE)
+
+    def reset_history(self, capacity):
+        self.history = RingBuffer(capacity, self.CHANNELS)
+
+    def tables(self):
+        return {'': history_table(self.history, self.COLUMNS)}
+
+    def load_tables(self, tables):
+        self.history = table_history(tables.get('', {}), self.COLUMNS)
+
+    def ingest(self, data, stamp):
+        # Messages read from a bag are not numpy_msg, their data is a tuple
+        values = np.asarray(data.data)
+        if values.size < self.CHANNELS:
+            return
+        self.history.append(stamp, values[:self.CHANNELS])
+        if self.recorder is not None:
+            self.recorder.record(self.stream_name(), self.COLUMNS, stamp, values[:self.CHANNELS])
+        self.notify_consumers()
@@ -16,6 +16,7 @@
 
 from __future__ import absolute_import
 
+import rospy
 from python_qt_binding.QtWidgets import (
     QWidget,
     QGridLayout,
@@ -23,8 +24,25 @@ from python_qt_binding.QtWidgets import (
 )
 
 from sr_data_visualization.joint_graph_widget import JointGraph
+from sr_data_visualization.joint_grid import (
+    JointGridCanvas,
+    JointStatesCell,
+    ControlLoopsCell,
+    MotorStats1Cell,
+    MotorStats2Cell
+)
+from sr_data_visualization.data_sources import (
+    JointStatesSource,
+    ControllerStateSource,
+    DiagnosticsSource,
+    PalmExtrasSource,
+    controller_state_topic,
+    motor_joints,
+    shared_source
+)
 
 from sr_data_visualization.data_plot import (
+    GenericDataPlot,
     JointStatesDataPlot,
     ControlLoopsDataPlot,
     MotorStats1DataPlot,
@@ -43,10 +61,46 @@ from sr_data_visualization.tab_options import (
     PalmExtrasADCTabOptions
 )
 
-from sensor_msgs.msg import JointState
-from control_msgs.msg import JointControllerState
-from diagnostic_msgs.msg import DiagnosticArray
-from std_msgs.msg import Float64MultiArray
+
+class LazyDataTab(QWidget):
+    """
+        Placeholder added to the tab container. The data tab and its plots are only
+        built the first time the tab is shown, and can be released while it is hidden.
+    """
+    def __init__(self, tab_name, tab_class, hand_joints, joint_prefix, parent=None):
+        super().__init__(parent=parent)
+
+        self.tab_name = tab_name
+        self.hidden_since = None
+        self.data_tab = None
+        self._tab_class = tab_class
+        self._hand_joints = hand_joints
+        self._joint_prefix = joint_prefix
+
+        self.layout = QVBoxLayout(self)
+        self.layout.setContentsMargins(0, 0, 0, 0)
+
+    def is_built(self):
+        return self.data_tab is not None
+
+    def build(self):
+        if self.data_tab is None:
+            self.data_tab = self._tab_class(self.tab_name, self._hand_joints, self._joint_prefix, parent=self)
+            self.layout.addWidget(self.data_tab)
+        return self.data_tab
+
+    def release(self):
+        # Plot histories are kept by the data sources, only the widgets go away
+        if self.data_tab is not None:
+            self.layout.removeWidget(self.data_tab)
+            self.data_tab.setParent(None)
+            self.data_tab.deleteLater()
+            self.data_tab = None
+
+    def graphs(self):
+        if self.data_tab is None:
+            return []
+        return self.data_tab.plots()
 
 
 class GenericDataTab(QWidget):
@@ -58,6 +112,10 @@ class GenericDataTab(QWidget):
         self.tab_name = tab_name
         self.hand_joints = hand_joints
         self.joint_prefix = joint_prefix
+        # Joint grids are drawn as one plot widget per joint ("widgets") or all on one canvas ("canvas")
+        self.grid_canvas = None
+        if rospy.get_param("~joint_grid", "widgets") == "canvas":
+            self.grid_canvas = JointGridCanvas()
         self.init_ui()
         self.create_full_tab()
 
@@ -83,6 +141,24 @@ class GenericDataTab(QWidget):
     def optional_button_connections(self):
         raise NotImplementedError("The function optional_button_connections must be implemented")
 
+    def add_joint_graph(self, joint, plot_class, cell_class, source, row, column):
+        if self.grid_canvas is not None:
+            self.grid_canvas.add_cell(cell_class(joint, source, self.grid_canvas, row, column))
+        else:
+            graph = JointGraph(joint, plot_class(joint, source), row, column)
+            self.graphs_layout.addWidget(graph, row, column)
+
+    def add_graphs_layout(self):
+        if self.grid_canvas is not None:
+            self.graphs_layout.addWidget(self.grid_canvas, 0, 0)
+        self.layout.addLayout(self.graphs_layout)
+
+    def plots(self):
+        plots = self.findChildren(GenericDataPlot)
+        if self.grid_canvas is not None:
+            plots += self.grid_canvas.cells
+        return plots
+
     def generic_button_connections(self):
         self.tab_options.all_button.toggled.connect(lambda: self.radio_button_selected("All"))
         self.tab_options.show_seleted_button.clicked.connect(lambda: self.check_button_selected("Selection"))
@@ -91,8 +167,18 @@ class GenericDataTab(QWidget):
     def radio_button_selected(self, radio_button):
         for child in self.findChildren(JointGraph):
             child.joint_plot.show_trace(radio_button)
+        if self.grid_canvas is not None:
+            for cell in self.grid_canvas.cells:
+                cell.show_trace(radio_button)
 
     def check_button_selected(self, selection_type):
+        if self.grid_canvas is not None:
+            if selection_type == "Selection":
+                self.grid_canvas.show_selected()
+            else:
+                self.grid_canvas.reset()
+            return
+
         index_to_display = 0
         for child in self.findChildren(JointGraph):
             if selection_type == "Selection":
@@ -120,6 +206,7 @@ class JointStatesDataTab(GenericDataTab):
         self.layout.addWidget(self.tab_options)
 
     def create_all_graphs(self):
+        self.source = shared_source(JointStatesSource, 'joint_states')
         joints = {
             0: [],
             1: [],
@@ -147,12 +234,10 @@ class JointStatesDataTab(GenericDataTab):
         for column, joint_names in joints.items():
             row = 0
             for joint in joint_names:
-                data_plot = JointStatesDataPlot(joint, 'joint_states', JointState)
-                graph = JointGraph(joint, data_plot, row, column)
-                self.graphs_layout.addWidget(graph, row, column)
+                self.add_joint_graph(joint, JointStatesDataPlot, JointStatesCell, self.source, row, column)
                 row += 1
 
-        self.layout.addLayout(self.graphs_layout)
+        self.add_graphs_layout()
 
     def optional_button_connections(self):
         self.tab_options.position_button.toggled.connect(lambda: self.radio_button_selected("Position"))
@@ -165,61 +250,26 @@ class MotorGroupsDataTab(GenericDataTab):
         super().__init__(tab_name, hand_joints, joint_prefix, parent)
 
     def create_all_graphs(self):
-        joints = {
-            0: [],
-            1: [],
-            2: [],
-            3: [],
-            4: [],
-            5: []
-        }
-
-        for joint in self.hand_joints[self.joint_prefix[:-1]]:
-            if "_THJ" in joint:
-                joints[0].append(joint)
-            elif "_FFJ" in joint:
-                if "J1" in joint:
-                    joints[1].append(joint[:-1] + "0")
-                elif "J2" not in joint:
-                    joints[1].append(joint)
-            elif "_MFJ" in joint:
-                if "J1" in joint:
-                    joints[2].append(joint[:-1] + "0")
-                elif "J2" not in joint:
-                    joints[2].append(joint)
-            elif "_RFJ" in joint:
-                if "J1" in joint:
-                    joints[3].append(joint[:-1] + "0")
-                elif "J2" not in joint:
-                    joints[3].append(joint)
-            elif "_LFJ" in joint:
-                if "J1" in joint:
-                    joints[4].append(joint[:-1] + "0")
-                elif "J2" not in joint:
-                    joints[4].append(joint)
-            elif "_WRJ" in joint:
-                joints[5].append(joint)
+        joints = motor_joints(self.hand_joints, self.joint_prefix)
 
+        diagnostics_source = shared_source(DiagnosticsSource, '/diagnostics_agg')
         for column, joint_names in joints.items():
             row = 0
             if joint_names is not None:
                 for joint in joint_names:
-                    control_topic_name = '/sh_' + joint.lower() + '_position_controller/state'
-                    motor_topic_name = '/diagnostics_agg'
                     if self.tab_name == "Control Loops":
-                        data_plot = ControlLoopsDataPlot(joint, control_topic_name,
-                                                         JointControllerState)
+                        controller_source = shared_source(ControllerStateSource, controller_state_topic(joint))
+                        self.add_joint_graph(joint, ControlLoopsDataPlot, ControlLoopsCell, controller_source,
+                                             row, column)
                     elif self.tab_name == "Motor Stats 1":
-                        data_plot = MotorStats1DataPlot(joint, motor_topic_name,
-                                                        DiagnosticArray)
+                        self.add_joint_graph(joint, MotorStats1DataPlot, MotorStats1Cell, diagnostics_source,
+                                             row, column)
                     elif self.tab_name == "Motor Stats 2":
-                        data_plot = MotorStats2DataPlot(joint, motor_topic_name,
-                                                        DiagnosticArray)
-                    graph = JointGraph(joint, data_plot, row, column)
-                    self.graphs_layout.addWidget(graph, row, column)
+                        self.add_joint_graph(joint, MotorStats2DataPlot, MotorStats2Cell, diagnostics_source,
+                                             row, column)
                     row += 1
 
-        self.layout.addLayout(self.graphs_layout)
+        self.add_graphs_layout()
 
 
 class ControlLoopsDataTab(MotorGroupsDataTab):
@@ -276,13 +326,12 @@ class PalmExtrasDataTab(GenericDataTab):
         super().__init__(tab_name, hand_joints, joint_prefix, parent)
 
     def create_full_tab(self):
-        topic_name = '/' + self.joint_prefix[:-1] + '/palm_extras'
-        topic_type = Float64MultiArray
+        source = shared_source(PalmExtrasSource, '/' + self.joint_prefix[:-1] + '/palm_extras')
 
         self.accel_tab_options = PalmExtrasAcellTabOptions(self.tab_name)
         self.layout.addWidget(self.accel_tab_options)
 
-        self.accel_data_plot = PalmExtrasAcellDataPlot("Acceleration", topic_name, topic_type)
+        self.accel_data_plot = PalmExtrasAcellDataPlot("Acceleration", source)
         accel_graph = JointGraph("Acceleration", self.accel_data_plot, 0, 0, check_box=False)
         self.layout.addWidget(accel_graph)
 
@@ -291,14 +340,14 @@ class PalmExtrasDataTab(GenericDataTab):
         self.gyro_tab_options = PalmExtrasGyroTabOptions(self.tab_name)
         self.layout.addWidget(self.gyro_tab_options)
 
-        self.gyro_data_plot = PalmExtrasGyroDataPlot("Gyrometer", topic_name, topic_type)
+        self.gyro_data_plot = PalmExtrasGyroDataPlot("Gyrometer", source)
         gyro_graph = JointGraph("Gyrometer", self.gyro_data_plot, 1, 0, check_box=False)
         self.layout.addWidget(gyro_graph)
 
         self.adc_tab_options = PalmExtrasADCTabOptions(self.tab_name)
         self.layout.addWidget(self.adc_tab_options)
 
-        self.adc_data_plot = PalmExtrasADCDataPlot("ADC", topic_name, topic_type)
+        self.adc_data_plot = PalmExtrasADCDataPlot("ADC", source)
         adc_graph = JointGraph("ADC", self.adc_data_plot, 1, 0, check_box=False)
         self.layout.addWidget(adc_graph)
 
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from collections import deque
+
+import numpy as np
+
+
+def _concatenated_ranges(starts, ends):
+    # np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)]) without the loop
+    lengths = ends - starts
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + np.arange(offsets.size) - offsets
+
+
+class SlidingExtrema():
+    """
+        Minimum and maximum of a sliding window of keyed values, kept in two monotonic
+        deques so both are read in O(1) and each value is pushed and expired once.
+        Keys must not decrease; pushing again under the latest key must only widen
+        its range, as merging more samples into a bin does.
+    """
+    def __init__(self):
+        self._lows = deque()
+        self._highs = deque()
+
+    def clear(self):
+        self._lows.clear()
+        self._highs.clear()
+
+    def push(self, key, low, high):
+        lows, highs = self._lows, self._highs
+        while lows and lows[-1][1] >= low:
+            lows.pop()
+        lows.append((key, low))
+        while highs and highs[-1][1] <= high:
+            highs.pop()
+        highs.append((key, high))
+
+    def expire(self, oldest_key):
+        lows, highs = self._lows, self._highs
+        while lows and lows[0][0] < oldest_key:
+            lows.popleft()
+        while highs and highs[0][0] < oldest_key:
+            highs.popleft()
+
+    def extrema(self):
+        if not self._lows:
+            return None
+        return self._lows[0][1], self._highs[0][1]
+
+
+class EnvelopeDecimator():
+    """
+        Min/max envelope of some channels of a RingBuffer with one bin per pixel column
+        of the time window, so a curve never has more than two points per column whatever
+        the window length. Bins are aligned to absolute time, each frame only reduces the
+        samples received since the previous one.
+    """
+    def __init__(self, history, channels, window, pixels):
+        self._history = history
+        self._channels = list(channels)
+        self._window = None
+        self._pixels = None
+        self.set_geometry(window, pixels)
+
+    def set_geometry(self, window, pixels):
+        window = float(window)
+        pixels = max(1, int(pixels))
+        if window == self._window and pixels == self._pixels:
+            return
+        self._window = window
+        self._pixels = pixels
+        self._bin_width = window / pixels
+        # Two spare slots for the partially filled bins at both ends of the window
+        self._slots = pixels + 2
+        self._bin_id = np.full(self._slots, np.iinfo(np.int64).min, dtype=np.int64)
+        self._bin_min = np.zeros((len(self._channels), self._slots))
+        self._bin_max = np.zeros((len(self._channels), self._slots))
+        self._x_data = np.zeros(2 * self._slots)
+        self._y_data = np.zeros((len(self._channels), 2 * self._slots))
+        # Extrema of the bins of each channel over the window, for the y axis
+        self._extrema = [SlidingExtrema() for _ in self._channels]
+        self.reset()
+
+    def reset(self):
+        # The next update rebuilds the bins from the whole window
+        self._consumed = None
+
+    def update(self):
+        history = self._history
+        latest_stamp = history.latest_stamp()
+        if latest_stamp is None:
+            return
+        total = history.total
+        if self._consumed is None or total - self._consumed > len(history):
+            self._bin_id.fill(np.iinfo(np.int64).min)
+            for extrema in self._extrema:
+                extrema.clear()
+            count = history.count_since(latest_stamp - self._window - self._bin_width)
+        else:
+            count = total - self._consumed
+        self._consumed = total
+
+        for start, end in history.ranges(count):
+            self._reduce(start, end)
+
+    def _reduce(self, start, end):
+        stamps, _ = self._history.segment(None, start, end)
+        ids = np.floor_divide(stamps, self._bin_width).astype(np.int64)
+        # Samples older than the bins still kept would overwrite newer ones
+        skip = np.searchsorted(ids, ids[-1] - self._slots, side='right')
+        if skip:
+            ids = ids[skip:]
+            start += skip
+        firsts = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+        firsts = np.concatenate(([0], firsts))
+        bin_ids = ids[firsts]
+        slots = bin_ids % self._slots
+        fresh = self._bin_id[slots] != bin_ids
+
+        for row, channel in enumerate(self._channels):
+            _, values = self._history.segment(channel, start, end)
+            if values.size == 0:
+                continue
+            lows = np.minimum.reduceat(values, firsts)
+            highs = np.maximum.reduceat(values, firsts)
+            self._bin_min[row, slots] = np.where(fresh, lows, np.minimum(self._bin_min[row, slots], lows))
+            self._bin_max[row, slots] = np.where(fresh, highs, np.maximum(self._bin_max[row, slots], highs))
+            # Usually one or two bins per frame
+            extrema = self._extrema[row]
+            for bin_id, low, high in zip(bin_ids.tolist(), self._bin_min[row, slots].tolist(),
+                                         self._bin_max[row, slots].tolist()):
+                extrema.push(bin_id, low, high)
+        self._bin_id[slots] = bin_ids
+
+    def extrema(self, rows):
+        """
+            Minimum and maximum over the window of the given channel rows, None before any data.
+        """
+        latest_stamp = self._history.latest_stamp()
+        if latest_stamp is None:
+            return None
+        oldest_bin = int(latest_stamp // self._bin_width) - self._pixels
+        ranges = []
+        for row in rows:
+            self._extrema[row].expire(oldest_bin)
+            extrema = self._extrema[row].extrema()
+            if extrema is not None:
+                ranges.append(extrema)
+        if not ranges:
+            return None
+        return min(low for low, _ in ranges), max(high for _, high in ranges)
+
+    def curves(self):
+        """
+            Returns the x data and the y data of each channel, as views of buffers
+            owned by the decimator that stay valid until the next call.
+        """
+        latest_stamp = self._history.latest_stamp()
+        if latest_stamp is None:
+            return self._x_data[:0], [y_data[:0] for y_data in self._y_data]
+
+        # Short or slow windows are drawn sample by sample
+        count = self._history.count_since(latest_stamp - self._window)
+        if count <= self._x_data.size:
+            return self._raw_curves(count)
+
+        last = int(latest_stamp // self._bin_width)
+        bin_ids = np.arange(last - self._pixels, last + 1)
+        slots = bin_ids % self._slots
+        kept = self._bin_id[slots] == bin_ids
+        bin_ids = bin_ids[kept]
+        slots = slots[kept]
+
+        size = 2 * slots.size
+        centres = (bin_ids + 0.5) * self._bin_width
+        self._x_data[0:size:2] = centres
+        self._x_data[1:size:2] = centres
+        for row in range(len(self._channels)):
+            self._y_data[row, 0:size:2] = self._bin_min[row, slots]
+            self._y_data[row, 1:size:2] = self._bin_max[row, slots]
+        return self._x_data[:size], [y_data[:size] for y_data in self._y_data]
+
+    def _raw_curves(self, count):
+        size = 0
+        for start, end in self._history.ranges(count):
+            stamps, _ = self._history.segment(None, start, end)
+            self._x_data[size:size + stamps.size] = stamps
+            for row, channel in enumerate(self._channels):
+                _, values = self._history.segment(channel, start, end)
+                if values.size:
+                    self._y_data[row, size:size + values.size] = values
+            size += stamps.size
+        return self._x_data[:size], [y_data[:size] for y_data in self._y_data]
+
+
+class MinMaxPyramid():
+    """
+        Multi-resolution min/max summary of some channels of a RingBuffer, used to zoom
+        and pan through the whole history. Level k holds one bin per BASE_SIZE * FACTOR**k
+        samples, numbered like the samples so bins stay valid as the buffer wraps around.
+        Levels are caught up lazily with reshapes of the samples received since the last
+        query, and a query reads the level with about one bin per pixel column, so its cost
+        is a binary search plus the number of pixels, whatever the zoom.
+    """
+    BASE_SIZE = 8
+    FACTOR = 4
+
+    def __init__(self, history, channels):
+        self._history = history
+        self._channels = list(channels)
+        self._sizes = []
+        size = self.BASE_SIZE
+        while size <= max(history.capacity // 2, self.BASE_SIZE):
+            self._sizes.append(size)
+            size *= self.FACTOR
+        self._slots = [history.capacity // size + 2 for size in self._sizes]
+        self._min = [np.zeros((len(self._channels), slots)) for slots in self._slots]
+        self._max = [np.zeros((len(self._channels), slots)) for slots in self._slots]
+        # Number of completed bins of each level
+        self._done = [0] * len(self._sizes)
+
+    def update(self):
+        first, total = self._history.absolute_range()
+        complete = total
+        for level, size in enumerate(self._sizes):
+            complete //= self.BASE_SIZE if level == 0 else self.FACTOR
+            start = max(self._done[level], -(-first // size))
+            if complete > start:
+                self._reduce(level, start, complete)
+            self._done[level] = max(self._done[level], complete)
+
+    def _reduce(self, level, start, end):
+        slots = np.arange(start, end) % self._slots[level]
+        if level == 0:
+            children = np.arange(start * self.BASE_SIZE, end * self.BASE_SIZE) % self._history.capacity
+            width = self.BASE_SIZE
+        else:
+            children = np.arange(start * self.FACTOR, end * self.FACTOR) % self._slots[level - 1]
+            width = self.FACTOR
+
+        for row, channel in enumerate(self._channels):
+            if level == 0:
+                column = self._history.column(channel)
+                if column.size == 0:
+                    continue
+                lows = highs = column.take(children).reshape(-1, width)
+            else:
+                lows = self._min[level - 1][row].take(children).reshape(-1, width)
+                highs = self._max[level - 1][row].take(children).reshape(-1, width)
+            self._min[level][row, slots] = lows.min(axis=1)
+            self._max[level][row, slots] = highs.max(axis=1)
+
+    def _gather(self, level, row, numbers):
+        # Min and max of the given bins of a level, level -1 being the samples themselves
+        if level < 0:
+            column = self._history.column(self._channels[row])
+            if column.size == 0:
+                return np.zeros(numbers.size), np.zeros(numbers.size)
+            values = column.take(numbers % self._history.capacity)
+            return values, values
+        slots = numbers % self._slots[level]
+        return self._min[level][row].take(slots), self._max[level][row].take(slots)
+
+    def query(self, start_time, end_time, pixels):
+        """
+            Envelope of the samples stamped between start_time and end_time with one min/max
+            pair per pixel column. Returns the x data and the y data of each channel.
+        """
+        self.update()
+        rows = range(len(self._channels))
+        pixels = max(1, int(pixels))
+        edge_times = np.linspace(start_time, end_time, pixels + 1)
+        edges = self._history.index_at(edge_times)
+        samples = edges[-1] - edges[0]
+        if samples <= 2 * pixels:
+            numbers = np.arange(edges[0], edges[-1])
+            return self._history.stamps_at(numbers), [self._gather(-1, row, numbers)[0] for row in rows]
+
+        level = -1
+        for index, size in enumerate(self._sizes):
+            if size <= samples / pixels:
+                level = index
+        size = self._sizes[level] if level >= 0 else 1
+        computed = self._done[level] if level >= 0 else self._history.total
+        lows = np.full((len(self._channels), pixels), np.inf)
+        highs = np.full((len(self._channels), pixels), -np.inf)
+
+        # Whole bins inside each pixel column, the partial bins at both ends of each
+        # column and the samples newer than the last computed bin are read raw
+        firsts = np.minimum(-(-edges[:-1] // size), computed)
+        lasts = np.maximum(np.minimum(edges[1:] // size, computed), firsts)
+        filled = lasts > firsts
+        if filled.any():
+            numbers = np.arange(firsts[filled][0], lasts[filled][-1])
+            # Bins between two columns belong to neither, so each column is reduced on its own span
+            bounds = np.stack((firsts[filled], lasts[filled]), axis=1).ravel() - numbers[0]
+            for row in rows:
+                bin_min, bin_max = self._gather(level, row, numbers)
+                lows[row, filled] = np.minimum.reduceat(np.append(bin_min, np.inf), bounds)[0::2]
+                highs[row, filled] = np.maximum.reduceat(np.append(bin_max, -np.inf), bounds)[0::2]
+        heads = (edges[:-1], np.minimum(firsts * size, edges[1:]))
+        tails = (np.maximum(lasts * size, edges[:-1]), edges[1:])
+        starts = np.stack((heads[0], tails[0]), axis=1).ravel()
+        ends = np.maximum(np.stack((heads[1], tails[1]), axis=1).ravel(), starts)
+        self._reduce_raw(_concatenated_ranges(starts, ends), edges, lows, highs)
+
+        kept = np.isfinite(lows[0])
+        centres = 0.5 * (edge_times[:-1] + edge_times[1:])[kept]
+        x_data = np.repeat(centres, 2)
+        y_data = []
+        for row in rows:
+            trace = np.empty(x_data.size)
+            trace[0::2] = lows[row, kept]
+            trace[1::2] = highs[row, kept]
+            y_data.append(trace)
+        return x_data, y_data
+
+    def _reduce_raw(self, numbers, edges, lows, highs):
+        if numbers.size == 0:
+            return
+        pixels = np.searchsorted(edges, numbers, side='right') - 1
+        firsts = np.concatenate(([0], np.flatnonzero(np.diff(pixels)) + 1))
+        columns = pixels[firsts]
+        for row in range(len(self._channels)):
+            values = self._gather(-1, row, numbers)[0]
+            lows[row, columns] = np.minimum(lows[row, columns], np.minimum.reduceat(values, firsts))
+            highs[row, columns] = np.maximum(highs[row, columns], np.maximum.reduceat(values, firsts))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import queue
+import threading
+import time
+
+import rospy
+
+
+class _QueuedCallback():
+    """
+        Subscriber callback queuing the message for the ingestion worker. It compares
+        equal to the function it wraps, so the registry still spots duplicate subscriptions.
+    """
+    __slots__ = ('_worker', '_function', '_dropped')
+
+    def __init__(self, worker, function, dropped=None):
+        self._worker = worker
+        self._function = function
+        self._dropped = dropped
+
+    def __call__(self, data):
+        if not self._worker.submit(self._function, data) and self._dropped is not None:
+            self._dropped()
+
+    def __eq__(self, other):
+        return self._function == getattr(other, '_function', other)
+
+    def __hash__(self):
+        return hash(self._function)
+
+
+class IngestionWorker():
+    """
+        Single thread doing the decoding and buffer writes of every subscription of the
+        visualizers. Subscriber callbacks only queue their message, and once per frame the
+        consumers that received data are handed in one batch to the delivery function the
+        worker was started with, which runs them on the GUI thread. Buffers are written
+        while holding lock, which the GUI thread takes to read them.
+        While no visualizer has started the worker, messages are handled on the subscriber
+        threads as before, which is what the headless logger relies on: this module and
+        the sources don't depend on Qt, the delivery to the GUI lives in batch_delivery.
+    """
+    MAX_QUEUED_MESSAGES = 10000
+    DEFAULT_FPS = 30
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._queue = queue.Queue(self.MAX_QUEUED_MESSAGES)
+        self._thread = None
+        # Set to tell the worker thread to return, it may still be finishing a message
+        self._stopping = threading.Event()
+        self._users = 0
+        self._period = 1.0 / self.DEFAULT_FPS
+        self._pending = set()
+        self._delivery = None
+        # Messages dropped because the queue was full, they also show up as sequence gaps in the sources
+        self.dropped = 0
+        self.batches = 0
+
+    def handler(self, function, dropped=None):
+        """
+            Subscriber callback queuing its messages for function, dropped is called
+            for each message that did not fit in the queue.
+        """
+        return _QueuedCallback(self, function, dropped)
+
+    def is_running(self):
+        return self._thread is not None
+
+    def start(self, delivery, fps=DEFAULT_FPS):
+        """
+            Starts handling messages on the worker thread. delivery is called from it with
+            each batch of consumers and must run their data_received on the GUI thread.
+        """
+        # Reference counted, as both visualizers may run in the same rqt process
+        self._users += 1
+        self._period = 1.0 / max(1.0, float(fps))
+        if self._thread is not None and self._stopping.is_set():
+            # The previous worker did not return in time when it was stopped, two must never share the queue
+            self._thread.join()
+            self._thread = None
+        if self._thread is None:
+            self._clear()
+            self._delivery = delivery
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stopping,),
+                                            name="sr_visualization_ingestion", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._users = max(0, self._users - 1)
+        if self._users or self._thread is None or self._stopping.is_set():
+            return
+        self._stopping.set()
+        # Wakes the worker up, a full queue already does
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._thread.join(1.0)
+        if self._thread.is_alive():
+            rospy.logwarn("The ingestion worker is still handling a message, it will stop after it")
+            return
+        self._thread = None
+        self._delivery = None
+        self._clear()
+
+    def _clear(self):
+        # Messages and consumers left by a stopped worker
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._pending = set()
+
+    def submit(self, function, data):
+        # False when the message was dropped
+        if self._thread is None:
+            function(data)
+            return True
+        try:
+            self._queue.put_nowait((function, data))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def notify(self, consumers):
+        # Called by the sources once their buffers are written
+        if threading.current_thread() is self._thread:
+            self._pending.update(consumers)
+        else:
+            for consumer in consumers:
+                consumer.data_received()
+
+    def _run(self, stopping):
+        next_batch = time.monotonic() + self._period
+        while not stopping.is_set():
+            timeout = next_batch - time.monotonic()
+            if timeout > 0:
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                if item is None:
+                    continue
+                function, data = item
+                with self.lock:
+                    try:
+                        function(data)
+                    except Exception as exception:
+                        # A malformed message must not stop the ingestion of every other topic
+                        rospy.logerr_throttle(5, "Failed to ingest message with {}: {}".format(function, exception))
+                continue
+
+            if self._pending:
+                batch, self._pending = self._pending, set()
+                self.batches += 1
+                self._delivery(batch)
+            # A late batch is not followed by a burst of catching up ones
+            next_batch = max(next_batch + self._period, time.monotonic())
+
+
+# Shared by every plugin running in the same process
+ingestion = IngestionWorker()
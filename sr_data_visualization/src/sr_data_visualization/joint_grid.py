@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from python_qt_binding.QtCore import Qt, QRect, QRectF
+from python_qt_binding.QtGui import QColor, QPainter, QPen
+from python_qt_binding.QtWidgets import QCheckBox, QWidget
+from qwt.plot_curve import array2d_to_qpolygonf
+
+from control_msgs.msg import JointControllerState
+from diagnostic_msgs.msg import DiagnosticArray
+from sensor_msgs.msg import JointState
+
+from sr_data_visualization.data_plot import (
+    PlotFrames,
+    JointStatesFrames,
+    ControlLoopsFrames,
+    MotorStats1Frames,
+    MotorStats2Frames
+)
+from sr_data_visualization.span_tracer import tracer
+
+
+class JointGridCell(PlotFrames):
+    """
+        One joint of a JointGridCanvas. It keeps the data side of a plot and the curves
+        of its latest frame, the canvas draws them along with those of the other joints.
+    """
+    TOPIC_TYPE = None
+
+    def __init__(self, joint_name, source, canvas, row, column):
+        self._source = source
+        self.canvas = canvas
+        self.initial_row = row
+        self.initial_column = column
+        # Area of the cell on the canvas, its joint check box on top
+        self.rect = QRect()
+        self.shown = True
+        self.single_trace = False
+        self.time_range = None
+        self.y_scale = None
+        self.curves = None
+        self.joint_check_box = QCheckBox(joint_name, canvas)
+        self.init_frames(joint_name, source.topic_name, self.TOPIC_TYPE, canvas.CELL_MINW)
+
+    def plot_rect(self):
+        return self.rect.adjusted(self.canvas.MARGIN, self.canvas.TITLE_HEIGHT, -self.canvas.MARGIN,
+                                  -self.canvas.MARGIN)
+
+    def is_on_screen(self):
+        return self.shown and self.canvas.is_cell_on_screen(self)
+
+    def draw_frame(self):
+        frame = self.compute_frame(max(1, self.plot_rect().width()))
+        if frame is None:
+            return
+        start, end, x_data, y_data, y_range = frame
+        self.time_range = (start, end)
+        self.curves = (x_data, y_data)
+        y_scale = self.update_y_range(y_range)
+        if y_scale is not None:
+            self.y_scale = y_scale
+        # Updates of every cell are merged by Qt into a single paint of the canvas
+        self.canvas.update(self.rect)
+
+    def show_trace(self, trace_name):
+        self.select_trace(trace_name)
+        self.single_trace = trace_name != "All"
+        self.canvas.update(self.rect)
+
+
+class JointStatesCell(JointStatesFrames, JointGridCell):
+    TOPIC_TYPE = JointState
+
+
+class ControlLoopsCell(ControlLoopsFrames, JointGridCell):
+    TOPIC_TYPE = JointControllerState
+
+
+class MotorStats1Cell(MotorStats1Frames, JointGridCell):
+    TOPIC_TYPE = DiagnosticArray
+
+
+class MotorStats2Cell(MotorStats2Frames, JointGridCell):
+    TOPIC_TYPE = DiagnosticArray
+
+
+class JointGridCanvas(QWidget):
+    """
+        Draws the plots of a whole joint grid on one widget, in a single paint pass,
+        instead of one plot widget and group box per joint. Cells keep the joint
+        check boxes and the "Show Selected" and "Reset" behaviour of the JointGraph grid.
+    """
+    CELL_MINW = 150
+    CELL_MINH = 70
+    TITLE_HEIGHT = 22
+    MARGIN = 3
+    # Columns used by "Show Selected", as in the JointGraph grid
+    MAX_NO_COLUMNS = 4
+
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+        self.cells = []
+        self._selection = False
+        self._drag = None
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+
+    def add_cell(self, cell):
+        self.cells.append(cell)
+        self.layout_cells()
+
+    def _positions(self):
+        if not self._selection:
+            return [(cell, cell.initial_row, cell.initial_column) for cell in self.cells]
+        shown = [cell for cell in self.cells if cell.shown]
+        return [(cell, index // self.MAX_NO_COLUMNS, index % self.MAX_NO_COLUMNS) for index, cell in enumerate(shown)]
+
+    def layout_cells(self):
+        positions = self._positions()
+        rows = max([row for _, row, _ in positions], default=0) + 1
+        columns = max([column for _, _, column in positions], default=0) + 1
+        self.setMinimumSize(columns * self.CELL_MINW, rows * self.CELL_MINH)
+        width, height = self.width() / columns, self.height() / rows
+        for cell, row, column in positions:
+            cell.rect = QRect(int(column * width), int(row * height), int(width), int(height))
+            cell.joint_check_box.move(cell.rect.left() + self.MARGIN, cell.rect.top())
+            cell.joint_check_box.setVisible(cell.shown)
+            # The decimation depends on the width of the cell
+            cell.data_received()
+        self.update()
+
+    def show_selected(self):
+        for cell in self.cells:
+            cell.shown = cell.joint_check_box.isChecked()
+        self._selection = True
+        self.layout_cells()
+
+    def reset(self):
+        for cell in self.cells:
+            cell.joint_check_box.setChecked(False)
+            cell.shown = True
+        self._selection = False
+        self.layout_cells()
+
+    def is_cell_on_screen(self, cell):
+        return self.isVisible() and not self.window().isMinimized() and self.visibleRegion().intersects(cell.rect)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.layout_cells()
+
+    def paintEvent(self, event):
+        with tracer.span("JointGridCanvas.paintEvent", "paint"):
+            painter = QPainter(self)
+            painter.fillRect(event.rect(), self.palette().window())
+            for cell in self.cells:
+                if cell.shown and cell.rect.intersects(event.rect()):
+                    self._paint_cell(painter, cell)
+            painter.end()
+
+    def _paint_cell(self, painter, cell):
+        plot_rect = cell.plot_rect()
+        painter.fillRect(plot_rect, Qt.white)
+        painter.setPen(QPen(QColor(Qt.lightGray)))
+        painter.drawRect(plot_rect)
+        if cell.curves is None or cell.y_scale is None:
+            return
+
+        start, end = cell.time_range
+        low, high = cell.y_scale
+        x_data, y_data = cell.curves
+        # Curves are mapped to pixels with numpy, each one drawn as a single polyline
+        x_scale = plot_rect.width() / max(end - start, 1e-9)
+        y_scale = plot_rect.height() / max(high - low, 1e-9)
+        x_pixels = plot_rect.left() + (x_data - start) * x_scale
+        painter.save()
+        painter.setClipRect(plot_rect)
+        for row in cell._shown_rows:
+            if y_data[row].size != x_data.size or not x_data.size:
+                continue
+            y_pixels = plot_rect.bottom() - (y_data[row] - low) * y_scale
+            painter.setPen(QPen(QColor(cell.traces[row].colour)))
+            painter.drawPolyline(array2d_to_qpolygonf(x_pixels, y_pixels))
+        painter.restore()
+
+        if cell.single_trace:
+            painter.setPen(QPen(QColor(Qt.darkGray)))
+            text_rect = QRectF(plot_rect.adjusted(2, 0, -2, 0))
+            painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignTop, "{:.4g}".format(high))
+            painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignBottom, "{:.4g}".format(low))
+            painter.drawText(text_rect, Qt.AlignRight | Qt.AlignBottom, "{:.1f} s".format(end - start))
+
+    def _paused_cell_at(self, position):
+        for cell in self.cells:
+            if cell.shown and cell._paused and cell._view is not None and cell.plot_rect().contains(position):
+                return cell
+        return None
+
+    def _time_at(self, cell, x):
+        start, end = cell._view
+        plot_rect = cell.plot_rect()
+        return start + (x - plot_rect.left()) * (end - start) / max(1, plot_rect.width())
+
+    # While paused, the mouse wheel zooms around the cursor, dragging pans
+    # and a double click goes back to the latest time window, as on the Qwt plots
+    def wheelEvent(self, event):
+        cell = self._paused_cell_at(event.pos())
+        if cell is None:
+            return super().wheelEvent(event)
+        cell.zoom(self._time_at(cell, event.pos().x()), event.angleDelta().y() > 0)
+
+    def mouseDoubleClickEvent(self, event):
+        cell = self._paused_cell_at(event.pos())
+        if cell is None:
+            return super().mouseDoubleClickEvent(event)
+        cell.show_latest()
+
+    def mousePressEvent(self, event):
+        cell = self._paused_cell_at(event.pos())
+        if cell is None or event.button() != Qt.LeftButton:
+            return super().mousePressEvent(event)
+        start, end = cell._view
+        self._drag = (cell, event.pos().x(), start, end)
+
+    def mouseMoveEvent(self, event):
+        if self._drag is None:
+            return super().mouseMoveEvent(event)
+        cell, origin, start, end = self._drag
+        shift = (origin - event.pos().x()) * (end - start) / max(1, cell.plot_rect().width())
+        cell.set_view(start + shift, end + shift)
+
+    def mouseReleaseEvent(self, event):
+        self._drag = None
+        super().mouseReleaseEvent(event)
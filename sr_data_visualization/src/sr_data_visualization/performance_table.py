@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import time
+
+from python_qt_binding.QtCore import QTimer
+from python_qt_binding.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView
+
+from sr_data_visualization.resource_registry import registry
+
+
+class PerformanceTable(QTableWidget):
+    """
+        Side table of what each plot of the shown tab costs, refreshed every second:
+        samples per second reaching its buffer, time spent in the callbacks of its topic
+        and in its own replots, messages its topic dropped and how full its buffer is.
+        The last row holds the totals of the tab, topics and histories shared by several
+        plots counted once.
+    """
+    COLUMNS = ("Plot", "Topic", "Samples/s", "Callback ms/s", "Replot ms/s", "Dropped", "Buffer %")
+    REFRESH_SECONDS = 1.0
+
+    def __init__(self, parent=None):
+        super().__init__(0, len(self.COLUMNS), parent)
+        self.setHorizontalHeaderLabels(self.COLUMNS)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.verticalHeader().setVisible(False)
+        self.setEditTriggers(QTableWidget.NoEditTriggers)
+        self._plots = []
+        # Counters of each plot and source at the previous refresh
+        self._previous = dict()
+        self._refreshed_at = None
+        self._timer = QTimer(self)
+
+    def set_plots(self, plots):
+        self._plots = list(plots)
+        self._previous = dict()
+        self._refreshed_at = None
+        self.setRowCount(len(self._plots) + 1 if self._plots else 0)
+        self.refresh()
+
+    def start(self):
+        self.refresh()
+        registry.connect(self._timer, 'timeout', self.refresh)
+        registry.start_timer(self._timer, int(self.REFRESH_SECONDS * 1000))
+
+    def stop(self):
+        registry.stop_timer(self._timer)
+        registry.disconnect(self._timer, 'timeout', self.refresh)
+
+    def _rate(self, key, value, elapsed):
+        # Growth per second of a counter since the previous refresh
+        previous = self._previous.get(key)
+        self._previous[key] = value
+        if previous is None or not elapsed:
+            return 0.0
+        return (value - previous) / elapsed
+
+    def refresh(self):
+        now = time.monotonic()
+        elapsed = now - self._refreshed_at if self._refreshed_at is not None else 0.0
+        self._refreshed_at = now
+
+        sources = dict()
+        histories = dict()
+        totals = [0.0] * 4
+        fill = 0.0
+        for row, plot in enumerate(self._plots):
+            source = plot.source()
+            history = plot.history
+            if id(history) not in histories:
+                histories[id(history)] = self._rate((id(history), 'samples'), history.total, elapsed)
+            samples = histories[id(history)]
+            replot = 1000.0 * self._rate((id(plot), 'render'), plot.render_seconds, elapsed)
+            callback, dropped = 0.0, 0
+            if source is not None:
+                if id(source) not in sources:
+                    sources[id(source)] = (1000.0 * self._rate((id(source), 'callback'), source.callback_seconds,
+                                                               elapsed), source.dropped)
+                callback, dropped = sources[id(source)]
+            buffer_fill = 100.0 * len(history) / history.capacity
+            self._set_row(row, plot.joint_name, plot.topic_name(), samples, callback, replot, dropped, buffer_fill)
+            totals[2] += replot
+            fill += buffer_fill
+
+        if self._plots:
+            totals[0] = sum(histories.values())
+            totals[1] = sum(callback for callback, _ in sources.values())
+            totals[3] = sum(dropped for _, dropped in sources.values())
+            self._set_row(len(self._plots), "Total", "{} topics".format(len(sources)), totals[0], totals[1],
+                          totals[2], totals[3], fill / len(self._plots))
+
+    def _set_row(self, row, name, topic, samples, callback, replot, dropped, buffer_fill):
+        texts = (name, topic, "{:.0f}".format(samples), "{:.2f}".format(callback), "{:.2f}".format(replot),
+                 "{:d}".format(int(dropped)), "{:.0f}".format(buffer_fill))
+        for column, text in enumerate(texts):
+            item = self.item(row, column)
+            if item is None:
+                self.setItem(row, column, QTableWidgetItem(text))
+            else:
+                item.setText(text)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import importlib
+import numpy as np
+import rospy
+
+from python_qt_binding.QtGui import QPen
+from python_qt_binding.QtCore import Qt, QPointF, QRectF
+
+from qwt import (
+    QwtPlot,
+    QwtPlotCurve,
+    QwtScaleDraw,
+    QwtSeriesData
+)
+
+DEFAULT_PLOT_BACKEND = "qwt"
+# Backend name: (module, class) of its plot view, modules are only imported when selected
+PLOT_BACKENDS = {"qwt": ("sr_data_visualization.plot_backends", "QwtPlotView"),
+                 "pyqtgraph": ("sr_data_visualization.pyqtgraph_plot_view", "PyQtGraphPlotView")}
+
+
+def plot_backend():
+    return rospy.get_param("~plot_backend", DEFAULT_PLOT_BACKEND)
+
+
+def plot_view_class(backend=None):
+    """
+        Widget class drawing the curves of a plot for the given backend (the ~plot_backend
+        parameter by default). Falls back to Qwt when the backend can't be loaded.
+    """
+    backend = plot_backend() if backend is None else backend
+    if backend not in PLOT_BACKENDS:
+        rospy.logwarn("Unknown plot backend %s, using %s", backend, DEFAULT_PLOT_BACKEND)
+        backend = DEFAULT_PLOT_BACKEND
+    module_name, class_name = PLOT_BACKENDS[backend]
+    try:
+        return getattr(importlib.import_module(module_name), class_name)
+    except ImportError as error:
+        rospy.logwarn("Plot backend %s is not available (%s), using %s", backend, error, DEFAULT_PLOT_BACKEND)
+        return QwtPlotView
+
+
+class TraceSeriesData(QwtSeriesData):
+    """
+        Hands numpy views straight to Qwt. QwtPointArrayData copies and
+        filters its input on every setData call, this does neither.
+    """
+    def __init__(self, x_data, y_data):
+        super().__init__()
+        self.set_views(x_data, y_data)
+
+    def set_views(self, x_data, y_data):
+        self._x_data = x_data
+        self._y_data = y_data
+
+    def size(self):
+        return min(self._x_data.size, self._y_data.size)
+
+    def sample(self, index):
+        return QPointF(self._x_data[index], self._y_data[index])
+
+    def xData(self):
+        return self._x_data
+
+    def yData(self):
+        return self._y_data
+
+    def boundingRect(self):
+        if self.size() == 0:
+            return QRectF(0.0, 0.0, -1.0, -1.0)
+        x_min, x_max = self._x_data.min(), self._x_data.max()
+        y_min, y_max = self._y_data.min(), self._y_data.max()
+        return QRectF(x_min, y_min, x_max - x_min, y_max - y_min)
+
+
+class QwtPlotView(QwtPlot):
+    """
+        Plot view of the "qwt" backend. Plot views draw the curves of a plot, the plot
+        keeps the data and only goes through the methods below, so backends can be swapped.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setCanvasBackground(Qt.white)
+        self.set_labels_shown(False, False)
+
+    def add_curve(self, name, colour):
+        curve = QwtPlotCurve(name)
+        curve.setPen(QPen(colour))
+        curve.series = TraceSeriesData(np.empty(0), np.empty(0))
+        curve.setData(curve.series)
+        curve.attach(self)
+        return curve
+
+    def set_curve_data(self, curve, x_data, y_data):
+        curve.series.set_views(x_data, y_data)
+
+    def set_curve_shown(self, curve, shown):
+        if shown:
+            curve.attach(self)
+        else:
+            curve.detach()
+
+    def is_curve_shown(self, curve):
+        return curve.plot() is not None
+
+    def set_x_range(self, start, end):
+        self.setAxisScale(QwtPlot.xBottom, start, end)
+
+    def set_y_range(self, low, high):
+        self.setAxisScale(QwtPlot.yLeft, low, high)
+
+    def auto_y_range(self):
+        self.setAxisAutoScale(QwtPlot.yLeft)
+
+    def set_labels_shown(self, x_shown, y_shown):
+        self.axisScaleDraw(QwtPlot.xBottom).enableComponent(QwtScaleDraw.Labels, x_shown)
+        self.axisScaleDraw(QwtPlot.yLeft).enableComponent(QwtScaleDraw.Labels, y_shown)
+
+    def plot_area(self):
+        # Widget receiving the mouse events over the curves
+        return self.canvas()
+
+    def plot_width(self):
+        return self.canvas().width()
+
+    def x_at(self, pixel):
+        return self.invTransform(QwtPlot.xBottom, pixel)
+
+    def refresh(self):
+        self.replot()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import pyqtgraph
+
+from python_qt_binding.QtCore import QPoint
+from python_qt_binding.QtGui import QColor
+
+
+class PyQtGraphPlotView(pyqtgraph.PlotWidget):
+    """
+        Plot view of the "pyqtgraph" backend, same interface as QwtPlotView.
+        Curves take the numpy arrays as they are and are drawn from a QPainterPath
+        built in C++, which is much cheaper than Qwt for many curves or points.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent=parent, background='w')
+        # Zoom and pan are handled by the plots while paused, not by pyqtgraph
+        self.setMouseEnabled(x=False, y=False)
+        self.setMenuEnabled(False)
+        self.hideButtons()
+        self.getPlotItem().setDownsampling(auto=False)
+        self.set_labels_shown(False, False)
+
+    def add_curve(self, name, colour):
+        return self.plot(name=name, pen=pyqtgraph.mkPen(QColor(colour)))
+
+    def set_curve_data(self, curve, x_data, y_data):
+        curve.setData(x_data, y_data)
+
+    def set_curve_shown(self, curve, shown):
+        curve.setVisible(shown)
+
+    def is_curve_shown(self, curve):
+        return curve.isVisible()
+
+    def set_x_range(self, start, end):
+        self.setXRange(start, end, padding=0)
+
+    def set_y_range(self, low, high):
+        self.setYRange(low, high, padding=0)
+
+    def auto_y_range(self):
+        self.enableAutoRange(axis='y')
+
+    def set_labels_shown(self, x_shown, y_shown):
+        self.getAxis('bottom').setStyle(showValues=x_shown)
+        self.getAxis('left').setStyle(showValues=y_shown)
+
+    def plot_area(self):
+        return self.viewport()
+
+    def plot_width(self):
+        return int(self.getViewBox().width()) or self.width()
+
+    def x_at(self, pixel):
+        return self.getViewBox().mapSceneToView(self.mapToScene(QPoint(int(pixel), 0))).x()
+
+    def refresh(self):
+        # Items repaint themselves when their data or range change
+        pass
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import struct
+import threading
+import time
+import numpy as np
+import rospy
+
+from roslib.message import get_message_class
+
+from sr_data_visualization.ingestion_worker import ingestion
+from sr_data_visualization.resource_registry import registry
+
+_UINT32 = struct.Struct('<I')
+_latest_messages = dict()
+_HEADER = struct.Struct('<3I')
+# ROS serializes float64 arrays little endian
+_FLOAT64 = np.dtype('<f8')
+
+
+class RawStamp():
+    __slots__ = ('secs', 'nsecs')
+
+    def __init__(self, secs, nsecs):
+        self.secs = secs
+        self.nsecs = nsecs
+
+    def is_zero(self):
+        return self.secs == 0 and self.nsecs == 0
+
+    def to_sec(self):
+        return self.secs + 1e-9 * self.nsecs
+
+
+class RawHeader():
+    __slots__ = ('seq', 'stamp', 'frame_id')
+
+    def __init__(self, seq, stamp, frame_id):
+        self.seq = seq
+        self.stamp = stamp
+        self.frame_id = frame_id
+
+
+class RawJointState():
+    """
+        Decoded JointState with the fields the sources read: the name list and
+        numpy views of position, velocity and effort on the serialized message.
+    """
+    __slots__ = ('header', 'name', 'position', 'velocity', 'effort')
+
+    def __init__(self, header, name, position, velocity, effort):
+        self.header = header
+        self.name = name
+        self.position = position
+        self.velocity = velocity
+        self.effort = effort
+
+
+class JointStateDecoder():
+    """
+        Decodes serialized sensor_msgs/JointState messages, as received with rospy.AnyMsg,
+        without building a genpy message. The joint names are parsed once and reused whenever
+        their serialized bytes come again, and the value arrays are np.frombuffer
+        views on the message, so a message costs a few struct reads and a byte comparison.
+    """
+    # Name lists kept, a topic with several publishers alternates between theirs
+    NAME_LISTS = 4
+
+    def __init__(self):
+        # Serialized name blocks with their parsed names, most recent first
+        self._name_lists = []
+
+    def _names_at(self, buff, offset):
+        for cached, names in self._name_lists:
+            if buff[offset:offset + len(cached)] == cached:
+                return names, offset + len(cached)
+
+        start = offset
+        count, = _UINT32.unpack_from(buff, offset)
+        offset += 4
+        names = []
+        for _ in range(count):
+            length, = _UINT32.unpack_from(buff, offset)
+            offset += 4
+            names.append(bytes(buff[offset:offset + length]).decode('utf-8'))
+            offset += length
+        self._name_lists = [(bytes(buff[start:offset]), names)] + self._name_lists[:self.NAME_LISTS - 1]
+        return names, offset
+
+    @staticmethod
+    def _array_at(buff, offset):
+        count, = _UINT32.unpack_from(buff, offset)
+        offset += 4
+        return np.frombuffer(buff, dtype=_FLOAT64, count=count, offset=offset), offset + 8 * count
+
+    def decode(self, buff):
+        seq, secs, nsecs = _HEADER.unpack_from(buff, 0)
+        length, = _UINT32.unpack_from(buff, 12)
+        frame_id = bytes(buff[16:16 + length]).decode('utf-8')
+        header = RawHeader(seq, RawStamp(secs, nsecs), frame_id)
+
+        names, offset = self._names_at(buff, 16 + length)
+        position, offset = self._array_at(buff, offset)
+        velocity, offset = self._array_at(buff, offset)
+        effort, offset = self._array_at(buff, offset)
+        return RawJointState(header, names, position, velocity, effort)
+
+    def message_of(self, data):
+        """
+            JointState of a message received by an AnyMsg subscription. rospy delivers
+            typed messages instead when another subscription of the process to the topic
+            asked for the type first, those are returned as they are.
+        """
+        buff = getattr(data, '_buff', None)
+        return data if buff is None else self.decode(buff)
+
+
+def latest_message(topic_name):
+    """
+        Returns the single LatestMessage of a topic, creating it on first use.
+    """
+    if topic_name not in _latest_messages:
+        _latest_messages[topic_name] = LatestMessage(topic_name)
+    return _latest_messages[topic_name]
+
+
+class LatestMessage():
+    """
+        Raw subscription to a topic that is mostly displayed, one sample per frame.
+        Messages are kept serialized and only the newest one is deserialized, when a
+        reader asks for it, so a topic faster than the frame rate costs one decode per
+        frame instead of one per message. Listeners needing every message (recording,
+        statistics, sample buffers) get each of them decoded, on the ingestion worker.
+        The message type is taken from the connection. Every other subscription to the
+        topic in the process must go through here too, as rospy hands all subscribers of
+        a topic the type of the first one.
+    """
+    QUEUE_SIZE = 100
+    WAIT_PERIOD = 0.1
+
+    def __init__(self, topic_name):
+        self.topic_name = topic_name
+        self._readers = []
+        self._listeners = []
+        self._subscriber = None
+        self._message_class = None
+        self._raw = None
+        # Newest deserialized message, with the raw message it comes from. Both the GUI
+        # thread and the ingestion worker deserialize, the pair is only replaced under lock
+        self._lock = threading.Lock()
+        self._decoded = (None, None)
+        self._arrived = threading.Event()
+        # Counters of received and deserialized messages
+        self.received = 0
+        self.decoded = 0
+
+    def add_reader(self, reader):
+        if reader not in self._readers:
+            self._readers = self._readers + [reader]
+        self._update_subscription()
+
+    def remove_reader(self, reader):
+        self._readers = [known for known in self._readers if known is not reader]
+        self._update_subscription()
+
+    def add_listener(self, function):
+        if function not in self._listeners:
+            self._listeners = self._listeners + [function]
+        self._update_subscription()
+
+    def remove_listener(self, function):
+        self._listeners = [known for known in self._listeners if known != function]
+        self._update_subscription()
+
+    def _update_subscription(self):
+        needed = bool(self._readers) or bool(self._listeners)
+        if needed and self._subscriber is None:
+            self._subscriber = registry.subscribe(self.topic_name, rospy.AnyMsg, self.callback,
+                                                  queue_size=self.QUEUE_SIZE)
+        elif not needed and self._subscriber is not None:
+            registry.unsubscribe(self._subscriber)
+            self._subscriber = None
+            with self._lock:
+                self._raw = None
+                self._decoded = (None, None)
+            self._arrived.clear()
+
+    def callback(self, data):
+        # Only keeps the bytes, unless a listener needs the message
+        self._raw = data
+        self.received += 1
+        self._arrived.set()
+        if self._listeners:
+            ingestion.submit(self._notify_listeners, data)
+
+    def _deserialize(self, raw):
+        if self._message_class is None:
+            self._message_class = get_message_class(raw._connection_header['type'])
+        message = self._message_class()
+        message.deserialize(raw._buff)
+        with self._lock:
+            self.decoded += 1
+            # A message decoded for the listeners never replaces a newer one read by latest
+            if self._raw is raw:
+                self._decoded = (raw, message)
+        return message
+
+    def _notify_listeners(self, raw):
+        message = self._deserialize(raw)
+        for listener in self._listeners:
+            listener(message)
+
+    def latest(self):
+        """
+            Newest message received, deserialized on the first call after it arrived,
+            None before the first one.
+        """
+        with self._lock:
+            raw = self._raw
+            decoded_raw, message = self._decoded
+        if raw is None:
+            return None
+        if decoded_raw is raw:
+            return message
+        return self._deserialize(raw)
+
+    def wait_latest(self, timeout=None):
+        """
+            Like rospy.wait_for_message, but served by this subscription: returns the newest
+            message, waiting for the first one if none was received yet.
+        """
+        waiter = object()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.add_reader(waiter)
+        try:
+            while not self._arrived.wait(self.WAIT_PERIOD):
+                if rospy.is_shutdown():
+                    raise rospy.ROSInterruptException("rospy shutdown")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise rospy.ROSException("timeout exceeded while waiting for message on topic {}"
+                                             .format(self.topic_name))
+            return self.latest()
+        finally:
+            self.remove_reader(waiter)
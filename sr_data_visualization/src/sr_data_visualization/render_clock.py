@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import collections
+import time
+
+from python_qt_binding.QtCore import QObject, QTimer
+
+from sr_data_visualization.ingestion_worker import ingestion
+from sr_data_visualization.resource_registry import registry
+from sr_data_visualization.span_tracer import traced
+
+
+class RenderClock(QObject):
+    """
+        Single frame clock for all the plots of the data visualizer.
+        On every tick, plots that received data since their last frame are
+        redrawn in one pass, the others are left untouched. Plots that are not
+        on screen keep their pending data until they are shown again.
+    """
+    DEFAULT_FPS = 30
+    # Durations of the latest rendered frames kept for statistics
+    FRAME_TIMES_KEPT = 1000
+
+    def __init__(self, fps=DEFAULT_FPS, parent=None):
+        super().__init__(parent=parent)
+        self._plots = []
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+        self.plots_rendered = 0
+        self.plots_hidden = 0
+        self.frame_times = collections.deque(maxlen=self.FRAME_TIMES_KEPT)
+
+        self._timer = QTimer(self)
+        self.set_fps(fps)
+
+    def set_fps(self, fps):
+        self.fps = max(1.0, float(fps))
+        self._timer.setInterval(int(round(1000.0 / self.fps)))
+
+    def register(self, plot):
+        if plot not in self._plots:
+            self._plots.append(plot)
+
+    def unregister(self, plot):
+        if plot in self._plots:
+            self._plots.remove(plot)
+
+    def start(self):
+        registry.connect(self._timer, 'timeout', self.tick)
+        registry.start_timer(self._timer)
+
+    def stop(self):
+        registry.stop_timer(self._timer)
+        registry.disconnect(self._timer, 'timeout', self.tick)
+
+    @traced("RenderClock.tick", "timer")
+    def tick(self):
+        start = time.perf_counter()
+        rendered = 0
+        # Histories are not written by the ingestion worker while the frame reads them
+        with ingestion.lock:
+            for plot in self._plots:
+                if plot.needs_render():
+                    if plot.is_on_screen():
+                        plot.render_frame()
+                        rendered += 1
+                    else:
+                        self.plots_hidden += 1
+
+        if rendered:
+            self.frame_times.append(time.perf_counter() - start)
+            self.frames_rendered += 1
+            self.plots_rendered += rendered
+        else:
+            self.frames_skipped += 1
+
+    def statistics(self):
+        return {'fps': self.fps,
+                'frames_rendered': self.frames_rendered,
+                'frames_skipped': self.frames_skipped,
+                'plots_rendered': self.plots_rendered,
+                'plots_hidden': self.plots_hidden}
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import threading
+import rospy
+
+
+class ResourceRegistry():
+    """
+        Reference counted registry of the subscribers, timers and signal connections created
+        by the visualization plugins. Asking twice for the same subscription or connection
+        returns the existing one and logs a warning instead of silently doubling the callbacks,
+        and the live counters make leaks over long sessions visible.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = dict()
+        self._connections = dict()
+        self._timers = dict()
+        self._created = {'subscribers': 0, 'connections': 0, 'timers': 0}
+        self.duplicates = 0
+
+    def _warn_duplicate(self, description):
+        self.duplicates += 1
+        rospy.logwarn("Duplicate %s, reusing the existing one", description)
+
+    def subscribe(self, topic_name, topic_type, callback, **kwargs):
+        key = (topic_name, callback)
+        with self._lock:
+            if key in self._subscribers:
+                self._subscribers[key][1] += 1
+                self._warn_duplicate("subscription to {} for {}".format(topic_name, callback))
+                return self._subscribers[key][0]
+            subscriber = rospy.Subscriber(topic_name, topic_type, callback, **kwargs)
+            self._subscribers[key] = [subscriber, 1]
+            self._created['subscribers'] += 1
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            for key, entry in list(self._subscribers.items()):
+                if entry[0] is subscriber:
+                    entry[1] -= 1
+                    if entry[1] <= 0:
+                        del self._subscribers[key]
+                        subscriber.unregister()
+                    return
+
+    def connect(self, sender, signal_name, slot):
+        key = (id(sender), signal_name, slot)
+        with self._lock:
+            if key in self._connections:
+                self._connections[key][1] += 1
+                self._warn_duplicate("connection of {}.{} to {}".format(type(sender).__name__, signal_name, slot))
+                return
+            getattr(sender, signal_name).connect(slot)
+            self._connections[key] = [sender, 1]
+            self._created['connections'] += 1
+
+    def disconnect(self, sender, signal_name, slot):
+        key = (id(sender), signal_name, slot)
+        with self._lock:
+            if key not in self._connections:
+                return
+            self._connections[key][1] -= 1
+            if self._connections[key][1] <= 0:
+                del self._connections[key]
+                getattr(sender, signal_name).disconnect(slot)
+
+    def start_timer(self, timer, interval=None):
+        with self._lock:
+            if id(timer) not in self._timers:
+                self._created['timers'] += 1
+            self._timers[id(timer)] = timer
+        if interval is None:
+            timer.start()
+        else:
+            timer.start(interval)
+
+    def stop_timer(self, timer):
+        with self._lock:
+            self._timers.pop(id(timer), None)
+        timer.stop()
+
+    def counters(self):
+        with self._lock:
+            return {'subscribers': sum(entry[1] for entry in self._subscribers.values()),
+                    'connections': sum(entry[1] for entry in self._connections.values()),
+                    'active_timers': len(self._timers),
+                    'subscribers_created': self._created['subscribers'],
+                    'connections_created': self._created['connections'],
+                    'timers_started': self._created['timers'],
+                    'duplicates': self.duplicates}
+
+
+# Shared by every plugin running in the same process
+registry = ResourceRegistry()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import numpy as np
+
+
+class RingBuffer():
+    """
+        Fixed size, timestamped history of one or more channels, allocated once and
+        written in place. Once it wraps around, the history is made of two contiguous
+        segments, which segments() returns as views ordered from oldest to newest.
+    """
+    def __init__(self, capacity, channels=1, dtype=np.float64):
+        self.capacity = int(capacity)
+        self.channels = int(channels)
+        self._dtype = dtype
+        self._stamps = np.zeros(self.capacity)
+        self._data = self._allocate()
+        self._head = 0
+        self._count = 0
+        # Number of samples appended since creation, readers use it to find what is new
+        self.total = 0
+
+    def __len__(self):
+        return self._count
+
+    def _allocate(self):
+        return np.zeros((self.channels, self.capacity), dtype=self._dtype)
+
+    def _write(self, index, values):
+        self._data[:, index] = values
+
+    def _select(self, channel, start, end):
+        if channel is None:
+            return self._data[:, start:end]
+        return self._data[channel, start:end]
+
+    def _write_block(self, start, end, values):
+        self._data[:, start:end] = values
+
+    def _time_slice(self, values, start, end):
+        return values[:, start:end]
+
+    def append(self, stamp, values):
+        head = self._head
+        # Keep the time axis monotonic if stamps from different sources interleave
+        if self._count and stamp < self._stamps[head - 1]:
+            stamp = self._stamps[head - 1]
+        self._stamps[head] = stamp
+        self._write(head, values)
+        self._head = (head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        self.total += 1
+
+    def extend(self, stamps, values):
+        """
+            Appends a block of samples at once, values being laid out like view().
+        """
+        stamps = np.asarray(stamps)
+        count = stamps.size
+        if count > self.capacity:
+            # Skipped samples still count, sample i stays stored at i % capacity
+            skipped = count - self.capacity
+            stamps = stamps[skipped:]
+            values = self._time_slice(values, skipped, count)
+            self._head = (self._head + skipped) % self.capacity
+        written = 0
+        while written < stamps.size:
+            head = self._head
+            step = min(stamps.size - written, self.capacity - head)
+            self._stamps[head:head + step] = stamps[written:written + step]
+            self._write_block(head, head + step, self._time_slice(values, written, written + step))
+            self._head = (head + step) % self.capacity
+            written += step
+        self._count = min(self.capacity, self._count + count)
+        self.total += count
+
+    def ranges(self, count=None):
+        """
+            Index ranges holding the latest count samples (all by default), oldest first.
+        """
+        head = self._head
+        count = self._count if count is None else max(0, min(int(count), self._count))
+        start = head - count
+        if start >= 0:
+            return [(start, head)] if count else []
+        if head == 0:
+            return [(start + self.capacity, self.capacity)]
+        return [(start + self.capacity, self.capacity), (0, head)]
+
+    def segment(self, channel, start, end):
+        return self._stamps[start:end], self._select(channel, start, end)
+
+    def segments(self, channel=None, count=None):
+        return [self.segment(channel, start, end) for start, end in self.ranges(count)]
+
+    def absolute_range(self):
+        # Samples are numbered from 0 in order of arrival, sample i is stored at i % capacity
+        return self.total - self._count, self.total
+
+    def column(self, channel):
+        # Whole storage of a channel, indexed by sample number % capacity
+        return self._select(channel, 0, self.capacity)
+
+    def stamps_at(self, numbers):
+        return self._stamps.take(numbers % self.capacity)
+
+    def index_at(self, stamps):
+        """
+            Number of the first sample stamped at or after each of stamps,
+            total when there is none.
+        """
+        stamps = np.asarray(stamps)
+        indices = np.full(stamps.shape, self.total, dtype=np.int64)
+        pending = np.ones(stamps.shape, dtype=bool)
+        offset = self.total - self._count
+        for start, end in self.ranges():
+            positions = np.searchsorted(self._stamps[start:end], stamps, side='left')
+            found = pending & (positions < end - start)
+            indices[found] = offset + positions[found]
+            pending &= ~found
+            offset += end - start
+        return indices
+
+    def count_since(self, stamp):
+        # Number of latest samples stamped at or after stamp
+        count = 0
+        for start, end in reversed(self.ranges()):
+            stamps = self._stamps[start:end]
+            index = np.searchsorted(stamps, stamp, side='left')
+            count += end - start - index
+            if index > 0:
+                break
+        return count
+
+    def _time_axis(self, channel):
+        return 1 if channel is None else 0
+
+    def times(self):
+        # A view until the buffer wraps around, a copy afterwards
+        parts = [self._stamps[start:end] for start, end in self.ranges()]
+        if len(parts) < 2:
+            return parts[0] if parts else self._stamps[:0]
+        return np.concatenate(parts)
+
+    def view(self, channel=None):
+        # A view until the buffer wraps around, a copy afterwards
+        parts = [values for _, values in self.segments(channel)]
+        if len(parts) < 2:
+            return parts[0] if parts else self._select(channel, 0, 0)
+        return np.concatenate(parts, axis=self._time_axis(channel))
+
+    def latest_stamp(self):
+        if self._count == 0:
+            return None
+        return self._stamps[self._head - 1]
+
+    def oldest_stamp(self):
+        if self._count == 0:
+            return None
+        return self._stamps[(self._head - self._count) % self.capacity]
+
+    def clear(self):
+        # Sample numbering carries on, so readers tracking total stay consistent
+        self._stamps.fill(0)
+        self._data.fill(0)
+        self._count = 0
+
+
+class MappedRingBuffer(RingBuffer):
+    """
+        Read-only history on arrays already holding it, like the memory mapped columns
+        of a bag cache, which are then read in place instead of being copied into a
+        buffer. columns maps each channel, as given to view(), to its array. The history
+        is always full and never wraps around.
+    """
+    def __init__(self, stamps, columns, dtype=np.float64):
+        self.capacity = max(1, stamps.size)
+        self.channels = len(columns)
+        self._dtype = dtype
+        self._stamps = stamps
+        self._columns = columns
+        self._head = 0
+        self._count = stamps.size
+        self.total = stamps.size
+
+    def _select(self, channel, start, end):
+        if channel is None:
+            return np.array([column[start:end] for column in self._columns.values()], dtype=self._dtype)
+        column = self._columns.get(channel)
+        if column is None:
+            return np.empty(0, dtype=self._dtype)
+        return column[start:end]
+
+    def append(self, stamp, values):
+        raise ValueError("Mapped histories are read-only")
+
+    def extend(self, stamps, values):
+        raise ValueError("Mapped histories are read-only")
+
+    def clear(self):
+        raise ValueError("Mapped histories are read-only")
+
+
+class JointRingBuffer(RingBuffer):
+    """
+        Columnar [time, joint, field] history of a whole hand, filled with one
+        vectorized write per message. Plots, statistics and exports all read
+        zero-copy slices of it, addressed by joint name.
+    """
+    def __init__(self, capacity, joint_names=(), fields=3, dtype=np.float64):
+        self.fields = int(fields)
+        self.joint_names = list(joint_names)
+        self._joint_index = {name: index for index, name in enumerate(self.joint_names)}
+        super().__init__(capacity, channels=len(self.joint_names), dtype=dtype)
+
+    def _allocate(self):
+        return np.zeros((self.capacity, self.channels, self.fields), dtype=self._dtype)
+
+    def _write(self, index, rows):
+        self._data[index] = rows
+
+    def _write_block(self, start, end, rows):
+        self._data[start:end] = rows
+
+    def _time_slice(self, rows, start, end):
+        return rows[start:end]
+
+    def _select(self, channel, start, end):
+        # channel is a (joint name, field index) pair
+        if channel is None:
+            return self._data[start:end]
+        joint_name, field = channel
+        if joint_name not in self._joint_index:
+            return np.empty(0, dtype=self._dtype)
+        return self._data[start:end, self._joint_index[joint_name], field]
+
+    def _time_axis(self, channel):
+        return 0
+
+    def has_joint(self, joint_name):
+        return joint_name in self._joint_index
+
+    def joint_columns(self, joint_names):
+        """
+            Columns of the given joints in the buffer, adding the ones it doesn't have yet.
+            The layout only grows: joints are never moved nor dropped, so messages with a
+            subset of the joints, or from publishers with different joint lists, are written
+            by scattering their rows to these columns instead of reallocating the buffer.
+        """
+        added = [name for name in dict.fromkeys(joint_names) if name not in self._joint_index]
+        if added:
+            data = np.zeros((self.capacity, self.channels + len(added), self.fields), dtype=self._dtype)
+            data[:, :self.channels] = self._data
+            self._data = data
+            for name in added:
+                self._joint_index[name] = len(self.joint_names)
+                self.joint_names.append(name)
+            self.channels = len(self.joint_names)
+        return np.array([self._joint_index[name] for name in joint_names], dtype=np.intp)
+
+    def joint_view(self, joint_name):
+        column = self._joint_index[joint_name]
+        parts = [values[:, column] for _, values in self.segments()]
+        if len(parts) < 2:
+            return parts[0] if parts else self._data[:0, column]
+        return np.concatenate(parts)
+
+    def statistics(self):
+        # Reduced segment by segment, so a wrapped buffer is not copied
+        parts = [values for _, values in self.segments()]
+        if not parts:
+            return None
+        total = sum(part.shape[0] for part in parts)
+        return {'min': np.min([part.min(axis=0) for part in parts], axis=0),
+                'max': np.max([part.max(axis=0) for part in parts], axis=0),
+                'mean': np.sum([part.sum(axis=0) for part in parts], axis=0) / total}
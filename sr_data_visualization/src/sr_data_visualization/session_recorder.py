@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+
+META_FILE = "meta.json"
+TIME_COLUMN = "time"
+CSV_FILE = "data.csv"
+
+
+def _file_name(column):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', column) + ".bin"
+
+
+class _StreamWriter():
+    """
+        Column files of one recorded stream. Rows are gathered in a chunk kept in
+        column order and appended to one raw file per column when the chunk is full
+        or flushed, files are only opened while they are written.
+    """
+    def __init__(self, directory, columns, chunk_rows, dtype):
+        self.directory = directory
+        self.columns = [TIME_COLUMN] + list(columns)
+        self.files = [_file_name(column) for column in self.columns]
+        self.rows = 0
+        self._chunk = np.zeros((len(self.columns), chunk_rows), dtype=dtype)
+        self._used = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._write_header(dtype)
+
+    def _write_header(self, dtype):
+        with open(os.path.join(self.directory, META_FILE), 'w') as meta_file:
+            json.dump({'columns': self.columns, 'files': self.files, 'dtype': np.dtype(dtype).str},
+                      meta_file, indent=2)
+
+    def _write_chunk(self, chunk):
+        for file_name, column in zip(self.files, chunk):
+            with open(os.path.join(self.directory, file_name), 'ab') as column_file:
+                column.tofile(column_file)
+
+    def append(self, stamp, values):
+        self._chunk[0, self._used] = stamp
+        self._chunk[1:, self._used] = values
+        self._used += 1
+        if self._used == self._chunk.shape[1]:
+            self.flush()
+
+    def flush(self):
+        if self._used == 0:
+            return
+        self._write_chunk(self._chunk[:, :self._used])
+        self.rows += self._used
+        self._used = 0
+
+    def add_columns(self, columns):
+        """
+            Adds the columns not recorded yet after the existing ones, with NaN in the rows
+            already written, for streams whose set of columns grows.
+        """
+        added = [column for column in columns if column not in self.columns]
+        if not added:
+            return
+        self.flush()
+        self.columns += added
+        self.files += [_file_name(column) for column in added]
+        self._chunk = np.zeros((len(self.columns), self._chunk.shape[1]), dtype=self._chunk.dtype)
+        self._pad_columns(added)
+
+    def _pad_columns(self, columns):
+        padding = np.full(self.rows, np.nan, dtype=self._chunk.dtype)
+        for column in columns:
+            with open(os.path.join(self.directory, _file_name(column)), 'ab') as column_file:
+                padding.tofile(column_file)
+        self._write_header(self._chunk.dtype)
+
+
+class _CsvStreamWriter(_StreamWriter):
+    """
+        Stream written as a single CSV file with a header line, for tools that
+        can not read raw columns. Not read back by open_session.
+    """
+    def _write_header(self, dtype):
+        with open(os.path.join(self.directory, CSV_FILE), 'w') as csv_file:
+            csv_file.write(','.join(self.columns) + '\n')
+
+    def _write_chunk(self, chunk):
+        with open(os.path.join(self.directory, CSV_FILE), 'a') as csv_file:
+            np.savetxt(csv_file, chunk.T, delimiter=',', fmt=['%.6f'] + ['%.9g'] * (chunk.shape[0] - 1))
+
+    def _pad_columns(self, columns):
+        # Columns are rarely added, the file is rewritten with NaN in the new ones
+        path = os.path.join(self.directory, CSV_FILE)
+        with open(path) as csv_file:
+            lines = csv_file.read().splitlines()
+        padding = ',nan' * len(columns)
+        lines = [','.join(self.columns)] + [line + padding for line in lines[1:]]
+        with open(path, 'w') as csv_file:
+            csv_file.write('\n'.join(lines) + '\n')
+
+
+class SessionRecorder():
+    """
+        Records incoming streams to append-only columnar files, one directory per stream
+        with one raw file per column, which open_session maps back into memory.
+        Callbacks only queue a copy of each sample; a background thread writes them in
+        chunks. The queue is bounded, samples that do not fit are dropped and counted,
+        so memory use stays constant however long the session.
+    """
+    CHUNK_ROWS = 4096
+    QUEUE_SIZE = 20000
+    FLUSH_SECONDS = 2.0
+    WRITERS = {'binary': _StreamWriter, 'csv': _CsvStreamWriter}
+
+    def __init__(self, directory, dtype=np.float64, file_format='binary'):
+        self.directory = os.path.join(os.path.expanduser(directory), time.strftime("%Y-%m-%d-%H-%M-%S"))
+        # Sessions started within the same second get a suffix
+        name, suffix = self.directory, 1
+        while os.path.exists(self.directory):
+            self.directory = "{}-{}".format(name, suffix)
+            suffix += 1
+        self.dtype = dtype
+        self._writer_class = self.WRITERS[file_format]
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._writers = dict()
+        self._thread = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="session_recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def record(self, stream, columns, stamp, values):
+        """
+            Queues one sample of stream. columns names the values, it is only read
+            the first time the stream is seen and when it gets longer: the new columns
+            are added after the existing ones, NaN in the rows already written.
+        """
+        try:
+            self._queue.put_nowait((stream, columns, stamp, np.array(values, dtype=self.dtype).ravel()))
+        except queue.Full:
+            self.dropped += 1
+
+    def rows_written(self):
+        return sum(writer.rows for writer in list(self._writers.values()))
+
+    def _run(self):
+        next_flush = time.monotonic() + self.FLUSH_SECONDS
+        while True:
+            try:
+                item = self._queue.get(timeout=self.FLUSH_SECONDS)
+            except queue.Empty:
+                item = False
+
+            if item:
+                stream, columns, stamp, values = item
+                writer = self._writers.get(stream)
+                if writer is None:
+                    writer = self._writer_class(os.path.join(self.directory, stream), columns, self.CHUNK_ROWS,
+                                                self.dtype)
+                    self._writers[stream] = writer
+                if values.size > len(writer.columns) - 1 and values.size == len(columns):
+                    writer.add_columns(columns)
+                if values.size == len(writer.columns) - 1:
+                    writer.append(stamp, values)
+
+            if item is None or time.monotonic() >= next_flush:
+                for writer in self._writers.values():
+                    writer.flush()
+                next_flush = time.monotonic() + self.FLUSH_SECONDS
+            if item is None:
+                return
+
+
+def open_session(directory):
+    """
+        Maps a recorded session back into memory. Returns a dict of streams, each a
+        dict of column name to read-only numpy memmap, the time column included.
+    """
+    session = dict()
+    for root, _, files in os.walk(directory):
+        if META_FILE not in files:
+            continue
+        with open(os.path.join(root, META_FILE)) as meta_file:
+            meta = json.load(meta_file)
+        dtype = np.dtype(meta['dtype'])
+        paths = [os.path.join(root, file_name) for file_name in meta['files']]
+        sizes = [os.path.getsize(path) if os.path.exists(path) else 0 for path in paths]
+        # Columns can differ by a chunk if recording was interrupted
+        rows = min(sizes) // dtype.itemsize
+        stream = dict()
+        for column, path in zip(meta['columns'], paths):
+            if rows:
+                stream[column] = np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+            else:
+                stream[column] = np.empty(0, dtype=dtype)
+        session[os.path.relpath(root, directory)] = stream
+    return session
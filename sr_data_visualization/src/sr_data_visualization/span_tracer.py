@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import atexit
+import collections
+import functools
+import json
+import os
+import signal
+import threading
+import time
+
+# Set to a file path to trace the visualizers, the trace is written there on SIGUSR1 and at exit
+TRACE_FILE_VARIABLE = "SR_VISUALIZATION_TRACE"
+
+
+class _Span():
+    __slots__ = ('_tracer', '_name', '_category', '_start')
+
+    def __init__(self, tracer, name, category):
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self._tracer.add(self._name, self._category, self._start, time.perf_counter())
+        return False
+
+
+class _NoSpan():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class SpanTracer():
+    """
+        Records how long the hot paths of the visualizers take, on which thread, as
+        complete events of the Chrome trace format, which chrome://tracing and
+        ui.perfetto.dev show on a timeline with one row per thread. The latest
+        MAX_EVENTS spans are kept. While disabled, a span costs one attribute check.
+    """
+    MAX_EVENTS = 500000
+
+    def __init__(self):
+        self.enabled = False
+        self._events = collections.deque(maxlen=self.MAX_EVENTS)
+        self._thread_names = dict()
+        self._origin = time.perf_counter()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def span(self, name, category="function"):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, category)
+
+    def add(self, name, category, start, end):
+        thread = threading.current_thread()
+        if thread.ident not in self._thread_names:
+            self._thread_names[thread.ident] = thread.name
+        # deque.append is atomic, spans of every thread go to the same deque without a lock
+        self._events.append((name, category, start, end, thread.ident))
+
+    def clear(self):
+        self._events.clear()
+
+    def events(self):
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': thread_name}}
+                  for tid, thread_name in list(self._thread_names.items())]
+        for name, category, start, end, tid in list(self._events):
+            events.append({'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': tid,
+                           'ts': (start - self._origin) * 1e6, 'dur': (end - start) * 1e6})
+        return events
+
+    def dump(self, path):
+        with open(path + ".tmp", 'w') as trace_file:
+            json.dump({'traceEvents': self.events(), 'displayTimeUnit': 'ms'}, trace_file)
+        os.replace(path + ".tmp", path)
+        return len(self._events)
+
+
+def traced(name=None, category="function"):
+    """
+        Decorator recording every call of a function as a span, named after the function by default.
+    """
+    def decorate(function):
+        span_name = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            with _Span(tracer, span_name, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Shared by every plugin running in the same process
+tracer = SpanTracer()
+
+
+def _enable_from_environment():
+    path = os.environ.get(TRACE_FILE_VARIABLE)
+    if not path:
+        return
+    tracer.enable()
+    atexit.register(tracer.dump, path)
+    try:
+        signal.signal(signal.SIGUSR1, lambda *_: tracer.dump(path))
+    except ValueError:
+        # Signal handlers can only be installed from the main thread, the trace is still written at exit
+        pass
+
+
+_enable_from_environment()
@@ -16,13 +16,26 @@
 
 from __future__ import absolute_import
 
+import os
+import rosbag
+import rospkg
 import rospy
 import sys
+import time
 
+from sr_data_visualization.bag_cache import BagCache
+from sr_data_visualization.batch_delivery import batch_delivery
+from sr_data_visualization.bag_loader import first_message, load_bag
 from sr_data_visualization.data_plot import GenericDataPlot
+from sr_data_visualization.data_sources import hand_joints_of, hand_sources, history_seconds, warn_history_size
+from sr_data_visualization.ingestion_worker import ingestion
+from sr_data_visualization.performance_table import PerformanceTable
+from sr_data_visualization.raw_messages import JointStateDecoder
+from sr_data_visualization.session_recorder import SessionRecorder
+from sr_data_visualization.render_clock import RenderClock
+from sr_data_visualization.resource_registry import registry
 from rqt_gui_py.plugin import Plugin
-from sensor_msgs.msg import JointState
-from python_qt_binding.QtCore import Qt
+from python_qt_binding.QtCore import Qt, QThread, QTimer, pyqtSignal
 
 
 from python_qt_binding.QtWidgets import (
@@ -30,12 +43,18 @@ from python_qt_binding.QtWidgets import (
     QApplication,
     QTabWidget,
     QVBoxLayout,
+    QHBoxLayout,
+    QComboBox,
     QPushButton,
     QMessageBox,
-    QLabel
+    QFileDialog,
+    QLabel,
+    QProgressDialog,
+    QSplitter
 )
 
 from sr_data_visualization.data_tab import (
+    LazyDataTab,
     JointStatesDataTab,
     ControlLoopsDataTab,
     MotorStats1DataTab,
@@ -44,13 +63,65 @@ from sr_data_visualization.data_tab import (
 )
 
 
+class BagLoadThread(QThread):
+    """
+        Reads a bag into the sources of the tabs off the GUI thread, reporting how far it is.
+    """
+    progress = pyqtSignal(int, int)
+    # Number of messages read from the bag, -1 if it could not be read
+    loaded = pyqtSignal(int)
+
+    def __init__(self, bag_path, sources, cache_directory, parent=None):
+        super().__init__(parent)
+        self.bag_path = bag_path
+        self._sources = sources
+        self._cache_directory = cache_directory
+
+    def run(self):
+        try:
+            # Hashing the bag for its cache entry reads a few megabytes too
+            cache = BagCache(self._cache_directory, self.bag_path) if self._cache_directory else None
+            self.loaded.emit(load_bag(self.bag_path, self._sources, cache, self.progress.emit))
+        except (rosbag.ROSBagException, IOError) as exception:
+            rospy.logerr("Could not read %s: %s", self.bag_path, exception)
+            self.loaded.emit(-1)
+
+
 class SrDataVisualizer(Plugin):
     TITLE = "Data Visualizer"
+    TAB_CLASSES = {
+        "Joint States": JointStatesDataTab,
+        "Control Loops": ControlLoopsDataTab,
+        "Motor Stats 1": MotorStats1DataTab,
+        "Motor Stats 2": MotorStats2DataTab,
+        "Palm Extras": PalmExtrasDataTab
+    }
+    # Hidden tabs release their plot widgets after this many seconds, 0 keeps them forever
+    DEFAULT_RELEASE_INACTIVE_TABS_AFTER = 300.0
+    # Time windows offered to the plots, capped by the seconds of history kept
+    TIME_WINDOWS = [5, 10, 30, 60, 120, 300, 600, 1200, 1800]
 
     def __init__(self, context):
         super().__init__(context)
 
         self.context = context
+        warn_history_size()
+        self.render_clock = RenderClock(rospy.get_param("~render_fps", RenderClock.DEFAULT_FPS))
+        self._release_tabs_after = rospy.get_param("~release_inactive_tabs_after",
+                                                   self.DEFAULT_RELEASE_INACTIVE_TABS_AFTER)
+        self._release_timer = None
+        self._bag_thread = None
+        self._bag_progress = None
+        self._time_window = rospy.get_param("~time_window", GenericDataPlot.TIME_WINDOW)
+        self._paused = False
+        self._record_directory = rospy.get_param("~record_directory",
+                                                 os.path.join(rospkg.get_ros_home(), "sr_data_visualizer"))
+        self.recorder = None
+        # Bag opened offline, instead of listening to the live topics
+        self._bag_path = rospy.get_param("~bag", "")
+        # Signals decoded from bags, reused when a bag is opened again, an empty path disables it
+        self._bag_cache_directory = rospy.get_param("~bag_cache_directory",
+                                                    os.path.join(rospkg.get_ros_home(), "sr_data_visualizer_cache"))
         self.init_ui()
 
     def _detect_hand_id_and_joints(self):
@@ -58,11 +129,18 @@ class SrDataVisualizer(Plugin):
         self.hand_joints = None
 
         try:
-            joint_states_msg = rospy.wait_for_message("/joint_states", JointState, timeout=1)
-            self.joint_prefix = ([prefix for prefix in joint_states_msg.name if 'h_' in prefix][0]).split("_")[0] + "_"
-            joints = [joint for joint in joint_states_msg.name if self.joint_prefix in joint]
-            self.hand_joints = {self.joint_prefix[:-1]: joints}
-        except (rospy.exceptions.ROSException, IndexError):
+            if self._bag_path:
+                joint_states_msg = first_message(self._bag_path, "/joint_states")
+            else:
+                # Same raw subscription type as the joint states source, rospy gives every subscriber of a
+                # topic the type of the first one
+                joint_states_msg = JointStateDecoder().message_of(
+                    rospy.wait_for_message("/joint_states", rospy.AnyMsg, timeout=1))
+            joint_names = joint_states_msg.name if joint_states_msg is not None else []
+            self.joint_prefix, self.hand_joints = hand_joints_of(joint_names)
+        except (rospy.exceptions.ROSException, rosbag.ROSBagException, IOError):
+            self.joint_prefix = None
+        if not self.joint_prefix:
             rospy.logwarn("No hand connected or ROS bag is not playing")
 
         return self.joint_prefix and self.hand_joints
@@ -82,56 +160,238 @@ class SrDataVisualizer(Plugin):
             self.context.add_widget(self._widget)
 
     def fill_layout(self):
-        # Create info button on the top right of the gui
+        # Create bag, pause, record, time window selection and info buttons on the top right of the gui
+        top_layout = QHBoxLayout()
+        top_layout.addStretch()
+        self.open_bag_btn = QPushButton("Open bag")
+        self.open_bag_btn.setToolTip("Browse a ROS bag without replaying it")
+        self.open_bag_btn.clicked.connect(self.choose_bag)
+        top_layout.addWidget(self.open_bag_btn)
+        self.pause_btn = QPushButton("Pause")
+        self.pause_btn.setCheckable(True)
+        self.pause_btn.setToolTip("While paused, scroll on a plot to zoom, drag to pan and double click to reset")
+        self.pause_btn.toggled.connect(self.pause_toggled)
+        top_layout.addWidget(self.pause_btn)
+        self.record_btn = QPushButton("Record")
+        self.record_btn.setCheckable(True)
+        self.record_btn.setToolTip("Record all the data streams to " + self._record_directory)
+        self.record_btn.toggled.connect(self.record_toggled)
+        top_layout.addWidget(self.record_btn)
+        top_layout.addWidget(QLabel("Time window"))
+        self.time_window_combo = QComboBox()
+        top_layout.addWidget(self.time_window_combo)
+        self.performance_btn = QPushButton("Performance")
+        self.performance_btn.setCheckable(True)
+        self.performance_btn.setToolTip("Show what each plot of the current tab costs")
+        self.performance_btn.toggled.connect(self.performance_toggled)
+        top_layout.addWidget(self.performance_btn)
         self.information_btn = QPushButton("Info")
-        self.layout.addWidget(self.information_btn, alignment=Qt.AlignRight)
+        top_layout.addWidget(self.information_btn)
+        self.layout.addLayout(top_layout)
         self.information_btn.clicked.connect(self.display_information)
+        self.fill_time_windows()
+
         self.tab_container = QTabWidget()
+        self.performance_table = PerformanceTable()
+        self.performance_table.setVisible(False)
+        self.splitter = QSplitter(Qt.Horizontal)
+        self.splitter.addWidget(self.tab_container)
+        self.splitter.addWidget(self.performance_table)
+        self.layout.addWidget(self.splitter)
+        self.no_hand_label = QLabel("No hand connected or ROS bag is not playing")
+        self.layout.addWidget(self.no_hand_label, alignment=Qt.AlignCenter)
+        self.tab_container.currentChanged.connect(self.tab_changed)
+
+        if self._bag_path:
+            self.open_bag(self._bag_path)
+        else:
+            self.fill_tabs()
+        # Messages are decoded off the GUI thread, which only gets a batch of updated plots per frame
+        ingestion.start(batch_delivery, self.render_clock.fps)
+        self.render_clock.start()
+
+        if self._release_tabs_after > 0:
+            self._release_timer = QTimer(self._widget)
+            registry.connect(self._release_timer, 'timeout', self.release_inactive_tabs)
+            registry.start_timer(self._release_timer, int(min(self._release_tabs_after, 10.0) * 1000))
+
+    def fill_tabs(self):
+        # Drop the tabs of a previous hand or bag, their plots read histories that may have been replaced
+        self.tab_container.blockSignals(True)
+        while self.tab_container.count():
+            lazy_tab = self.tab_container.widget(0)
+            for graph in lazy_tab.graphs():
+                graph.plot_data(False)
+                self.render_clock.unregister(graph)
+            lazy_tab.release()
+            self.tab_container.removeTab(0)
+            lazy_tab.deleteLater()
+
+        self.performance_table.set_plots([])
+        found = self._detect_hand_id_and_joints()
+        self.tab_container.setVisible(bool(found))
+        self.no_hand_label.setVisible(not found)
+        self.record_btn.setEnabled(bool(found) and not self._bag_path)
+        if found:
+            self.create_tab("Joint States")
+            self.create_tab("Control Loops")
+            self.create_tab("Motor Stats 1")
+            self.create_tab("Motor Stats 2")
+            self.create_tab("Palm Extras")
+        self.tab_container.blockSignals(False)
+
+        # Only the visible tab is built now, the others when they are first shown
+        if found:
+            self.tab_changed(self.tab_container.currentIndex())
+        return found
 
-        if not self._detect_hand_id_and_joints():
-            self.layout.addWidget(QLabel("No hand connected or ROS bag is not playing"), alignment=Qt.AlignCenter)
+    def choose_bag(self):
+        bag_path, _ = QFileDialog.getOpenFileName(self._widget, "Open bag", os.path.dirname(self._bag_path),
+                                                  "ROS bags (*.bag)")
+        if bag_path:
+            self.open_bag(bag_path)
+
+    def open_bag(self, bag_path):
+        """
+            Shows a whole bag at once: the topics used by the tabs are read from the file in
+            one pass and the plots are paused on its full time range, ready to zoom and pan.
+        """
+        if self._bag_thread is not None:
             return
+        if self.recorder is not None:
+            self.record_btn.setChecked(False)
+        self._bag_path = bag_path
+        self.pause_btn.setChecked(True)
+        self.pause_btn.setEnabled(False)
+        self._widget.setWindowTitle(self.TITLE + " - " + os.path.basename(bag_path))
 
-        # Initialize tabs
-        self.layout.addWidget(self.tab_container)
+        # The tabs are only filled once their sources hold the bag, which is read on a thread
+        if self._detect_hand_id_and_joints():
+            self._bag_progress = QProgressDialog("Reading " + os.path.basename(bag_path), None, 0, 0, self._widget)
+            self._bag_progress.setWindowTitle("Open bag")
+            self._bag_progress.setCancelButton(None)
+            self._bag_progress.setWindowModality(Qt.WindowModal)
+            self._bag_progress.setMinimumDuration(500)
+            self._bag_thread = BagLoadThread(bag_path, self.recorded_sources(), self._bag_cache_directory,
+                                             self._widget)
+            self._bag_thread.progress.connect(self.bag_progress)
+            self._bag_thread.loaded.connect(self.bag_loaded)
+            self._bag_thread.start()
+        else:
+            self.fill_tabs()
 
-        # Create tabs
-        self.create_tab("Joint States")
-        self.create_tab("Control Loops")
-        self.create_tab("Motor Stats 1")
-        self.create_tab("Motor Stats 2")
-        self.create_tab("Palm Extras")
+    def bag_progress(self, read, total):
+        self._bag_progress.setMaximum(total)
+        self._bag_progress.setValue(read)
 
-        self.tab_container.currentChanged.connect(self.tab_changed)
+    def bag_loaded(self, messages):
+        self._bag_thread.wait()
+        if messages >= 0:
+            rospy.loginfo("Read %d messages from %s", messages, self._bag_thread.bag_path)
+        self._bag_thread = None
+        self._bag_progress.close()
+        self._bag_progress = None
+        self.fill_tabs()
 
-    def create_tab(self, tab_name):
-        if tab_name == "Joint States":
-            self.tab_created = JointStatesDataTab(tab_name, self.hand_joints,
-                                                  self.joint_prefix, parent=self.tab_container)
-        elif tab_name == "Control Loops":
-            self.tab_created = ControlLoopsDataTab(tab_name, self.hand_joints,
-                                                   self.joint_prefix, parent=self.tab_container)
-        elif tab_name == "Motor Stats 1":
-            self.tab_created = MotorStats1DataTab(tab_name, self.hand_joints,
-                                                  self.joint_prefix, parent=self.tab_container)
-        elif tab_name == "Motor Stats 2":
-            self.tab_created = MotorStats2DataTab(tab_name, self.hand_joints,
-                                                  self.joint_prefix, parent=self.tab_container)
-        elif tab_name == "Palm Extras":
-            self.tab_created = PalmExtrasDataTab(tab_name, self.hand_joints,
-                                                 self.joint_prefix, parent=self.tab_container)
+    def fill_time_windows(self):
+        longest = history_seconds()
+        windows = [window for window in self.TIME_WINDOWS if window < longest] + [longest]
+        if self._time_window not in windows:
+            windows = sorted(windows + [self._time_window])
+        for window in windows:
+            self.time_window_combo.addItem(self._time_window_label(window), window)
+        self.time_window_combo.setCurrentIndex(windows.index(self._time_window))
+        self.time_window_combo.currentIndexChanged.connect(self.time_window_changed)
+
+    @staticmethod
+    def _time_window_label(seconds):
+        if seconds >= 60 and seconds % 60 == 0:
+            return "{:d} min".format(int(seconds // 60))
+        return "{:g} s".format(seconds)
+
+    def time_window_changed(self, index):
+        self._time_window = self.time_window_combo.itemData(index)
+        with ingestion.lock:
+            for tab in range(self.tab_container.count()):
+                for graph in self.tab_container.widget(tab).graphs():
+                    graph.set_time_window(self._time_window)
+
+    def pause_toggled(self, paused):
+        self._paused = paused
+        self.pause_btn.setText("Resume" if paused else "Pause")
+        # Pausing reads the whole history of the plots
+        with ingestion.lock:
+            for tab in range(self.tab_container.count()):
+                for graph in self.tab_container.widget(tab).graphs():
+                    graph.set_paused(paused)
+
+    def recorded_sources(self):
+        return hand_sources(self.hand_joints, self.joint_prefix)
 
+    def record_toggled(self, record):
+        if not self.hand_joints:
+            return
+        if record:
+            self.recorder = SessionRecorder(self._record_directory)
+            self.recorder.start()
+            for source in self.recorded_sources():
+                source.set_recorder(self.recorder)
+            self.record_btn.setText("Stop recording")
+            rospy.loginfo("Recording data visualizer session to %s", self.recorder.directory)
+        elif self.recorder is not None:
+            for source in self.recorded_sources():
+                source.set_recorder(None)
+            self.recorder.stop()
+            rospy.loginfo("Recorded %d samples to %s, %d dropped", self.recorder.rows_written(),
+                          self.recorder.directory, self.recorder.dropped)
+            self.recorder = None
+            self.record_btn.setText("Record")
+
+    def create_tab(self, tab_name):
+        self.tab_created = LazyDataTab(tab_name, self.TAB_CLASSES[tab_name], self.hand_joints,
+                                       self.joint_prefix, parent=self.tab_container)
         self.tab_container.addTab(self.tab_created, tab_name)
 
     def tab_changed(self, index):
         for tab in range(self.tab_container.count()):
-            graphs = self.tab_container.widget(tab).findChildren(GenericDataPlot)
-            if tab is not index:
-                for graph in graphs:
+            lazy_tab = self.tab_container.widget(tab)
+            if tab != index:
+                for graph in lazy_tab.graphs():
                     graph.plot_data(False)
+                if lazy_tab.is_built() and lazy_tab.hidden_since is None:
+                    lazy_tab.hidden_since = time.monotonic()
             else:
-                for graph in graphs:
+                if not lazy_tab.is_built():
+                    with ingestion.lock:
+                        lazy_tab.build()
+                        for graph in lazy_tab.graphs():
+                            graph.set_time_window(self._time_window)
+                            graph.set_paused(self._paused)
+                            if self._bag_path:
+                                graph.show_all()
+                            self.render_clock.register(graph)
+                lazy_tab.hidden_since = None
+                for graph in lazy_tab.graphs():
                     graph.plot_data(True)
+                self.performance_table.set_plots(lazy_tab.graphs())
+
+    def performance_toggled(self, shown):
+        self.performance_table.setVisible(shown)
+        if shown:
+            self.performance_table.start()
+        else:
+            self.performance_table.stop()
+
+    def release_inactive_tabs(self):
+        now = time.monotonic()
+        for tab in range(self.tab_container.count()):
+            lazy_tab = self.tab_container.widget(tab)
+            if lazy_tab.hidden_since is not None and now - lazy_tab.hidden_since > self._release_tabs_after:
+                for graph in lazy_tab.graphs():
+                    graph.plot_data(False)
+                    self.render_clock.unregister(graph)
+                lazy_tab.release()
+                lazy_tab.hidden_since = None
 
     def display_information(self, message):
         message = "This GUI shows all the data available for the Dexterous Hand.\n" + \
@@ -147,6 +407,13 @@ class SrDataVisualizer(Plugin):
                   "The check buttons next to each graph name allows you to show the graphs you select " + \
                   "in larger detail by checking the boxes of the graphs you want to see and clicking " + \
                   "“Show Selected”. To return to the full graph view click “Reset”.\n\n" + \
+                  "“Pause” freezes the graphs while the data keeps being recorded: scroll on a graph " + \
+                  "to zoom in time, drag it to go back through the history and double click it to " + \
+                  "return to the latest data.\n\n" + \
+                  "“Record” writes all the data streams to disk until it is clicked again.\n\n" + \
+                  "“Open bag” shows the whole content of a ROS bag at once, without replaying it.\n\n" + \
+                  "“Performance” lists, for each graph of the current tab, the samples received per second, " + \
+                  "the time spent receiving and drawing them, the messages dropped and how full its history is.\n\n" + \
                   "NOTE: The more graphs that are on show on the data visualizer will be slower and " +  \
                   "can be unreadable. To be able to see a full scaled view of a specific data type, " + \
                   "toggle the correct radio button and check the graphs you want to see clearer."
@@ -158,10 +425,21 @@ class SrDataVisualizer(Plugin):
         msg.exec_()
 
     def shutdown_plugin(self):
+        if self.recorder is not None:
+            self.record_toggled(False)
+        if self._bag_thread is not None:
+            self._bag_thread.wait()
+        self.render_clock.stop()
+        ingestion.stop()
+        self.performance_table.stop()
+        if self._release_timer is not None:
+            registry.stop_timer(self._release_timer)
+            registry.disconnect(self._release_timer, 'timeout', self.release_inactive_tabs)
+        rospy.logdebug("Data visualizer frames: %s", self.render_clock.statistics())
         for tab in range(self.tab_container.count()):
-            graphs = self.tab_container.widget(tab).findChildren(GenericDataPlot)
-            for graph in graphs:
+            for graph in self.tab_container.widget(tab).graphs():
                 graph.plot_data(False)
+        rospy.logdebug("Data visualizer resources after shutdown: %s", registry.counters())
 
 
 if __name__ == "__main__":
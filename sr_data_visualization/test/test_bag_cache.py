@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import rostest
+
+from sr_data_visualization.bag_cache import BagCache
+
+NAME = "test_bag_cache"
+PKG = "sr_data_visualization"
+
+
+class TestBagCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.bag_path = os.path.join(self.directory, "session.bag")
+        with open(self.bag_path, 'wb') as bag_file:
+            bag_file.write(os.urandom(1000))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_saved_topics_are_mapped_back(self):
+        cache = BagCache(os.path.join(self.directory, "cache"), self.bag_path)
+        self.assertFalse(cache.has("/joint_states"))
+        cache.origin = 12.5
+        cache.save("/joint_states", {'': {'time': np.arange(5) * 0.1, 'rh_FFJ1.position': np.arange(5.0)}})
+        cache.save("/diagnostics_agg", {'rh_FFJ3': {'time': np.empty(0), 'Temperature': np.empty(0)}})
+
+        cache = BagCache(os.path.join(self.directory, "cache"), self.bag_path)
+        self.assertTrue(cache.has("/joint_states"))
+        self.assertEqual(cache.origin, 12.5)
+        table = cache.load("/joint_states")['']
+        self.assertEqual(list(table), ['time', 'rh_FFJ1.position'])
+        self.assertIsInstance(table['rh_FFJ1.position'], np.memmap)
+        np.testing.assert_array_equal(table['rh_FFJ1.position'], np.arange(5.0))
+        self.assertEqual(cache.load("/diagnostics_agg")['rh_FFJ3']['Temperature'].size, 0)
+
+    def test_other_content_is_another_entry(self):
+        cache = BagCache(os.path.join(self.directory, "cache"), self.bag_path)
+        cache.save("/joint_states", {'': {'time': np.arange(3.0)}})
+        with open(self.bag_path, 'ab') as bag_file:
+            bag_file.write(b"more messages")
+        self.assertFalse(BagCache(os.path.join(self.directory, "cache"), self.bag_path).has("/joint_states"))
+
+
+if __name__ == "__main__":
+    rostest.rosrun(PKG, NAME, TestBagCache)
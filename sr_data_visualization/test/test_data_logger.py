@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+import rostest
+
+from sr_data_visualization.data_logger import RotatingRecorder
+from sr_data_visualization.session_recorder import open_session
+
+NAME = "test_data_logger"
+PKG = "sr_data_visualization"
+
+
+class TestRotatingRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_only_the_latest_sessions_are_kept(self):
+        recorder = RotatingRecorder(self.directory, keep=2)
+        recorder.start()
+        sessions = []
+        for index in range(3):
+            sessions.append(recorder.current_directory())
+            recorder.record("joint_states", ["rh_FFJ1/position"], index, [index])
+            recorder.rotate()
+        recorder.stop()
+
+        self.assertEqual(recorder.rows, 3)
+        self.assertEqual(recorder.dropped, 0)
+        self.assertEqual(len(recorder.sessions), 2)
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted(os.path.basename(session)
+                                                                    for session in recorder.sessions))
+        self.assertEqual(len(open_session(sessions[2])["joint_states"]["time"]), 1)
+
+    def test_no_sample_is_lost_while_rotating(self):
+        recorder = RotatingRecorder(self.directory)
+        recorder.start()
+        recorded = []
+        running = threading.Event()
+        running.set()
+
+        def record():
+            while running.is_set():
+                recorder.record("joint_states", ["rh_FFJ1/position"], len(recorded), [0.0])
+                recorded.append(None)
+
+        writer = threading.Thread(target=record)
+        writer.start()
+        for _ in range(5):
+            recorder.rotate()
+        running.clear()
+        writer.join()
+        recorder.stop()
+
+        self.assertGreater(len(recorded), 0)
+        self.assertEqual(recorder.rows + recorder.dropped, len(recorded))
+
+    def test_sources_are_imported_without_qt(self):
+        # The logger runs on robots without a display
+        script = ("import sys\n"
+                  "import sr_data_visualization.data_sources\n"
+                  "import sr_data_visualization.data_logger\n"
+                  "print([name for name in sys.modules if name.split('.')[0] in ('python_qt_binding', 'PyQt5')])")
+        output = subprocess.check_output([sys.executable, "-c", script], universal_newlines=True)
+        self.assertEqual(output.strip(), "[]")
+
+
+if __name__ == "__main__":
+    rostest.rosrun(PKG, NAME, TestRotatingRecorder)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import unittest
+import rostest
+
+from sr_data_visualization.data_plot import PlotFrames
+
+NAME = "test_data_plot"
+PKG = "sr_data_visualization"
+
+
+class CountingFrames(PlotFrames):
+    # Only the subscription side of PlotFrames, without history or widget
+    def __init__(self, plotting=False):
+        self._plotting = plotting
+        self.subscriptions = 1 if plotting else 0
+
+    def subscribe(self):
+        self.subscriptions += 1
+
+    def unsubscribe(self):
+        self.subscriptions -= 1
+
+
+class TestPlotData(unittest.TestCase):
+
+    def test_plotting_again_keeps_the_subscription(self):
+        # Plots built with start_plotting=True are asked to plot again when their tab is first shown
+        frames = CountingFrames(plotting=True)
+        frames.plot_data(True)
+        self.assertTrue(frames._plotting)
+        self.assertEqual(frames.subscriptions, 1)
+
+    def test_subscribes_and_unsubscribes_once(self):
+        frames = CountingFrames()
+        frames.plot_data(True)
+        frames.plot_data(True)
+        self.assertEqual(frames.subscriptions, 1)
+        frames.plot_data(False)
+        frames.plot_data(False)
+        self.assertFalse(frames._plotting)
+        self.assertEqual(frames.subscriptions, 0)
+
+
+if __name__ == "__main__":
+    rostest.rosrun(PKG, NAME, TestPlotData)
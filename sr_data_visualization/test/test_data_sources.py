@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import unittest
+import rostest
+
+from sr_data_visualization.data_sources import TopicSource
+
+NAME = "test_data_sources"
+PKG = "sr_data_visualization"
+
+
+class Header():
+    def __init__(self, seq):
+        self.seq = seq
+
+
+class Message():
+    # What rospy delivers: the message and the header of the connection it came from
+    def __init__(self, seq, publisher):
+        if seq is not None:
+            self.header = Header(seq)
+        self._connection_header = {'callerid': publisher}
+
+
+class TestDroppedMessages(unittest.TestCase):
+
+    def test_publishers_are_numbered_independently(self):
+        source = TopicSource("/joint_states")
+        for seq in range(10):
+            source.count_message(Message(seq, "/hand"), 0.0)
+            source.count_message(Message(1000 + seq, "/simulator"), 0.0)
+        self.assertEqual(source.dropped, 0)
+
+        source.count_message(Message(13, "/hand"), 0.0)
+        self.assertEqual(source.dropped, 3)
+        self.assertEqual(source.messages, 21)
+
+    def test_queue_drops_count_for_topics_without_header(self):
+        source = TopicSource("/rh/palm_extras")
+        for _ in range(3):
+            source.count_message(Message(None, "/hand"), 0.0)
+        source._queue_full()
+        source._queue_full()
+        self.assertEqual(source.dropped, 2)
+
+
+if __name__ == "__main__":
+    rostest.rosrun(PKG, NAME, TestDroppedMessages)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import unittest
+import numpy as np
+import rostest
+
+from sr_data_visualization.decimation import EnvelopeDecimator, MinMaxPyramid, SlidingExtrema
+from sr_data_visualization.ring_buffer import RingBuffer
+
+NAME = "test_decimation"
+PKG = "sr_data_visualization"
+
+
+class TestEnvelopeDecimator(unittest.TestCase):
+
+    def fill(self, buffer, decimator, samples, frames):
+        for _ in range(frames):
+            for _ in range(samples):
+                stamp = buffer.total * 0.001
+                buffer.append(stamp, [np.sin(stamp * 7.0), (buffer.total * 7919) % 13])
+            decimator.update()
+
+    def test_envelope_matches_samples_of_each_column(self):
+        buffer = RingBuffer(20000, channels=2)
+        decimator = EnvelopeDecimator(buffer, [0, 1], 10.0, 100)
+        self.fill(buffer, decimator, 250, 60)
+        x_data, y_data = decimator.curves()
+        self.assertLessEqual(x_data.size, 2 * 101)
+
+        stamps = buffer.times()
+        bins = np.floor_divide(stamps, 0.1).astype(np.int64)
+        for index in range(0, x_data.size, 2):
+            column = bins == int(x_data[index] // 0.1)
+            for channel in range(2):
+                values = buffer.view(channel)[column]
+                self.assertEqual(y_data[channel][index], values.min())
+                self.assertEqual(y_data[channel][index + 1], values.max())
+
+    def test_incremental_and_rebuilt_envelopes_agree(self):
+        buffer = RingBuffer(20000, channels=2)
+        decimator = EnvelopeDecimator(buffer, [0, 1], 5.0, 64)
+        self.fill(buffer, decimator, 33, 400)
+        rebuilt = EnvelopeDecimator(buffer, [0, 1], 5.0, 64)
+        rebuilt.update()
+        for incremental, full in zip(decimator.curves()[1], rebuilt.curves()[1]):
+            np.testing.assert_array_equal(incremental, full)
+
+    def test_extrema_follow_the_window(self):
+        buffer = RingBuffer(20000, channels=2)
+        decimator = EnvelopeDecimator(buffer, [0, 1], 2.0, 50)
+        self.fill(buffer, decimator, 100, 100)
+        x_data, y_data = decimator.curves()
+        self.assertEqual(decimator.extrema([0]), (y_data[0].min(), y_data[0].max()))
+        self.assertEqual(decimator.extrema([0, 1]), (min(y_data[0].min(), y_data[1].min()),
+                                                     max(y_data[0].max(), y_data[1].max())))
+
+    def test_short_windows_are_not_decimated(self):
+        buffer = RingBuffer(100)
+        decimator = EnvelopeDecimator(buffer, [0], 10.0, 150)
+        for value in range(20):
+            buffer.append(value * 0.1, value)
+        decimator.update()
+        x_data, y_data = decimator.curves()
+        np.testing.assert_allclose(x_data, buffer.times())
+        np.testing.assert_array_equal(y_data[0], buffer.view(0))
+
+
+class TestSlidingExtrema(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        values = np.random.default_rng(1).normal(size=500)
+        extrema = SlidingExtrema()
+        for key, value in enumerate(values):
+            extrema.push(key, value, value)
+            extrema.expire(key - 20)
+            window = values[max(0, key - 20):key + 1]
+            self.assertEqual(extrema.extrema(), (window.min(), window.max()))
+
+    def test_latest_key_can_widen(self):
+        extrema = SlidingExtrema()
+        extrema.push(0, 1.0, 2.0)
+        extrema.push(1, 0.5, 1.5)
+        extrema.push(1, 0.0, 3.0)
+        self.assertEqual(extrema.extrema(), (0.0, 3.0))
+        extrema.expire(2)
+        self.assertIsNone(extrema.extrema())
+
+
+class TestMinMaxPyramid(unittest.TestCase):
+
+    def setUp(self):
+        self.buffer = RingBuffer(50000)
+        self.pyramid = MinMaxPyramid(self.buffer, [0])
+        values = np.random.default_rng(0).normal(size=70000)
+        for index, value in enumerate(values):
+            self.buffer.append(index * 0.001, value)
+            if index % 3000 == 0:
+                self.pyramid.update()
+
+    def test_zoom_levels_keep_extremes(self):
+        stamps = self.buffer.times()
+        values = self.buffer.view(0)
+        for start, end, pixels in [(20.0, 69.9, 150), (31.3, 33.8, 100), (68.5, 70.5, 40)]:
+            x_data, y_data = self.pyramid.query(start, end, pixels)
+            in_range = (stamps >= start) & (stamps < end)
+            self.assertLessEqual(x_data.size, 2 * pixels)
+            self.assertEqual(y_data[0].min(), values[in_range].min())
+            self.assertEqual(y_data[0].max(), values[in_range].max())
+
+    def test_samples_after_the_range_are_left_out(self):
+        buffer = RingBuffer(1000)
+        pyramid = MinMaxPyramid(buffer, [0])
+        for index in range(1000):
+            buffer.append(index * 0.001, 100.0 if index == 600 else 0.0)
+        x_data, y_data = pyramid.query(0.0, 0.59, 2)
+        self.assertEqual(y_data[0].max(), 0.0)
+        x_data, y_data = pyramid.query(0.0, 0.601, 2)
+        self.assertEqual(y_data[0].max(), 100.0)
+
+    def test_narrow_ranges_return_samples(self):
+        x_data, y_data = self.pyramid.query(40.0, 40.05, 100)
+        np.testing.assert_allclose(x_data, np.arange(40000, 40050) * 0.001)
+        self.assertEqual(y_data[0].size, 50)
+
+
+if __name__ == "__main__":
+    rostest.rosrun(PKG, NAME, TestEnvelopeDecimator)
+    rostest.rosrun(PKG, NAME, TestSlidingExtrema)
+    rostest.rosrun(PKG, NAME, TestMinMaxPyramid)
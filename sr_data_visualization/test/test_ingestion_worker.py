@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import sys
+import threading
+import time
+import unittest
+import rostest
+
+from python_qt_binding.QtCore import QCoreApplication
+
+from sr_data_visualization.batch_delivery import batch_delivery
+from sr_data_visualization.ingestion_worker import IngestionWorker, ingestion
+
+NAME = "test_ingestion_worker"
+PKG = "sr_data_visualization"
+
+
+class Consumer():
+    def __init__(self):
+        self.threads = []
+
+    def data_received(self):
+        self.threads.append(threading.current_thread())
+
+
+class SmallIngestionWorker(IngestionWorker):
+    MAX_QUEUED_MESSAGES = 5
+
+
+class TestIngestionWorker(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+    def process_events(self, seconds):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            self.app.processEvents()
+            time.sleep(0.005)
+
+    def test_messages_are_handled_inline_until_started(self):
+        consumer = Consumer()
+        threads = []
+
+        def ingest(data):
+            threads.append(threading.current_thread())
+            ingestion.notify([consumer])
+
+        ingestion.handler(ingest)(None)
+        self.assertEqual(threads, [threading.current_thread()])
+        self.assertEqual(consumer.threads, [threading.current_thread()])
+
+    def test_messages_of_a_frame_are_delivered_as_one_batch(self):
+        consumer = Consumer()
+        threads = []
+        received = []
+
+        def ingest(data):
+            threads.append(threading.current_thread())
+            received.append(data)
+            ingestion.notify([consumer])
+
+        ingestion.start(batch_delivery, fps=10)
+        try:
+            callback = ingestion.handler(ingest)
+            publisher = threading.Thread(target=lambda: [callback(index) for index in range(50)])
+            publisher.start()
+            publisher.join()
+            self.process_events(0.5)
+        finally:
+            ingestion.stop()
+
+        self.assertEqual(received, list(range(50)))
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertEqual(len(set(threads)), 1)
+        # Consumers are only told once per frame, on the GUI thread
+        self.assertGreaterEqual(len(consumer.threads), 1)
+        self.assertLess(len(consumer.threads), 50)
+        self.assertEqual(set(consumer.threads), {threading.current_thread()})
+
+    def test_a_failing_message_does_not_stop_the_worker(self):
+        received = []
+
+        def ingest(data):
+            if data == 0:
+                raise ValueError("malformed message")
+            received.append(data)
+
+        ingestion.start(batch_delivery, fps=10)
+        try:
+            callback = ingestion.handler(ingest)
+            for index in range(3):
+                callback(index)
+            self.process_events(0.3)
+            self.assertTrue(ingestion.is_running())
+        finally:
+            ingestion.stop()
+
+        self.assertEqual(received, [1, 2])
+
+    def test_stopping_with_a_full_queue(self):
+        worker = SmallIngestionWorker()
+        release = threading.Event()
+        received = []
+
+        def ingest(data):
+            if data == 0:
+                release.wait(5)
+            received.append(data)
+
+        worker.start(batch_delivery, fps=10)
+        callback = worker.handler(ingest)
+        callback(0)
+        time.sleep(0.1)
+        for index in range(1, 10):
+            callback(index)
+        self.assertEqual(worker.dropped, 4)
+
+        start = time.monotonic()
+        worker.stop()
+        self.assertLess(time.monotonic() - start, 2.0)
+        # Still busy with the first message, a restart waits for it instead of running a second worker
+        self.assertTrue(worker.is_running())
+        release.set()
+        worker.start(batch_delivery, fps=10)
+        try:
+            callback(20)
+            self.process_events(0.3)
+        finally:
+            worker.stop()
+        # The messages queued before the restart are dropped
+        self.assertEqual(received, [0, 20])
+        self.assertFalse(worker.is_running())
+
+    def test_handlers_compare_equal_to_their_function(self):
+        def ingest(data):
+            pass
+        self.assertEqual(ingestion.handler(ingest), ingestion.handler(ingest))
+        self.assertEqual(hash(ingestion.handler(ingest)), hash(ingest))
+
+
+if __name__ == "__main__":
+    rostest.rosrun(PKG, NAME, TestIngestionWorker)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import io
+import threading
+import unittest
+import numpy as np
+import rospy
+import rostest
+
+from sensor_msgs.msg import JointState
+
+from sr_data_visualization.raw_messages import JointStateDecoder, LatestMessage
+
+NAME = "test_raw_messages"
+PKG = "sr_data_visualization"
+
+
+def serialized(message):
+    buff = io.BytesIO()
+    message.serialize(buff)
+    return buff.getvalue()
+
+
+def joint_state(names, seq=7, position=None, velocity=None, effort=None):
+    message = JointState(name=names)
+    message.header.seq = seq
+    message.header.stamp = rospy.Time(12, 500000000)
+    message.header.frame_id = "hand"
+    message.position = list(np.arange(len(names)) + 0.5) if position is None else position
+    message.velocity = list(np.arange(len(names)) * 2.0) if velocity is None else velocity
+    message.effort = list(-np.arange(len(names), dtype=float)) if effort is None else effort
+    return message
+
+
+class TestJointStateDecoder(unittest.TestCase):
+
+    def test_decodes_like_genpy(self):
+        message = joint_state(["rh_FFJ1", "rh_FFJ2", "rh_WRJ1"])
+        decoded = JointStateDecoder().decode(serialized(message))
+
+        self.assertEqual(decoded.header.seq, 7)
+        self.assertEqual(decoded.header.frame_id, "hand")
+        self.assertAlmostEqual(decoded.header.stamp.to_sec(), 12.5)
+        self.assertFalse(decoded.header.stamp.is_zero())
+        self.assertEqual(decoded.name, message.name)
+        for field in ('position', 'velocity', 'effort'):
+            np.testing.assert_array_equal(getattr(decoded, field), getattr(message, field))
+
+    def test_names_are_reused_while_unchanged(self):
+        decoder = JointStateDecoder()
+        first = decoder.decode(serialized(joint_state(["rh_FFJ1", "rh_FFJ2"], seq=1)))
+        second = decoder.decode(serialized(joint_state(["rh_FFJ1", "rh_FFJ2"], seq=2, position=[3.0, 4.0])))
+        self.assertIs(second.name, first.name)
+        np.testing.assert_array_equal(second.position, [3.0, 4.0])
+
+        renamed = decoder.decode(serialized(joint_state(["rh_FFJ1", "rh_FFJ3"], seq=3)))
+        self.assertEqual(renamed.name, ["rh_FFJ1", "rh_FFJ3"])
+        self.assertIsNot(renamed.name, first.name)
+        # Publishers with different joint lists alternate without parsing the names again
+        again = decoder.decode(serialized(joint_state(["rh_FFJ1", "rh_FFJ2"], seq=4)))
+        self.assertIs(again.name, first.name)
+
+    def test_empty_arrays(self):
+        decoded = JointStateDecoder().decode(serialized(joint_state(["rh_FFJ1"], velocity=[], effort=[])))
+        self.assertEqual(decoded.velocity.size, 0)
+        self.assertEqual(decoded.effort.size, 0)
+        np.testing.assert_array_equal(decoded.position, [0.5])
+
+    def test_typed_messages_are_passed_through(self):
+        decoder = JointStateDecoder()
+        message = joint_state(["rh_FFJ1"])
+        self.assertIs(decoder.message_of(message), message)
+        self.assertEqual(decoder.message_of(RawMessage(message)).name, ["rh_FFJ1"])
+
+
+class RawMessage():
+    # What an AnyMsg subscription receives
+    def __init__(self, message):
+        self._buff = serialized(message)
+        self._connection_header = {'type': 'sensor_msgs/JointState'}
+
+
+class TestLatestMessage(unittest.TestCase):
+
+    def setUp(self):
+        self.topic = LatestMessage("/test_joint_states")
+        # Without readers nor listeners there is no subscription, the callback is called directly
+        self.topic._message_class = JointState
+
+    def test_only_the_newest_message_is_deserialized(self):
+        self.assertIsNone(self.topic.latest())
+        for seq in range(10):
+            self.topic.callback(RawMessage(joint_state(["rh_FFJ1"], seq=seq)))
+        self.assertEqual(self.topic.latest().header.seq, 9)
+        self.assertIs(self.topic.latest(), self.topic.latest())
+        self.assertEqual((self.topic.received, self.topic.decoded), (10, 1))
+
+    def test_listeners_get_every_message(self):
+        received = []
+        self.topic._listeners = [lambda message: received.append(message.header.seq)]
+        for seq in range(5):
+            self.topic.callback(RawMessage(joint_state(["rh_FFJ1"], seq=seq)))
+        self.assertEqual(received, list(range(5)))
+        # The newest one was already deserialized for the listeners
+        self.assertEqual(self.topic.latest().header.seq, 4)
+        self.assertEqual(self.topic.decoded, 5)
+
+    def test_older_messages_decoded_for_listeners_do_not_replace_the_latest(self):
+        older = RawMessage(joint_state(["rh_FFJ1"], seq=1))
+        self.topic.callback(RawMessage(joint_state(["rh_FFJ1"], seq=2)))
+        self.assertEqual(self.topic.latest().header.seq, 2)
+        # The worker is still catching up with a message older than the one the GUI read
+        self.topic._notify_listeners(older)
+        self.assertEqual(self.topic.latest().header.seq, 2)
+        self.assertEqual(self.topic.decoded, 2)
+
+    def test_wait_latest_returns_the_first_message(self):
+        publisher = threading.Timer(0.2, lambda: self.topic.callback(RawMessage(joint_state(["rh_FFJ1"], seq=3))))
+        publisher.start()
+        self.assertEqual(self.topic.wait_latest(timeout=5).header.seq, 3)
+        publisher.join()
+        # The temporary subscription is gone once the message was read
+        self.assertIsNone(self.topic._subscriber)
+
+    def test_wait_latest_times_out(self):
+        with self.assertRaises(rospy.ROSException):
+            self.topic.wait_latest(timeout=0.2)
+        self.assertIsNone(self.topic._subscriber)
+
+
+if __name__ == "__main__":
+    rostest.rosrun(PKG, NAME, TestJointStateDecoder)
+    rostest.rosrun(PKG, NAME, TestLatestMessage)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import unittest
+import numpy as np
+import rostest
+
+from sr_data_visualization.ring_buffer import RingBuffer, JointRingBuffer, MappedRingBuffer
+
+NAME = "test_ring_buffer"
+PKG = "sr_data_visualization"
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_view_is_ordered_oldest_to_newest(self):
+        buffer = RingBuffer(4)
+        for value in range(6):
+            buffer.append(value * 0.1, value)
+        np.testing.assert_array_equal(buffer.view(0), [2, 3, 4, 5])
+        np.testing.assert_allclose(buffer.times(), [0.2, 0.3, 0.4, 0.5])
+        self.assertEqual(len(buffer), 4)
+        self.assertAlmostEqual(buffer.latest_stamp(), 0.5)
+
+    def test_view_shares_memory_with_buffer(self):
+        buffer = RingBuffer(4, channels=2)
+        buffer.append(0.0, [1.0, 2.0])
+        self.assertTrue(np.shares_memory(buffer.view(1), buffer._data))
+        self.assertEqual(buffer.view(1)[-1], 2.0)
+
+    def test_partially_filled_buffer(self):
+        buffer = RingBuffer(4)
+        self.assertIsNone(buffer.latest_stamp())
+        buffer.append(1.0, 7.0)
+        np.testing.assert_array_equal(buffer.view(0), [7.0])
+        np.testing.assert_array_equal(buffer.times(), [1.0])
+        self.assertEqual(len(buffer), 1)
+
+    def test_segments_are_views_after_wrapping(self):
+        buffer = RingBuffer(4)
+        for value in range(6):
+            buffer.append(float(value), value)
+        segments = buffer.segments(0)
+        self.assertEqual(len(segments), 2)
+        np.testing.assert_array_equal(np.concatenate([values for _, values in segments]), [2, 3, 4, 5])
+        self.assertTrue(all(np.shares_memory(values, buffer._data) for _, values in segments))
+        self.assertEqual(buffer.count_since(3.5), 2)
+        self.assertEqual(buffer.total, 6)
+
+    def test_stamps_stay_monotonic(self):
+        buffer = RingBuffer(4)
+        buffer.append(2.0, 1.0)
+        buffer.append(1.0, 2.0)
+        np.testing.assert_array_equal(buffer.times(), [2.0, 2.0])
+
+
+class TestJointRingBuffer(unittest.TestCase):
+
+    def test_joint_slices_are_views(self):
+        buffer = JointRingBuffer(3, ["rh_FFJ1", "rh_FFJ2"], fields=3)
+        for stamp in range(4):
+            buffer.append(stamp, [[stamp, 10 * stamp, 0], [-stamp, 0, 0]])
+        np.testing.assert_array_equal(buffer.view(("rh_FFJ1", 1)), [10, 20, 30])
+        np.testing.assert_array_equal(buffer.view(("rh_FFJ2", 0)), [-1, -2, -3])
+        self.assertTrue(all(np.shares_memory(values, buffer._data) for _, values in buffer.segments(("rh_FFJ1", 0))))
+        np.testing.assert_array_equal(buffer.statistics()['max'][0], [3, 30, 0])
+
+    def test_joint_layout_only_grows(self):
+        buffer = JointRingBuffer(3, ["rh_FFJ1"], fields=1)
+        buffer.append(0.0, [[5.0]])
+        columns = buffer.joint_columns(["rh_WRJ1", "rh_FFJ1"])
+        np.testing.assert_array_equal(columns, [1, 0])
+        data = buffer._data
+        # Joints already known don't reallocate, whatever their order or subset
+        np.testing.assert_array_equal(buffer.joint_columns(["rh_FFJ1"]), [0])
+        self.assertIs(buffer._data, data)
+        row = np.zeros((2, 1))
+        row[columns] = [[1.0], [6.0]]
+        buffer.append(1.0, row)
+        np.testing.assert_array_equal(buffer.view(("rh_FFJ1", 0)), [5.0, 6.0])
+        np.testing.assert_array_equal(buffer.view(("rh_WRJ1", 0)), [0.0, 1.0])
+        self.assertEqual(buffer.view(("rh_MFJ1", 0)).size, 0)
+
+
+class TestMappedRingBuffer(unittest.TestCase):
+
+    def test_columns_are_read_in_place(self):
+        stamps = np.arange(5.0)
+        position = np.arange(5.0) * 2
+        buffer = MappedRingBuffer(stamps, {("rh_FFJ1", 0): position})
+        self.assertTrue(np.shares_memory(buffer.times(), stamps))
+        self.assertTrue(np.shares_memory(buffer.view(("rh_FFJ1", 0)), position))
+        np.testing.assert_array_equal(buffer.column(("rh_FFJ1", 0)), position)
+        self.assertEqual(buffer.view(("rh_MFJ1", 0)).size, 0)
+        self.assertEqual((buffer.oldest_stamp(), buffer.latest_stamp()), (0.0, 4.0))
+        self.assertEqual(buffer.count_since(3.0), 2)
+        with self.assertRaises(ValueError):
+            buffer.append(5.0, [0.0])
+        self.assertEqual(buffer.latest_stamp(), 4.0)
+
+    def test_empty_columns(self):
+        buffer = MappedRingBuffer(np.empty(0), {0: np.empty(0)})
+        self.assertIsNone(buffer.latest_stamp())
+        self.assertEqual(buffer.view(0).size, 0)
+
+
+if __name__ == "__main__":
+    rostest.rosrun(PKG, NAME, TestRingBuffer)
+    rostest.rosrun(PKG, NAME, TestJointRingBuffer)
+    rostest.rosrun(PKG, NAME, TestMappedRingBuffer)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import rostest
+
+from sr_data_visualization.session_recorder import SessionRecorder, open_session
+
+NAME = "test_session_recorder"
+PKG = "sr_data_visualization"
+
+
+class TestSessionRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_recorded_streams_are_mapped_back(self):
+        recorder = SessionRecorder(self.directory)
+        recorder.CHUNK_ROWS = 16
+        recorder.start()
+        for index in range(100):
+            recorder.record("joint_states", ["rh_FFJ1/position", "rh_FFJ1/effort"], index * 0.001,
+                            np.array([[index, -index]]))
+            if index % 10 == 0:
+                recorder.record("diagnostics_agg/rh_FFJ3", ["Temperature"], index * 0.001, [40.0])
+        recorder.stop()
+        self.assertEqual(recorder.rows_written(), 110)
+
+        session = open_session(recorder.directory)
+        self.assertEqual(sorted(session), ["diagnostics_agg/rh_FFJ3", "joint_states"])
+        joint_states = session["joint_states"]
+        self.assertIsInstance(joint_states["rh_FFJ1/position"], np.memmap)
+        np.testing.assert_array_equal(joint_states["rh_FFJ1/effort"], -np.arange(100))
+        np.testing.assert_allclose(joint_states["time"], np.arange(100) * 0.001)
+        np.testing.assert_array_equal(session["diagnostics_agg/rh_FFJ3"]["Temperature"], np.full(10, 40.0))
+
+    def test_new_columns_are_added_to_the_stream(self):
+        recorder = SessionRecorder(self.directory)
+        recorder.CHUNK_ROWS = 4
+        recorder.start()
+        for index in range(6):
+            recorder.record("joint_states", ["rh_FFJ1/position"], index, [index])
+        for index in range(6, 8):
+            recorder.record("joint_states", ["rh_FFJ1/position", "rh_WRJ1/position"], index, [np.nan, -index])
+        recorder.stop()
+
+        joint_states = open_session(recorder.directory)["joint_states"]
+        np.testing.assert_array_equal(joint_states["time"], np.arange(8))
+        np.testing.assert_array_equal(joint_states["rh_FFJ1/position"], list(range(6)) + [np.nan, np.nan])
+        np.testing.assert_array_equal(joint_states["rh_WRJ1/position"], [np.nan] * 6 + [-6, -7])
+
+    def test_csv_streams_have_a_header(self):
+        recorder = SessionRecorder(self.directory, file_format='csv')
+        recorder.start()
+        for index in range(3):
+            recorder.record("palm_extras", ["accel_x", "accel_y"], 1.5 + index, [index, 0.25])
+        recorder.stop()
+
+        with open(os.path.join(recorder.directory, "palm_extras", "data.csv")) as csv_file:
+            lines = csv_file.read().splitlines()
+        self.assertEqual(lines[0], "time,accel_x,accel_y")
+        self.assertEqual(lines[1:], ["1.500000,0,0.25", "2.500000,1,0.25", "3.500000,2,0.25"])
+
+
+if __name__ == "__main__":
+    rostest.rosrun(PKG, NAME, TestSessionRecorder)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+# Copyright 2022 Shadow Robot Company Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the Free
+# Software Foundation version 2 of the License.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for
+# more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import rostest
+
+from sr_data_visualization.span_tracer import tracer, traced
+
+NAME = "test_span_tracer"
+PKG = "sr_data_visualization"
+
+
+@traced(category="callback")
+def traced_callback():
+    with tracer.span("decode", "callback"):
+        pass
+
+
+class TestSpanTracer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        tracer.clear()
+
+    def tearDown(self):
+        tracer.enable(False)
+        tracer.clear()
+        shutil.rmtree(self.directory)
+
+    def test_disabled_tracer_records_nothing(self):
+        tracer.enable(False)
+        traced_callback()
+        self.assertFalse([event for event in tracer.events() if event['ph'] == 'X'])
+
+    def test_spans_of_each_thread_are_dumped(self):
+        tracer.enable()
+        traced_callback()
+        thread = threading.Thread(target=traced_callback, name="rospy_callback")
+        thread.start()
+        thread.join()
+
+        path = os.path.join(self.directory, "trace.json")
+        self.assertEqual(tracer.dump(path), 4)
+        with open(path) as trace_file:
+            events = json.load(trace_file)['traceEvents']
+        spans = [event for event in events if event['ph'] == 'X']
+        self.assertEqual(sorted(span['name'] for span in spans),
+                         ["decode", "decode", "traced_callback", "traced_callback"])
+        self.assertEqual(len({span['tid'] for span in spans}), 2)
+        outer = [span for span in spans if span['name'] == "traced_callback"][0]
+        inner = [span for span in spans if span['name'] == "decode" and span['tid'] == outer['tid']][0]
+        self.assertLessEqual(outer['ts'], inner['ts'])
+        self.assertGreaterEqual(outer['ts'] + outer['dur'], inner['ts'] + inner['dur'])
+        self.assertIn("rospy_callback", [event['args']['name'] for event in events if event['ph'] == 'M'])
+
+
+if __name__ == "__main__":
+    rostest.rosrun(PKG, NAME, TestSpanTracer)
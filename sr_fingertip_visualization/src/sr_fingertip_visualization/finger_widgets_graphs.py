@@ -15,7 +15,6 @@
 # with this program. If not, see <http://www.gnu.org/licenses/>.
 
 from __future__ import absolute_import, division
-import rospy
 import rospkg
 from enum import Enum
 import os
@@ -43,7 +42,10 @@ from sr_fingertip_visualization.tactile_points import (
 )
 
 from sr_fingertip_visualization.tab_layouts_generic import GenericTabLayout
-from sr_robot_msgs.msg import ShadowPST, BiotacAll
+from sr_data_visualization.ingestion_worker import ingestion
+from sr_data_visualization.raw_messages import latest_message
+from sr_data_visualization.resource_registry import registry
+from sr_data_visualization.span_tracer import traced
 from sr_fingertip_visualization.generic_plots import GenericDataPlot
 
 
@@ -83,9 +85,10 @@ class FingerWidgetGraphGeneric(QGroupBox):
             self.start_timer_and_subscriber()
 
     def stop_timer_and_subscriber(self):
-        self._timer.stop()
+        registry.stop_timer(self._timer)
         if self._subscriber:
-            self._subscriber.unregister()
+            registry.disconnect(self._timer, 'timeout', self.timerEvent)
+            self._subscriber.remove_listener(self._tactile_data_callback)
             self._subscriber = None
 
     def get_data_checkboxes(self):
@@ -98,7 +101,7 @@ class FingerWidgetGraphPST(FingerWidgetGraphGeneric):
         self._CONST_DATA_FIELDS = ['pressure', 'temperature']
         self._initialize_data_structure()
 
-        self._tactile_data_callback(rospy.wait_for_message('/{}/tactile'.format(self._side), ShadowPST))
+        self._tactile_data_callback(latest_message('/{}/tactile'.format(self._side)).wait_latest())
         self._plot_colors = list(self.plot_descriptors.keys())[:len(list(self._data.keys()))]
         self._plot = GenericDataPlot(self._data, list(self.plot_descriptors.keys()))
 
@@ -130,11 +133,13 @@ class FingerWidgetGraphPST(FingerWidgetGraphGeneric):
 
     def start_timer_and_subscriber(self):
         if not self._subscriber:
-            self._subscriber = rospy.Subscriber('/{}/tactile'.format(self._side), ShadowPST,
-                                                self._tactile_data_callback)
-            self._timer.timeout.connect(self.timerEvent)
-            self._timer.start(10)
+            # Every message is decoded, on the ingestion worker, to fill the plot buffers
+            self._subscriber = latest_message('/{}/tactile'.format(self._side))
+            self._subscriber.add_listener(self._tactile_data_callback)
+            registry.connect(self._timer, 'timeout', self.timerEvent)
+            registry.start_timer(self._timer, 10)
 
+    @traced(category="callback")
     def _tactile_data_callback(self, data):
         for i, finger in enumerate(self._CONST_FINGERS):
             if finger == self._finger:
@@ -146,10 +151,13 @@ class FingerWidgetGraphPST(FingerWidgetGraphGeneric):
                     elif data_field == "temperature":
                         self._data[data_field].append(data.temperature[i])
 
+    @traced(category="timer")
     def timerEvent(self):
-        for data_field in self._CONST_DATA_FIELDS:
-            if self._data_checkboxes[data_field].isChecked():
-                self._plot.update_plot(self._data)
+        # Tactile data is written by the ingestion worker under its lock
+        with ingestion.lock:
+            for data_field in self._CONST_DATA_FIELDS:
+                if self._data_checkboxes[data_field].isChecked():
+                    self._plot.update_plot(self._data)
 
 
 class FingerWidgetGraphBiotac(FingerWidgetGraphGeneric):
@@ -157,7 +165,7 @@ class FingerWidgetGraphBiotac(FingerWidgetGraphGeneric):
         super().__init__(finger, side, parent=parent)
         self._CONST_DATA_FIELDS = ['pac0', 'pac1', 'pdc', 'tac', 'tdc']
         self._initialize_data_structure()
-        self._tactile_data_callback(rospy.wait_for_message('/{}/tactile'.format(self._side), BiotacAll))
+        self._tactile_data_callback(latest_message('/{}/tactile'.format(self._side)).wait_latest())
 
         self._plot_colors = list(self.plot_descriptors.keys())[:len(list(self._data.keys()))]
         self._plot = GenericDataPlot(self._data, list(self.plot_descriptors.keys()))
@@ -194,6 +202,7 @@ class FingerWidgetGraphBiotac(FingerWidgetGraphGeneric):
         if isinstance(caller, QCheckBox):
             self._plot.show_trace(caller.text(), state)
 
+    @traced(category="callback")
     def _tactile_data_callback(self, data):
         for i, finger in enumerate(self._CONST_FINGERS):
             if finger == self._finger:
@@ -213,15 +222,19 @@ class FingerWidgetGraphBiotac(FingerWidgetGraphGeneric):
 
     def start_timer_and_subscriber(self):
         if not self._subscriber:
-            self._subscriber = rospy.Subscriber('/{}/tactile'.format(self._side), BiotacAll,
-                                                self._tactile_data_callback)
-            self._timer.timeout.connect(self.timerEvent)
-            self._timer.start(10)
+            # Every message is decoded, on the ingestion worker, to fill the plot buffers
+            self._subscriber = latest_message('/{}/tactile'.format(self._side))
+            self._subscriber.add_listener(self._tactile_data_callback)
+            registry.connect(self._timer, 'timeout', self.timerEvent)
+            registry.start_timer(self._timer, 10)
 
+    @traced(category="timer")
     def timerEvent(self):
-        for data_field in self._CONST_DATA_FIELDS:
-            if self._data_checkboxes[data_field].isChecked():
-                self._plot.update_plot(self._data)
+        # Tactile data is written by the ingestion worker under its lock
+        with ingestion.lock:
+            for data_field in self._CONST_DATA_FIELDS:
+                if self._data_checkboxes[data_field].isChecked():
+                    self._plot.update_plot(self._data)
 
 
 class FingerWidgetGraphBiotacBlank(FingerWidgetGraphGeneric):
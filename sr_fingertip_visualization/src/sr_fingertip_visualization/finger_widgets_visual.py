@@ -41,7 +41,9 @@ from sr_fingertip_visualization.tactile_points import (
     TactilePointBiotacSPMinus
 )
 from sr_fingertip_visualization.tab_layouts_generic import GenericTabLayout
-from sr_robot_msgs.msg import ShadowPST, BiotacAll
+from sr_data_visualization.raw_messages import latest_message
+from sr_data_visualization.resource_registry import registry
+from sr_data_visualization.span_tracer import traced
 
 
 class FingerWidgetVisualPST(QGroupBox):
@@ -63,7 +65,7 @@ class FingerWidgetVisualPST(QGroupBox):
 
         layout = QVBoxLayout()
         layout.addWidget(self._tactile_point_widget, alignment=Qt.AlignCenter)
-        self._tactile_data_callback(rospy.wait_for_message('/{}/tactile'.format(self._side), ShadowPST))
+        self._tactile_data_callback(latest_message('/{}/tactile'.format(self._side)).wait_latest())
         self.setLayout(layout)
 
     def refresh(self, state):
@@ -74,17 +76,25 @@ class FingerWidgetVisualPST(QGroupBox):
 
     def start_timer_and_subscriber(self):
         if not self._subscriber:
-            self._subscriber = rospy.Subscriber('/{}/tactile'.format(self._side), ShadowPST,
-                                                self._tactile_data_callback)
-            self._timer.timeout.connect(self.timerEvent)
-            self._timer.start(10)
+            # Only the newest message is deserialized, when the widget is refreshed
+            self._subscriber = latest_message('/{}/tactile'.format(self._side))
+            self._subscriber.add_reader(self)
+            registry.connect(self._timer, 'timeout', self.timerEvent)
+            registry.start_timer(self._timer, 10)
 
     def stop_timer_and_subscriber(self):
-        self._timer.stop()
+        registry.stop_timer(self._timer)
         if self._subscriber:
-            self._subscriber.unregister()
+            registry.disconnect(self._timer, 'timeout', self.timerEvent)
+            self._subscriber.remove_reader(self)
             self._subscriber = None
 
+    def _read_latest_message(self):
+        message = self._subscriber.latest() if self._subscriber else None
+        if message is not None:
+            self._tactile_data_callback(message)
+
+    @traced(category="callback")
     def _tactile_data_callback(self, data):
         for i, finger in enumerate(self._CONST_FINGERS):
             if finger == self._finger:
@@ -94,7 +104,9 @@ class FingerWidgetVisualPST(QGroupBox):
                     elif data_field == "temperature":
                         self._data[data_field] = data.temperature[i]
 
+    @traced(category="timer")
     def timerEvent(self):
+        self._read_latest_message()
         self._tactile_point_widget.update_data(self._data)
 
 
@@ -151,7 +163,7 @@ class FingerWidgetVisualBiotacSPMinus(QGroupBox):
 
         layout = QVBoxLayout()
         layout.addWidget(self._tactile_point_widget, alignment=Qt.AlignCenter)
-        self._tactile_data_callback(rospy.wait_for_message('/{}/tactile'.format(self._side), BiotacAll))
+        self._tactile_data_callback(latest_message('/{}/tactile'.format(self._side)).wait_latest())
         self.setLayout(layout)
 
     def refresh(self, state):
@@ -162,17 +174,25 @@ class FingerWidgetVisualBiotacSPMinus(QGroupBox):
 
     def start_timer_and_subscriber(self):
         if not self._subscriber:
-            self._subscriber = rospy.Subscriber('/{}/tactile'.format(self._side), BiotacAll,
-                                                self._tactile_data_callback)
-            self._timer.timeout.connect(self.timerEvent)
-            self._timer.start(10)
+            # Only the newest message is deserialized, when the widget is refreshed
+            self._subscriber = latest_message('/{}/tactile'.format(self._side))
+            self._subscriber.add_reader(self)
+            registry.connect(self._timer, 'timeout', self.timerEvent)
+            registry.start_timer(self._timer, 10)
 
     def stop_timer_and_subscriber(self):
-        self._timer.stop()
+        registry.stop_timer(self._timer)
         if self._subscriber:
-            self._subscriber.unregister()
+            registry.disconnect(self._timer, 'timeout', self.timerEvent)
+            self._subscriber.remove_reader(self)
             self._subscriber = None
 
+    def _read_latest_message(self):
+        message = self._subscriber.latest() if self._subscriber else None
+        if message is not None:
+            self._tactile_data_callback(message)
+
+    @traced(category="callback")
     def _tactile_data_callback(self, data):
         for i, finger in enumerate(self._CONST_FINGERS):
             if finger == self._finger:
@@ -188,7 +208,9 @@ class FingerWidgetVisualBiotacSPMinus(QGroupBox):
                     elif data_field == "tdc":
                         self._data[data_field] = data.tactiles[i].tdc
 
+    @traced(category="timer")
     def timerEvent(self):
+        self._read_latest_message()
         self._tactile_point_widget.update_data(self._data)
 
 
@@ -244,7 +266,7 @@ class FingerWidgetVisualBiotacSPPlus(QGroupBox):
         layout.addWidget(container_widget, alignment=Qt.AlignCenter)
         layout.addWidget(self._data_bar)
 
-        self._tactile_data_callback(rospy.wait_for_message('/{}/tactile'.format(self._side), BiotacAll))
+        self._tactile_data_callback(latest_message('/{}/tactile'.format(self._side)).wait_latest())
         self._electrodes_to_display_count = len(self._data['electrodes'])
         self.setLayout(layout)
 
@@ -256,17 +278,25 @@ class FingerWidgetVisualBiotacSPPlus(QGroupBox):
 
     def start_timer_and_subscriber(self):
         if self._succeded_config_load and not self._subscriber:
-            self._subscriber = rospy.Subscriber('/{}/tactile'.format(self._side), BiotacAll,
-                                                self._tactile_data_callback)
-            self._timer.timeout.connect(self.timerEvent)
-            self._timer.start(10)
+            # Only the newest message is deserialized, when the widget is refreshed
+            self._subscriber = latest_message('/{}/tactile'.format(self._side))
+            self._subscriber.add_reader(self)
+            registry.connect(self._timer, 'timeout', self.timerEvent)
+            registry.start_timer(self._timer, 10)
 
     def stop_timer_and_subscriber(self):
-        self._timer.stop()
+        registry.stop_timer(self._timer)
         if self._subscriber:
-            self._subscriber.unregister()
+            registry.disconnect(self._timer, 'timeout', self.timerEvent)
+            self._subscriber.remove_reader(self)
             self._subscriber = None
 
+    def _read_latest_message(self):
+        message = self._subscriber.latest() if self._subscriber else None
+        if message is not None:
+            self._tactile_data_callback(message)
+
+    @traced(category="callback")
     def _tactile_data_callback(self, data):
         for i, finger in enumerate(self._CONST_FINGERS):
             if finger == self._finger:
@@ -286,7 +316,9 @@ class FingerWidgetVisualBiotacSPPlus(QGroupBox):
                     elif data_field == "electrodes":
                         self._data[data_field] = list(data.tactiles[i].electrodes)
 
+    @traced(category="timer")
     def timerEvent(self):
+        self._read_latest_message()
         for i in range(self._electrodes_to_display_count):
             try:
                 self._tactile_point_widget[i].update_data(self._data[self._datatype_to_display][i])
@@ -17,44 +17,44 @@
 from __future__ import absolute_import
 
 import numpy as np
-import rospy
 
-from python_qt_binding.QtGui import QPen, QColor
-from python_qt_binding.QtCore import Qt
+from python_qt_binding.QtGui import QColor
+from python_qt_binding.QtWidgets import QVBoxLayout, QWidget
 
-from qwt import (
-    QwtPlot,
-    QwtPlotCurve,
-    QwtScaleDraw
-)
+from sr_data_visualization.plot_backends import plot_view_class
+from sr_data_visualization.span_tracer import traced
 
 
 class Trace():
-    def __init__(self, name, color):
+    def __init__(self, name, color, view):
         self.name = name
-        self._plot = QwtPlotCurve(name)
-        self._plot.setPen(QPen(color))
+        self._view = view
+        self._curve = view.add_curve(name, color)
         self._data = None
 
     def update_trace_data(self, data):
-        self._data = data
-        self._plot.setData(np.linspace(0, 100, len(data)), data)
+        self._data = np.asarray(data, dtype=float)
+        self._view.set_curve_data(self._curve, np.linspace(0, 100, len(self._data)), self._data)
 
-    def get_plot(self):
-        return self._plot
+    def get_curve(self):
+        return self._curve
 
 
-class GenericDataPlot(QwtPlot):
+class GenericDataPlot(QWidget):
+    """
+        Plot of the fingertip data fields, drawn by the plot view of the selected backend (~plot_backend).
+    """
     _GRAPH_MINW = 80
     _GRAPH_MINH = 100
 
     def __init__(self, data, colors):
         super().__init__()
         self._colors = colors
-        self.setCanvasBackground(Qt.white)
         self.setMinimumSize(self._GRAPH_MINW, self._GRAPH_MINH)
-        self.axisScaleDraw(QwtPlot.xBottom).enableComponent(QwtScaleDraw.Labels, False)
-        self.axisScaleDraw(QwtPlot.yLeft).enableComponent(QwtScaleDraw.Labels, False)
+        self._view = plot_view_class()(self)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self._view)
 
         self._traces = dict()
         self.generate_plots(data)
@@ -62,20 +62,20 @@ class GenericDataPlot(QwtPlot):
     def generate_plots(self, data):
         self._data_fields = list(data.keys())
         for i, data_field in enumerate(self._data_fields):
-            self._traces[data_field] = Trace(data_field, QColor(self._colors[i]))
+            self._traces[data_field] = Trace(data_field, QColor(self._colors[i]), self._view)
+            self._view.set_curve_shown(self._traces[data_field].get_curve(), False)
 
     def show_trace(self, data_field, show=True):
-        self.axisScaleDraw(QwtPlot.yLeft).enableComponent(QwtScaleDraw.Labels, True)
-        self.axisAutoScale(QwtPlot.yLeft)
-        if show:
-            self._traces[data_field].get_plot().attach(self)
-            return
-        self._traces[data_field].get_plot().detach()
+        self._view.set_labels_shown(False, True)
+        self._view.auto_y_range()
+        self._view.set_curve_shown(self._traces[data_field].get_curve(), show)
 
+    @traced(category="replot")
     def update_plot(self, data):
         for data_field in list(data.keys()):
-            if self._traces[data_field].get_plot().plot():
+            if self._view.is_curve_shown(self._traces[data_field].get_curve()):
                 self._traces[data_field].update_trace_data(data[data_field])
+        self._view.refresh()
 
     def get_data_fields(self):
         return self._data_fields
@@ -34,6 +34,9 @@ from python_qt_binding.QtWidgets import (
 
 from sr_fingertip_visualization.tab_layouts_visual import VisualizationTab
 from sr_fingertip_visualization.tab_layouts_graph import GraphTab
+from sr_data_visualization.batch_delivery import batch_delivery
+from sr_data_visualization.ingestion_worker import ingestion
+from sr_data_visualization.raw_messages import latest_message
 from sr_robot_msgs.msg import BiotacAll, ShadowPST
 
 
@@ -45,6 +48,8 @@ class SrFingertipVisualizer(Plugin):
         self._detect_hand_and_tactile_type()
         self.context = context
         self._init_ui()
+        # Tactile messages are handled off the GUI thread
+        ingestion.start(batch_delivery)
 
     def _detect_hand_and_tactile_type(self):
         self._tactile_topics = dict()
@@ -55,7 +60,7 @@ class SrFingertipVisualizer(Plugin):
 
             for topic_type in [type_right, type_left]:
                 if topic_type[0]:
-                    rospy.wait_for_message(topic_type[1], rostopic.get_topic_class(topic_type[1])[0], timeout=1)
+                    latest_message(topic_type[1]).wait_latest(timeout=1)
 
             self._hand_ids = [topic_data[1].split('/')[1] for topic_data in [type_right, type_left] if topic_data[1]]
             self._types = [topic_data[0].split('/')[1] for topic_data in [type_right, type_left] if topic_data[1]]
@@ -146,6 +151,7 @@ class SrFingertipVisualizer(Plugin):
             for tactile_widget in tactile_widgets.values():
                 for fingertip_widget in tactile_widget.get_finger_widgets().values():
                     fingertip_widget.stop_timer_and_subscriber()
+        ingestion.stop()
 
 
 if __name__ == "__main__":
@@ -17,9 +17,7 @@
 from __future__ import absolute_import, division
 
 import os
-import rospy
 import rospkg
-from sr_robot_msgs.msg import ShadowPST, BiotacAll
 from enum import Enum
 
 
@@ -37,6 +35,7 @@ from python_qt_binding.QtWidgets import (
     QCheckBox,
     QStackedLayout
 )
+from sr_data_visualization.raw_messages import latest_message
 
 
 class GenericGraphTab(QWidget):
@@ -190,7 +189,7 @@ class BiotacType(Enum):
         sp_plus_electrode_count_range = [1, 30]
 
         fingers = ['ff', 'mf', 'rf', 'lf', 'th']
-        msg = rospy.wait_for_message("/{}/tactile".format(side), BiotacAll, timeout=1)
+        msg = latest_message("/{}/tactile".format(side)).wait_latest(timeout=1)
         for i, finger in enumerate(fingers):
             if finger == selected_finger:
                 sum_of_electrode_values = sum(msg.tactiles[i].electrodes)
@@ -15,7 +15,6 @@
 # with this program. If not, see <http://www.gnu.org/licenses/>.
 
 from __future__ import absolute_import, division
-import rospy
 from enum import Enum
 
 from python_qt_binding.QtCore import Qt, QTimer
@@ -50,7 +49,8 @@ from sr_fingertip_visualization.finger_widgets_visual import (
     FingerWidgetVisualBiotacBlank,
     FingerWidgetVisualPST
 )
-from sr_robot_msgs.msg import ShadowPST, BiotacAll
+from sr_data_visualization.raw_messages import latest_message
+from sr_data_visualization.span_tracer import traced
 
 
 class VisualizationTab(QWidget):
@@ -91,6 +91,7 @@ class PSTVisualizationTab(GenericTabLayout):
     def _initialize_data_structure(self):
         self._data = dict.fromkeys(self._CONST_FINGERS, dict.fromkeys(self._CONST_DATA_FIELDS, 0))
 
+    @traced(category="callback")
     def _tactile_data_callback(self, data):
         for i, finger in enumerate(self._CONST_FINGERS):
             for data_field in self._CONST_DATA_FIELDS:
@@ -133,7 +134,7 @@ class BiotacVisualizationTab(GenericTabLayout):
                     self._data[finger][data_field] = list()
                     self._data_labels[finger][data_field] = 0
 
-        msg = rospy.wait_for_message('/{}/tactile'.format(self._side), BiotacAll)
+        msg = latest_message('/{}/tactile'.format(self._side)).wait_latest()
         self._version = "v2" if len(msg.tactiles[0].electrodes) == 24 else "v1"
         self._tactile_data_callback(msg)
 
@@ -162,6 +163,7 @@ class BiotacVisualizationTab(GenericTabLayout):
 
         self._electrode_count = len(self._coordinates[self._version]['sensing']['x'])
 
+    @traced(category="callback")
     def _tactile_data_callback(self, data):
         for i, finger in enumerate(self._CONST_FINGERS):
             for data_field in self._CONST_DATA_FIELDS:
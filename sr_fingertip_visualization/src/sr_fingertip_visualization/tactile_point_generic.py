@@ -20,6 +20,7 @@ from python_qt_binding.QtGui import QColor, QPainter
 from python_qt_binding.QtCore import QPoint
 from python_qt_binding.QtWidgets import QWidget
 import rospy
+from sr_data_visualization.span_tracer import traced
 
 
 class TactilePoint(QWidget):
@@ -39,6 +40,7 @@ class TactilePoint(QWidget):
         self._center = QPoint(self.frameSize().width()/2, self._radius + self._title_height)
         self.setMinimumSize(self._MIN_SIZE_X, 2*self._radius)
 
+    @traced(category="paint")
     def paintEvent(self, event):
         self._painter.begin(self)
         self._painter.setRenderHint(QPainter.Antialiasing)